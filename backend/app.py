@@ -15,6 +15,10 @@ from routes.report_routes import report_bp
 from routes.tracker_routes import tracker_bp
 from routes.admin_routes import admin_bp
 from routes.status_routes import status_bp
+from utils.vector_index import load_indexes
+from utils.tfidf_index import load_tfidf
+from utils.schema import sync_schema
+from utils.database import init_database
 
 
 
@@ -26,14 +30,12 @@ app = Flask(__name__)
 CORS(app, supports_credentials=True)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}},supports_credentials=True)
 
-# DB setup
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(BASE_DIR, 'match_results.db')
+# DB setup: DATABASE_URL (PostgreSQL or SQLite), default backend/match_results.db in WAL mode
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY']='super-secret-key'
 jwt=JWTManager(app)
 
-db.init_app(app)
+init_database(app)
 
 # Register blueprints
 app.register_blueprint(upload_bp)
@@ -49,6 +51,13 @@ app.register_blueprint(status_bp)
 
 
 
+# Bring the schema up to date, then load the vector and TF-IDF indexes once per worker
+with app.app_context():
+    sync_schema()
+    load_indexes()
+    load_tfidf()
+
+
 @app.route("/")
 def home():
     return "RadarX Backend is running! 🚀"
@@ -0,0 +1,34 @@
+"""
+Rebuild the daily metrics rollups (daily_match_stats, daily_error_stats) behind
+/tracker/agent-health from match_result and agent_error_log. sync_schema() does
+this once when the tables are first created; run it again after editing the
+base tables by hand, or when --verify reports drift.
+
+    python backfill_metrics.py [--verify]
+"""
+import argparse
+from app import app
+from utils.metrics_rollup import rebuild_rollups, rollup_drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify the daily metrics rollups")
+    parser.add_argument("--verify", action="store_true", help="only compare the rollups with the base tables")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.verify:
+            drift = rollup_drift()
+            for table, buckets in drift.items():
+                print(f"{'⚠️' if buckets else '✅'} {table}: {len(buckets)} bucket(s) out of step")
+                for bucket in buckets[:10]:
+                    print(f"   {bucket}")
+            return
+
+        counts = rebuild_rollups()
+        print(f"✅ Rebuilt rollups: {counts['daily_match_stats']} match buckets, "
+              f"{counts['daily_error_stats']} error buckets")
+
+
+if __name__ == "__main__":
+    main()
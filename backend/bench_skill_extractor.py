@@ -0,0 +1,85 @@
+"""
+Benchmark the taxonomy trie skill extractor against the previous substring/bigram version.
+
+    python bench_skill_extractor.py [--docs 200] [--words 800] [--sizes 181,1000,10000,20000]
+
+Synthetic taxonomies of each size are built on top of data/skill_taxonomy.json;
+per-document latency should stay flat for the trie and grow with size for the substring scan.
+"""
+import re
+import time
+import random
+import argparse
+from utils.skill_extractor import SKILL_CATEGORIES, SkillMatcher, clean_tokens, extract_skills
+
+FILLER = ("designed built maintained services for the team using modern tooling and delivered "
+          "reporting pipelines rapid prototypes scalable solutions with stakeholders across regions").split()
+
+
+def legacy_extract_skills(text, whitelist):
+    """The previous implementation: substring test per skill plus bigram lookup."""
+    tokens = clean_tokens(text)
+    text_lower = text.lower()
+    found = set()
+    for skill in whitelist:
+        if skill in text_lower:
+            found.add(skill)
+    bigrams = [' '.join(tokens[i:i + 2]) for i in range(len(tokens) - 1)]
+    for bg in bigrams:
+        if bg in whitelist:
+            found.add(bg)
+    return sorted(found)
+
+
+def synthetic_taxonomy(size, rng):
+    skills = list(SKILL_CATEGORIES)
+    while len(skills) < size:
+        words = rng.randint(1, 3)
+        skills.append(" ".join(f"tool{rng.randint(0, 10 ** 6)}" for _ in range(words)))
+    return skills[:size]
+
+
+def synthetic_docs(count, words, skills, rng):
+    docs = []
+    for _ in range(count):
+        body = [rng.choice(FILLER) for _ in range(words)]
+        for _ in range(words // 25):
+            body[rng.randrange(words)] = rng.choice(skills)
+        docs.append(" ".join(body))
+    return docs
+
+
+def time_per_doc(fn, docs):
+    start = time.perf_counter()
+    for doc in docs:
+        fn(doc)
+    return (time.perf_counter() - start) / len(docs) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark skill extraction")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--words", type=int, default=800)
+    parser.add_argument("--sizes", default="181,1000,10000,20000")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    print(f"{'taxonomy':>9} | {'legacy ms/doc':>13} | {'trie ms/doc':>11} | {'speedup':>7}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        skills = synthetic_taxonomy(size, rng)
+        whitelist = set(skills)
+        matcher = SkillMatcher((s, s) for s in skills)
+        docs = synthetic_docs(args.docs, args.words, skills, rng)
+
+        legacy = time_per_doc(lambda d: legacy_extract_skills(d, whitelist), docs)
+        trie = time_per_doc(matcher.find, docs)
+        print(f"{size:>9} | {legacy:>13.3f} | {trie:>11.3f} | {legacy / trie:>6.1f}x")
+
+    print("\nWord-boundary check:")
+    for sample in ("Frontend work in JavaScript", "rapid delivery of features", "Built REST APIs on Node.js"):
+        old = legacy_extract_skills(sample, set(SKILL_CATEGORIES))
+        print(f"  {sample!r}\n    legacy: {old}\n    trie:   {extract_skills(sample)}")
+
+
+if __name__ == "__main__":
+    main()
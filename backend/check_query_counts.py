@@ -0,0 +1,99 @@
+"""
+Query-count and latency check for the match read endpoints.
+
+    python check_query_counts.py [--sizes 10,100,500] [--profiles 600] [--repeat 20]
+
+Seeds a temporary SQLite database with one JD per size holding that many match rows
+(spread over several match types, so profiles repeat), then calls
+/match/results/<jd>, /jd/<jd>/matches and the /generate-pdf/<jd> query. Each must
+stay within its query budget; latency should stay flat as the row count grows.
+Exits non-zero when a budget is exceeded.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from flask import Flask
+from models import db, JD, Profile
+from utils.database import init_database
+from utils.match_store import write_matches
+from utils.match_queries import top_profile_matches
+from utils.query_counter import assert_max_queries
+from routes.match_routes import match_bp
+from routes.profile_routes import profile_bp
+
+MATCH_TYPES = ("jd-to-resume", "jd-to-profile")
+# statements per request: /match/results → matches; /jd/<id>/matches → JD + matches; PDF → matches
+QUERY_BUDGETS = {"results": 1, "matches": 2, "pdf": 1}
+
+
+def seed(sizes, n_profiles, rng):
+    profiles = [Profile(emp_id=f"E{i}", name=f"Consultant {i}", email=f"c{i}@example.com", vertical="Data",
+                        skills="python, sql", experience_years=rng.randint(1, 15)) for i in range(n_profiles)]
+    jds = [JD(file_path=f"/uploads/jds/jd_{size}.pdf", job_title=f"JD with {size} matches") for size in sizes]
+    db.session.add_all(profiles + jds)
+    db.session.flush()
+    rows = []
+    for jd, size in zip(jds, sizes):
+        for i in range(size):
+            rows.append(dict(jd_id=jd.id, profile_id=profiles[(i // len(MATCH_TYPES)) % n_profiles].id,
+                             match_type=MATCH_TYPES[i % len(MATCH_TYPES)], score=rng.random(),
+                             explanation="{}", method="SBERT"))
+    write_matches(rows)
+    db.session.commit()
+    return [jd.id for jd in jds]
+
+
+def timed(name, fn, repeat):
+    with assert_max_queries(QUERY_BUDGETS[name]) as counter:
+        fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return counter.count, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query-count and latency check for match read endpoints")
+    parser.add_argument("--sizes", default="10,100,500", help="match rows per JD, comma separated")
+    parser.add_argument("--profiles", type=int, default=600)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    app = Flask(__name__)
+    init_database(app, "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="radarx_queries_"), "queries.db"))
+    app.register_blueprint(match_bp)
+    app.register_blueprint(profile_bp)
+    client = app.test_client()
+
+    failed = False
+    with app.app_context():
+        db.create_all()
+        jd_ids = seed(sizes, args.profiles, random.Random(7))
+        db.session.remove()
+
+        print(f"{'rows':>6} {'endpoint':<10} {'queries':>7} {'ms':>8}")
+        for size, jd_id in zip(sizes, jd_ids):
+            checks = {
+                "results": lambda: client.get(f"/match/results/{jd_id}"),
+                "matches": lambda: client.get(f"/jd/{jd_id}/matches"),
+                "pdf": lambda: [m.profile.name for m in top_profile_matches(jd_id, limit=3, match_type="jd-to-resume")],
+            }
+            for name, fn in checks.items():
+                try:
+                    count, ms = timed(name, fn, args.repeat)
+                    print(f"{size:>6} {name:<10} {count:>7} {ms:>8.2f}")
+                except AssertionError as e:
+                    failed = True
+                    print(f"❌ {size} rows, {name}: {e}")
+                db.session.remove()
+
+    print("❌ query budget exceeded" if failed else "✅ all endpoints within their query budgets")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+One-off cleanup: delete duplicate match_result rows written before the unique
+(jd, profile, resume, match type) key existed, keeping the newest row of each,
+then create the ux_match_result_key index so later writes upsert in place.
+
+    python compact_matches.py [--dry-run] [--vacuum]
+"""
+import argparse
+from sqlalchemy import text
+from app import app, db
+from models import MatchResult
+from utils.match_store import duplicate_match_count, ensure_match_key_index, key_index_ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove duplicate match results and add the unique key index")
+    parser.add_argument("--dry-run", action="store_true", help="only count the duplicates")
+    parser.add_argument("--vacuum", action="store_true", help="reclaim space afterwards (SQLite)")
+    args = parser.parse_args()
+
+    with app.app_context():
+        total = MatchResult.query.count()
+        duplicates = duplicate_match_count()
+        print(f"📊 match_result: {total} rows, {duplicates} duplicates, "
+              f"unique index {'present' if key_index_ready() else 'missing'}")
+        if args.dry_run:
+            return
+
+        removed = ensure_match_key_index(compact=True)
+        print(f"✅ Removed {removed} duplicate rows; {MatchResult.query.count()} remain")
+
+        if args.vacuum and db.engine.dialect.name == "sqlite":
+            with db.engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+            print("🧹 VACUUM complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Concurrent read/write load test for the configured database backend.
+
+Worker threads mix match upserts (writes) with top-matches queries (reads)
+against a scratch database and report throughput, latency and lock errors.
+
+    python db_load_test.py [--url URL] [--threads 8] [--seconds 10] [--write-ratio 0.2]
+                           [--batch 20] [--jds 50] [--profiles 2000] [--untuned]
+
+--url defaults to a temporary SQLite file; pass a PostgreSQL URL to test that backend
+(its tables are created if missing and the rows written are left behind).
+--untuned skips the SQLite pragmas to compare against default journaling.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+from flask import Flask
+from models import db, MatchResult
+from utils.database import init_database
+from utils.match_store import write_matches
+
+READ_LIMIT = 10
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(int(len(values) * pct / 100), len(values) - 1)] * 1000, 2)
+
+
+def worker(app, args, deadline, results, seed):
+    rng = random.Random(seed)
+    stats = {"reads": 0, "writes": 0, "rows": 0, "errors": 0, "locked": 0,
+             "read_latency": [], "write_latency": []}
+    with app.app_context():
+        while time.time() < deadline:
+            jd_id = rng.randint(1, args.jds)
+            start = time.time()
+            try:
+                if rng.random() < args.write_ratio:
+                    rows = [dict(jd_id=jd_id, profile_id=rng.randint(1, args.profiles), match_type='jd-to-resume',
+                                 score=rng.random(), explanation="{}", method="load-test")
+                            for _ in range(args.batch)]
+                    write_matches(rows)
+                    db.session.commit()
+                    stats["writes"] += 1
+                    stats["rows"] += len(rows)
+                    stats["write_latency"].append(time.time() - start)
+                else:
+                    MatchResult.query.filter_by(jd_id=jd_id).order_by(MatchResult.score.desc()).limit(READ_LIMIT).all()
+                    db.session.rollback()   # end the read transaction
+                    stats["reads"] += 1
+                    stats["read_latency"].append(time.time() - start)
+            except Exception as e:
+                db.session.rollback()
+                stats["errors"] += 1
+                if "locked" in str(e):
+                    stats["locked"] += 1
+        db.session.remove()
+    results.append(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read/write database load test")
+    parser.add_argument("--url", help="database URL (default: a temporary SQLite file)")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="share of operations that write")
+    parser.add_argument("--batch", type=int, default=20, help="match rows upserted per write")
+    parser.add_argument("--jds", type=int, default=50)
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--untuned", action="store_true", help="SQLite only: skip WAL/busy-timeout/mmap pragmas")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="radarx_load_"), "load.db")
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"pool_size": args.threads, "max_overflow": args.threads}
+    init_database(app, url, tune=not args.untuned)
+    with app.app_context():
+        db.create_all()
+        info = f"{db.engine.dialect.name}" + (" (untuned)" if args.untuned else "")
+
+    print(f"🚦 {info}: {args.threads} threads for {args.seconds}s, "
+          f"{int(args.write_ratio * 100)}% writes of {args.batch} rows")
+    results = []
+    deadline = time.time() + args.seconds
+    threads = [threading.Thread(target=worker, args=(app, args, deadline, results, seed))
+               for seed in range(args.threads)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    total = {key: sum(r[key] for r in results) for key in ("reads", "writes", "rows", "errors", "locked")}
+    read_latency = [x for r in results for x in r["read_latency"]]
+    write_latency = [x for r in results for x in r["write_latency"]]
+    print(f"✅ reads:  {total['reads'] / elapsed:.1f}/s  p50 {_percentile(read_latency, 50)} ms  "
+          f"p95 {_percentile(read_latency, 95)} ms")
+    print(f"✅ writes: {total['writes'] / elapsed:.1f}/s ({total['rows'] / elapsed:.1f} rows/s)  "
+          f"p50 {_percentile(write_latency, 50)} ms  p95 {_percentile(write_latency, 95)} ms")
+    print(f"⚠️ errors: {total['errors']} ({total['locked']} 'database is locked')")
+
+
+if __name__ == "__main__":
+    main()
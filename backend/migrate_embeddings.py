@@ -0,0 +1,65 @@
+"""
+One-off migration: convert JSON text embeddings into packed binary blobs.
+
+    python migrate_embeddings.py [--dtype float32|float16|int8] [--no-normalize] [--keep-json] [--vacuum]
+"""
+import argparse
+from sqlalchemy import text
+from app import app, db
+from models import JD, Profile, Resume
+from utils.embedding_codec import pack_embedding, decode_legacy_json, DTYPES
+from utils.schema import sync_schema
+
+BATCH_SIZE = 500
+
+
+def migrate_model(model, dtype, normalize, keep_json):
+    converted = failed = 0
+    last_id = 0
+    while True:
+        rows = (model.query
+                .filter(model.id > last_id, model.embedding_vector.isnot(None))
+                .order_by(model.id)
+                .limit(BATCH_SIZE)
+                .all())
+        if not rows:
+            break
+        for row in rows:
+            last_id = row.id
+            try:
+                vec = decode_legacy_json(row.embedding_vector)
+            except ValueError:
+                vec = None
+            if vec is None:
+                failed += 1
+                continue
+            row.embedding_blob = pack_embedding(vec, dtype=dtype, normalize=normalize)
+            if not keep_json:
+                row.embedding_vector = None
+            converted += 1
+        db.session.commit()
+    return converted, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON embeddings to packed blobs")
+    parser.add_argument("--dtype", choices=list(DTYPES), default="float32")
+    parser.add_argument("--no-normalize", action="store_true", help="store raw (unnormalized) vectors")
+    parser.add_argument("--keep-json", action="store_true", help="leave the legacy JSON column populated")
+    parser.add_argument("--vacuum", action="store_true", help="reclaim space afterwards (SQLite)")
+    args = parser.parse_args()
+
+    with app.app_context():
+        sync_schema()
+        for model in (JD, Profile, Resume):
+            converted, failed = migrate_model(model, args.dtype, not args.no_normalize, args.keep_json)
+            print(f"✅ {model.__tablename__}: {converted} converted, {failed} unreadable")
+
+        if args.vacuum and db.engine.dialect.name == "sqlite":
+            with db.engine.connect() as conn:
+                conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+            print("🧹 VACUUM complete")
+
+
+if __name__ == "__main__":
+    main()
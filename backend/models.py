@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Float, Text, Date, DateTime, Boolean, ForeignKey, Index, LargeBinary, func, literal_column
+from utils.embedding_codec import EmbeddingMixin
 
 db = SQLAlchemy()
 
@@ -15,7 +16,7 @@ class User(db.Model):
 
 
 # ─────────────── JOB DESCRIPTIONS ────────────────
-class JD(db.Model):
+class JD(EmbeddingMixin, db.Model):
     __tablename__ = 'jd'
  
     id = Column(Integer, primary_key=True)
@@ -24,7 +25,8 @@ class JD(db.Model):
     project_code = Column(String)
     job_title = Column(String)
     extracted_text = Column(Text)
-    embedding_vector = Column(Text)
+    embedding_vector = Column(Text)        # legacy JSON, emptied by migrate_embeddings.py
+    embedding_blob = Column(LargeBinary)   # packed float32/float16/int8 (utils/embedding_codec.py)
     created_at = Column(DateTime, default=datetime.utcnow)
  
     status = Column(String, default="Pending")  # ✅ New column for tracking JD status
@@ -33,7 +35,7 @@ class JD(db.Model):
 
 
 # ─────────────── CONSULTANT PROFILES ────────────────
-class Profile(db.Model):
+class Profile(EmbeddingMixin, db.Model):
     __tablename__ = 'profile'
     id = Column(Integer, primary_key=True)
     emp_id = Column(String, unique=True, nullable=False)
@@ -44,14 +46,16 @@ class Profile(db.Model):
     experience_years = Column(Float)
     resume_path = Column(String)
     extracted_text = Column(Text)
-    embedding_vector = Column(Text)
+    embedding_vector = Column(Text)        # legacy JSON, emptied by migrate_embeddings.py
+    embedding_blob = Column(LargeBinary)   # packed float32/float16/int8 (utils/embedding_codec.py)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # profile version for incremental matching
 
     match_results = db.relationship('MatchResult', backref='profile', lazy=True)
 
 
 # ─────────────── LEGACY RESUMES ────────────────
-class Resume(db.Model):
+class Resume(EmbeddingMixin, db.Model):
     __tablename__ = 'resume'
     id = Column(Integer, primary_key=True)
     name = Column(String)
@@ -63,7 +67,8 @@ class Resume(db.Model):
     projects = Column(Text)
     domain = Column(String)
     extracted_text = Column(Text)
-    embedding_vector = Column(Text)
+    embedding_vector = Column(Text)        # legacy JSON, emptied by migrate_embeddings.py
+    embedding_blob = Column(LargeBinary)   # packed float32/float16/int8 (utils/embedding_codec.py)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
 
     match_results = db.relationship('MatchResult', backref='resume', lazy=True)
@@ -84,9 +89,17 @@ class MatchResult(db.Model):
     explanation_latency = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    __table_args__ = (
-        Index('ix_match_unique', 'jd_id', 'profile_id', 'resume_id'),
-    )
+
+# One row per (jd, profile, resume, match type); NULL ids count as 0 so the key is unique
+# in SQLite and PostgreSQL alike. Writes go through utils/match_store.write_matches.
+MATCH_KEY_INDEX = Index(
+    'ux_match_result_key',
+    MatchResult.jd_id,
+    func.coalesce(MatchResult.profile_id, literal_column('0')),
+    func.coalesce(MatchResult.resume_id, literal_column('0')),
+    MatchResult.match_type,
+    unique=True,
+)
 
 
 # ─────────────── EMAIL LOG ────────────────
@@ -145,11 +158,32 @@ class LiveStatusTracker(db.Model):
     compared = Column(Boolean, default=False)
     ranked = Column(Boolean, default=False)
     emailed = Column(Boolean, default=False)
+    matched_through = Column(DateTime)   # newest profile version seen by the last JD → profile run
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     jd = db.relationship('JD', backref='status_tracker')
 
+
+# ─────────────── MATCH LEDGER (incremental matching) ────────────────
+class MatchLedger(db.Model):
+    __tablename__ = 'match_ledger'
+    id = Column(Integer, primary_key=True)
+    jd_id = Column(Integer, ForeignKey('jd.id', ondelete='CASCADE'), nullable=False)
+    profile_id = Column(Integer, ForeignKey('profile.id', ondelete='CASCADE'), nullable=False)
+    profile_version = Column(DateTime)   # Profile.updated_at (or created_at) the score was computed against
+    score = Column(Float, nullable=False)
+    features = Column(Text)              # JSON ranker feature breakdown
+    scored_at = Column(DateTime, default=datetime.utcnow)
+
+    # ledger rows go with their JD / profile (ORM delete on any backend, FK cascade where enforced)
+    jd = db.relationship('JD', backref=db.backref('ledger_entries', cascade="all, delete-orphan"))
+    profile = db.relationship('Profile', backref=db.backref('ledger_entries', cascade="all, delete-orphan"))
+
+    __table_args__ = (
+        Index('ix_match_ledger_pair', 'jd_id', 'profile_id', unique=True),
+    )
+
 class AgentErrorLog(db.Model):
     __tablename__ = 'agent_error_log'
     id = Column(Integer, primary_key=True)
@@ -166,3 +200,88 @@ class Prompt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True)
     content = db.Column(db.Text)
+
+
+# ─────────────── EXPLANATION JOBS ────────────────
+class ExplanationJob(db.Model):
+    __tablename__ = 'explanation_job'
+    id = Column(String(36), primary_key=True)   # uuid4 hex
+    jd_id = Column(Integer, ForeignKey('jd.id'), nullable=True)
+    match_type = Column(String)
+    match_ids = Column(Text)                    # JSON list of MatchResult ids
+    mode = Column(String)                       # 'genai' or 'local'
+    status = Column(String, default="queued")   # 'queued', 'running', 'completed'
+    total = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ─────────────── LLM EXPLANATION CACHE ────────────────
+class ExplanationCache(db.Model):
+    __tablename__ = 'explanation_cache'
+    key = Column(String(64), primary_key=True)  # sha256 of JD/resume/prompt/model
+    provider = Column(String)
+    model = Column(String)
+    summary = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# ─────────────── EXTRACTION CACHE ────────────────
+class ExtractionCache(db.Model):
+    __tablename__ = 'extraction_cache'
+    content_hash = Column(String(64), primary_key=True)  # sha256 of the uploaded file's bytes
+    extracted_text = Column(Text, nullable=False)
+    skills = Column(Text)                  # JSON list from extract_skills
+    experience_years = Column(Float)
+    size_bytes = Column(Integer)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ─────────────── DOCUMENT FEATURES (filled at upload) ────────────────
+class DocumentFeatures(db.Model):
+    __tablename__ = 'document_features'
+    id = Column(Integer, primary_key=True)
+    doc_type = Column(String(16), nullable=False)   # 'jd', 'profile', 'resume'
+    doc_id = Column(Integer, nullable=False)
+    skills = Column(Text)                # JSON list, lower-cased and sorted
+    skill_categories = Column(Text)      # JSON {category: [skills]}
+    skill_ids = Column(Text)             # JSON list of rows in the skill-embedding table (null if off-list)
+    experience_years = Column(Float)     # null when the text states none
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (Index('ix_document_features_doc', 'doc_type', 'doc_id', unique=True),)
+
+
+# ─────────────── DAILY METRICS ROLLUPS (utils/metrics_rollup.py) ────────────────
+class DailyMatchStats(db.Model):
+    __tablename__ = 'daily_match_stats'
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)             # UTC date of MatchResult.created_at
+    match_type = Column(String, nullable=False)
+    matches = Column(Integer, default=0)           # MatchResult rows currently in this bucket
+    score_sum = Column(Float, default=0.0)
+    latency_sum = Column(Float, default=0.0)
+    latency_count = Column(Integer, default=0)     # rows with a latency (the avg denominator)
+
+    __table_args__ = (
+        Index('ux_daily_match_stats', 'day', 'match_type', unique=True),
+    )
+
+
+class DailyErrorStats(db.Model):
+    __tablename__ = 'daily_error_stats'
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)             # UTC date of AgentErrorLog.created_at
+    error_type = Column(String, nullable=False)
+    errors = Column(Integer, default=0)
+    resolved = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index('ux_daily_error_stats', 'day', 'error_type', unique=True),
+    )
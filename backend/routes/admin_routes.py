@@ -3,13 +3,20 @@ from models import db, Config, User
 from datetime import datetime
 from utils.admin_utils import save_or_update_config
 from models import Prompt
+from utils.vector_index import INDEX_KINDS, rebuild_index, get_index, evaluate_recall
+from utils.tfidf_index import refit_corpus
 
 admin_bp = Blueprint('admin_bp', __name__)
 
 # ─────────────────────────────
 # CONFIGURATION ROUTES
 # ─────────────────────────────
-ALLOWED_CONFIG_KEYS = {"genai_key", "genai_provider", "genai_enabled", "genai_prompt"}
+ALLOWED_CONFIG_KEYS = {
+    "genai_key", "genai_provider", "genai_enabled", "genai_prompt",
+    "genai_rps", "genai_tokens_per_minute", "genai_timeout", "genai_max_retries", "genai_concurrency",
+    "rank_weight_semantic", "rank_weight_lexical", "rank_weight_skills", "rank_weight_experience",
+    "rank_weight_feedback", "rank_first_stage_k",
+}
 
 
 @admin_bp.route('/admin/config', methods=['GET'])
@@ -46,6 +53,46 @@ def update_config():
         print("❌ Server error:", e)
         return jsonify({"error": f"Unexpected server error: {str(e)}"}), 500
 
+# ─────────────────────────────
+# VECTOR INDEX ROUTES
+# ─────────────────────────────
+@admin_bp.route('/admin/index/rebuild', methods=['POST'])
+def rebuild_vector_index():
+    data = request.get_json(silent=True) or {}
+    kinds = [data["kind"]] if data.get("kind") else list(INDEX_KINDS)
+    if any(kind not in INDEX_KINDS for kind in kinds):
+        return jsonify({"error": f"kind must be one of {list(INDEX_KINDS)}"}), 400
+
+    try:
+        return jsonify([rebuild_index(kind).stats() for kind in kinds])
+    except Exception as e:
+        return jsonify({"error": f"Index rebuild failed: {str(e)}"}), 500
+
+
+@admin_bp.route('/admin/index/stats', methods=['GET'])
+def vector_index_stats():
+    k = request.args.get('k', 10, type=int)
+    nprobe = request.args.get('nprobe', 8, type=int)
+    sample = request.args.get('sample', 100, type=int)
+
+    results = []
+    for kind in INDEX_KINDS:
+        stats = get_index(kind).stats()
+        stats["recall"] = evaluate_recall(kind, k=k, sample_size=sample, nprobe=nprobe)
+        results.append(stats)
+    return jsonify(results)
+
+@admin_bp.route('/admin/tfidf/refit', methods=['POST'])
+def refit_tfidf_corpus():
+    try:
+        corpus = refit_corpus()
+    except Exception as e:
+        return jsonify({"error": f"TF-IDF refit failed: {str(e)}"}), 500
+    return jsonify({
+        "documents": corpus.fitted_docs,
+        "vocabulary": len(corpus.vectorizer.vocabulary_) if corpus.ready else 0
+    })
+
 # USER MANAGEMENT ROUTES
 # ─────────────────────────────
 
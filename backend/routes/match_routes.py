@@ -1,11 +1,17 @@
 import os
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from models import db, JD, Resume, Profile, MatchResult, MatchLearningCache
-from utils.parser import extract_text
-from utils.skill_extractor import compute_similarity_score
-from utils.explainer import generate_explanation
+from utils.extraction_cache import cached_text
+from utils.explainer import generate_explanation, add_genai_summaries
+from utils.explanation_jobs import enqueue_explanations, job_snapshot, PENDING
 from utils.utils import log_agent_error
-from utils.matcher import compute_full_text_score, get_label
+from utils.matcher import get_label
+from utils.ranker import rank_jds, score_pair
+from utils.incremental_match import full_rank, incremental_rank, build_profile_matches
+from utils.match_store import upsert_match, write_matches
+from utils.match_queries import top_profile_matches
+from utils.feature_store import get_features, get_document_features
+from utils.embedding import generate_embedding
 from utils.logger import logger
 from models import LiveStatusTracker
 import json
@@ -17,77 +23,110 @@ def truncate_explanation_fields(explanation):
         explanation["gpt_summary"] = explanation["gpt_summary"][:2000]
     return explanation
  
+def attach_llm_summaries(pending, shared_text, resume_first):
+    """
+    Synchronous path: fetch LLM summaries for all pending matches concurrently and
+    write them onto the not-yet-committed MatchResult rows.
+    `pending` holds (MatchResult, explanation, other_text); `shared_text` is the JD
+    (or resume) text. Explanation dicts are updated in place.
+    """
+    pending = [item for item in pending if item[0] in db.session]
+    if not pending:
+        return
+    start = time.time()
+    items = []
+    for match, explanation, other_text in pending:
+        jd_text, resume_text = (other_text, shared_text) if resume_first else (shared_text, other_text)
+        items.append((explanation, jd_text, resume_text))
+    summaries = add_genai_summaries(items)
+    elapsed = round(time.time() - start, 4)
+    for (match, _, _), explanation in zip(pending, summaries):
+        match.explanation = json.dumps(truncate_explanation_fields(explanation))
+        match.method = explanation.get("source", match.method)
+        match.explanation_latency = round((match.explanation_latency or 0.0) + elapsed, 4)
+    return summaries
+ 
 match_bp = Blueprint('match_bp', __name__)
+
+DEFAULT_TOP_K = 3
+MAX_TOP_K = 50
+JOB_STREAM_POLL_SECONDS = 1.0
+JOB_STREAM_TIMEOUT = 600
  
 @match_bp.route('/match/jd-to-resumes', methods=['POST'])
 def match_jd_to_profiles():
     jd_id = request.json.get('jd_id')
-    logger.info(f"JD-to-Resumes Match Request Received for JD ID: {jd_id}")
+    try:
+        top_k = max(1, min(int(request.json.get('top_k', DEFAULT_TOP_K)), MAX_TOP_K))
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_k must be an integer"}), 400
+    async_explanations = bool(request.json.get('async_explanations', True))
+    logger.info(f"JD-to-Resumes Match Request Received for JD ID: {jd_id} (top_k={top_k})")
  
     status = LiveStatusTracker.query.filter_by(jd_id=jd_id).first()
-    if status and status.compared and status.ranked:
-        logger.warning(f"⚠️ JD ID {jd_id} already matched. Ignoring duplicate call.")
-        return jsonify({"message": "Already matched", "top_matches": []}), 200
+    # Already-matched JDs only score profiles added or changed since (mode="full" rescores everything)
+    incremental = (request.json.get('mode', 'auto') != 'full' and status is not None
+                   and status.ranked and status.matched_through is not None)
  
     jd = JD.query.get(jd_id)
     if not jd:
         logger.warning(f" JD not found with ID: {jd_id}")
         return jsonify({"error": "JD not found"}), 404
  
-    jd_text = jd.extracted_text or extract_text(jd.file_path)
+    jd_text = jd.extracted_text or cached_text(jd.file_path)
     if not jd_text:
         logger.error(" JD text could not be extracted")
         return jsonify({"error": "Failed to extract JD text"}), 500
  
-    all_matches = []
+    jd_vec = jd.embedding
+    if jd_vec is None:
+        jd_vec = generate_embedding(jd_text)
  
-    with db.session.no_autoflush:
-        for profile in Profile.query.all():
-            try:
-                resume_text = profile.extracted_text or extract_text(profile.resume_path)
-                if not resume_text:
-                    continue
- 
-                start_time = time.time()
-                score = compute_similarity_score(jd_text, resume_text)
-                exp_start = time.time()
-                explanation = generate_explanation(jd_text, resume_text, use_gpt=True)
-                exp_latency = round(time.time() - exp_start, 4)
-                latency = round(time.time() - start_time, 4)
-                label = get_label(score)
- 
-                match = MatchResult(
-jd_id=jd.id,
-profile_id=profile.id,
-                    resume_id=None,
-                    score=round(score, 4),
-                    explanation=json.dumps(truncate_explanation_fields(explanation)),
-                    match_type='jd-to-resume',
-                    method=explanation.get("source", "TF-IDF"),
-                    latency=latency,
-                    explanation_latency=exp_latency
-                )
-                db.session.add(match)
- 
-                all_matches.append({
-                    "resume_id": None,
-                    "profile_id": profile.id,
-                    "emp_id": profile.emp_id,
-                    "name": profile.name,
-                    "email":profile.email,
-                    "vertical": profile.vertical,
-                    "resume_path": profile.resume_path,
-                    "score": round(score, 4),
-                    "label": label,
-                    "explanation": explanation,
-                    "latency": latency,
-                    "rank": len(all_matches) + 1
-                })
- 
-            except Exception as e:
-                db.session.rollback()
-                log_agent_error("MatchError", str(e), method="jd-to-resume")
-                continue
+    # ✅ Stage 1: hybrid ranker (ANN + lexical retrieval, vectorized rerank), keep the top-K.
+    #    Every score lands in the match ledger; incremental runs merge new scores into it.
+    score_start = time.time()
+    if incremental:
+        ranked, reusable, rescored = incremental_rank(jd, jd_text, jd_vec, status.matched_through, top_k)
+    else:
+        ranked, reusable = full_rank(jd, jd_text, jd_vec, top_k), {}
+        rescored = None
+    scoring_latency = round(time.time() - score_start, 4)
+ 
+    # ✅ Stage 2: explanations only for shortlisted candidates without a still-valid stored match
+    #    (SBERT inline; the LLM summary is queued when async_explanations is on)
+    explain_start = time.time()
+    built, write_report = build_profile_matches(jd, jd_text, [r for r in ranked if r["id"] not in reusable],
+                                                scoring_latency, async_explanations)
+    pending = [(match, explanation, resume_text) for _, _, match, explanation, resume_text in built]
+    fresh = {item["id"]: (profile, match, explanation) for item, profile, match, explanation, _ in built}
+    kept = {p.id: p for p in Profile.query.filter(Profile.id.in_(list(reusable))).all()} if reusable else {}
+ 
+    all_matches = []
+    for ranked_item in ranked:
+        if ranked_item["id"] in fresh:
+            profile, match, explanation = fresh[ranked_item["id"]]
+        elif ranked_item["id"] in kept:
+            profile, match = kept[ranked_item["id"]], reusable[ranked_item["id"]]
+            explanation = json.loads(match.explanation or "{}")
+        else:
+            continue
+        all_matches.append({
+            "resume_id": None,
+            "profile_id": profile.id,
+            "emp_id": profile.emp_id,
+            "name": profile.name,
+            "email":profile.email,
+            "vertical": profile.vertical,
+            "resume_path": profile.resume_path,
+            "score": round(ranked_item["score"], 4),
+            "label": get_label(ranked_item["score"]),
+            "explanation": explanation,
+            "latency": match.latency,
+            "rank": len(all_matches) + 1
+        })
+    if not async_explanations:
+        attach_llm_summaries(pending, jd_text, resume_first=False)
+    explaining_latency = round(time.time() - explain_start, 4)
  
     try:
         db.session.commit()
@@ -102,18 +141,29 @@ profile_id=profile.id,
     except:
         db.session.rollback()
  
-    # ✅ Remove duplicate matches based on emp_id before slicing
-    seen_ids = set()
-    unique_matches = []
-    for match in all_matches:
-        if match["emp_id"] not in seen_ids:
-            seen_ids.add(match["emp_id"])
-            unique_matches.append(match)
- 
-    unique_matches.sort(key=lambda x: x["score"], reverse=True)
+    job_id = None
+    if async_explanations and pending:
+        job_id = enqueue_explanations(
+            current_app._get_current_object(), jd.id, 'jd-to-resume',
+            [(match.id, jd_text, resume_text) for match, _, resume_text in pending if match.id]
+        )
  
-    logger.info(f"Matching completed. Returning top {min(3, len(unique_matches))} profiles.")
-    return jsonify({"top_matches": unique_matches[:3]})
+    logger.info(f"Matching completed in {scoring_latency}s scoring + {explaining_latency}s explaining "
+                f"({'incremental, ' + str(rescored) + ' rescored' if incremental else 'full'}). "
+                f"Returning top {len(all_matches)} profiles.")
+    return jsonify({
+        "top_matches": all_matches,
+        "top_k": top_k,
+        "mode": "incremental" if incremental else "full",
+        "rescored_profiles": rescored,
+        "explanation_job_id": job_id,
+        "timings": {
+            "scoring": scoring_latency,
+            "explaining": explaining_latency,
+            "writing": write_report["seconds"]
+        },
+        "write": {k: write_report[k] for k in ("written", "failed", "rows_per_sec")}
+    })
  
 @match_bp.route('/match/one-to-one', methods=['POST'])
 def one_to_one_match():
@@ -133,25 +183,30 @@ def one_to_one_match():
             log_agent_error("MissingRecord", f"JD: {jd}, Resume: {resume}", method="one-to-one")
             return jsonify({"error": "JD or Resume not found"}), 404
  
-        if not jd.embedding_vector or not resume.embedding_vector:
+        jd_vec, resume_vec = jd.embedding, resume.embedding
+        if jd_vec is None or resume_vec is None:
             log_agent_error("MissingEmbedding", f"JD or Resume missing embedding", method="one-to-one")
             return jsonify({"error": "JD or Resume missing embedding"}), 500
  
         start_time = time.time()
  
-        # Compute similarity score
-        score = compute_full_text_score(jd.embedding_vector, resume.embedding_vector)
+        # Hybrid score (embedding, TF-IDF, skills, experience, feedback)
+        ranked = score_pair(jd, jd.extracted_text or "", resume, resume.extracted_text or "")
+        score = ranked["score"]
         # Get label based on score
         label = get_label(score)
  
         exp_start = time.time()
         # Generate explanation dict
-        explanation = generate_explanation(jd.extracted_text, resume.extracted_text, use_gpt=True)
+        explanation = generate_explanation(jd.extracted_text, resume.extracted_text, use_gpt=True,
+                                           jd_features=get_document_features("jd", jd.id),
+                                           resume_features=get_document_features("resume", resume.id))
+        explanation["score_breakdown"] = ranked["features"]
         exp_latency = round(time.time() - exp_start, 4)
         latency = round(time.time() - start_time, 4)
  
-        # ✅ Save to MatchResult
-        match_entry = MatchResult(
+        # ✅ Save to MatchResult (replaces the previous result for this pair)
+        upsert_match(
                 jd_id=jd.id,
                 resume_id=resume.id,
                 score=round(score, 4),
@@ -162,7 +217,6 @@ def one_to_one_match():
                 explanation_latency=exp_latency
          
         )
-        db.session.add(match_entry)
         db.session.commit()
  
         return jsonify({
@@ -187,43 +241,35 @@ def one_to_one_match():
 @match_bp.route('/match/resume-to-jds', methods=['POST'])
 def match_resume_to_jds():
     resume_id = request.json.get('resume_id')
+    async_explanations = bool(request.json.get('async_explanations', True))
     resume = Resume.query.get(resume_id)
     if not resume:
         return jsonify({"error": "Resume not found"}), 404
  
     resume_text = resume.extracted_text
     if not resume_text:
-        resume_text = extract_text(resume.file_path)
+        resume_text = cached_text(resume.file_path)
         if not resume_text:
             return jsonify({"error": "Failed to extract resume text"}), 500
  
-    all_matches = []
- 
-    with db.session.no_autoflush:
-        for jd in JD.query.all():
-            try:
-                jd_text = jd.extracted_text
-                if not jd_text:
-                    jd_text = extract_text(jd.file_path)
-                    if not jd_text:
-                        continue
- 
-                score = compute_similarity_score(jd_text, resume_text)
-               
- 
-                all_matches.append({
-                    "jd": jd,
-                    "jd_text": jd_text,
-                    "score": round(score, 4)
-                })
- 
-            except Exception as e:
-                log_agent_error("PreMatchError", str(e), method="resume-to-jd")
-                continue
- 
-    # Sort by score and take top 3
-    top_matches = sorted(all_matches, key=lambda x: x["score"], reverse=True)[:3]
+    # Hybrid ranker over the stored JDs, keep the top 3
+    resume_vec = resume.embedding
+    if resume_vec is None:
+        resume_vec = generate_embedding(resume_text)
+    score_start = time.time()
+    ranked = rank_jds(resume, resume_text, resume_vec, 3)
+    scoring_latency = round(time.time() - score_start, 4)
+    jds = {jd.id: jd for jd in JD.query.filter(JD.id.in_([r["id"] for r in ranked])).all()} if ranked else {}
+    top_matches = [
+        {"jd": jds[r["id"]], "jd_text": jds[r["id"]].extracted_text, "score": round(r["score"], 4),
+         "features": r["features"]}
+        for r in ranked if r["id"] in jds and jds[r["id"]].extracted_text
+    ]
+    resume_features = get_document_features("resume", resume.id)
+    jd_features = get_features("jd", [match["jd"].id for match in top_matches])
     results = []
+    pending = []
+    rows = []
  
     for i, match in enumerate(top_matches, start=1):
         jd = match["jd"]
@@ -232,22 +278,26 @@ def match_resume_to_jds():
  
         try:
             exp_start = time.time()
-            explanation = generate_explanation(jd_text, resume_text, use_gpt=True)
+            explanation = generate_explanation(jd_text, resume_text, jd_features=jd_features.get(jd.id),
+                                               resume_features=resume_features)
+            explanation["score_breakdown"] = match["features"]
+            if async_explanations:
+                explanation["explanation_status"] = PENDING
             exp_latency = round(time.time() - exp_start, 4)
  
             label = get_label(score)
  
-            new_match = MatchResult(
+            rows.append(dict(
                 jd_id=jd.id,
                 resume_id=resume.id,
                 score=score,
                 explanation=json.dumps(truncate_explanation_fields(explanation)),
                 match_type='resume-to-jd',
                 method=explanation.get("source", "TF-IDF"),
-                latency=exp_latency,  # since this is the only timed part here
+                latency=round(scoring_latency + exp_latency, 4),
                 explanation_latency=exp_latency
-            )
-            db.session.add(new_match)
+            ))
+            pending.append((explanation, jd_text))
  
             results.append({
                 "jd_id": jd.id,
@@ -265,13 +315,67 @@ def match_resume_to_jds():
             continue
  
     try:
+        # one upsert for all rows: re-matching a resume replaces its previous results
+        matches, _ = write_matches(rows)
+        pending = [(match, explanation, jd_text)
+                   for match, (explanation, jd_text) in zip(matches, pending) if match is not None]
+        if not async_explanations:
+            attach_llm_summaries(pending, resume_text, resume_first=True)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         log_agent_error("DBCommitError", str(e), method="resume-to-jd")
         return jsonify({"error": "Database commit failed"}), 500
  
-    return jsonify({"top_matches": results})
+    job_id = None
+    if async_explanations and pending:
+        job_id = enqueue_explanations(
+            current_app._get_current_object(), None, 'resume-to-jd',
+            [(match.id, jd_text, resume_text) for match, _, jd_text in pending if match.id]
+        )
+ 
+    return jsonify({"top_matches": results, "explanation_job_id": job_id})
+ 
+# ─────────────────────────────────────────────
+# Background Explanation Jobs
+# ─────────────────────────────────────────────
+@match_bp.route('/match/jobs/<job_id>', methods=['GET'])
+def get_explanation_job(job_id):
+    snapshot = job_snapshot(job_id)
+    if not snapshot:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(snapshot)
+ 
+ 
+@match_bp.route('/match/jobs/<job_id>/stream', methods=['GET'])
+def stream_explanation_job(job_id):
+    """Server-sent events: one `explanation` event per finished item, then `done`."""
+    if not job_snapshot(job_id):
+        return jsonify({"error": "Job not found"}), 404
+ 
+    def events():
+        sent = set()
+        deadline = time.time() + JOB_STREAM_TIMEOUT
+        progress = {"job_id": job_id, "status": "timeout"}
+        while time.time() < deadline:
+            snapshot = job_snapshot(job_id)
+            if snapshot is None:   # job removed while streaming
+                progress = {"job_id": job_id, "status": "missing"}
+                break
+            progress = {k: v for k, v in snapshot.items() if k != "items"}
+            for item in snapshot["items"]:
+                if item["status"] != PENDING and item["match_id"] not in sent:
+                    sent.add(item["match_id"])
+                    yield f"event: explanation\ndata: {json.dumps(item)}\n\n"
+            if snapshot["status"] == "completed":
+                break
+            yield ": keep-alive\n\n"
+            time.sleep(JOB_STREAM_POLL_SECONDS)
+        yield f"event: done\ndata: {json.dumps(progress)}\n\n"
+ 
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+ 
  
 # ─────────────────────────────────────────────
 # Match Engine Health Check
@@ -297,15 +401,14 @@ def get_label(score):
  
 @match_bp.route('/match/results/<int:jd_id>', methods=['GET'])
 def get_existing_matches(jd_id):
-    matches = MatchResult.query.filter_by(jd_id=jd_id).order_by(MatchResult.score.desc()).limit(10).all()
+    # one query: the 10 best distinct profiles with their profile rows joined in
+    matches = top_profile_matches(jd_id, limit=10)
     if not matches:
         return jsonify({"top_matches": []}), 200
  
     top_matches = []
     for match in matches:
-        profile = Profile.query.get(match.profile_id)
-        if not profile:
-            continue
+        profile = match.profile
         top_matches.append({ 
             "profile_id": profile.id,
             "emp_id": profile.emp_id,
@@ -4,10 +4,12 @@ from sqlalchemy import or_
 from utils.parser import extract_text
 from utils.skill_extractor import extract_skills
 from models import JD, MatchResult, Profile
-from sqlalchemy.orm import joinedload
+from utils.match_queries import top_profile_matches
 
 profile_bp = Blueprint('profile_bp', __name__)
 
+MATCHES_PAGE_LIMIT = 50   # default ?limit= for /jd/<id>/matches
+
 @profile_bp.route('/profiles/search', methods=['GET'])
 def search_profiles():
     emp_id = request.args.get('emp_id', '').strip()
@@ -62,13 +64,8 @@ def get_matches_for_jd(jd_id):
     if not jd:
         return jsonify({"error": "JD not found"}), 404
 
-    results = (
-        MatchResult.query
-        .filter_by(jd_id=jd_id, match_type='jd-to-profile')
-        .order_by(MatchResult.score.desc())
-        .options(joinedload(MatchResult.profile))
-        .all()
-    )
+    limit = request.args.get("limit", MATCHES_PAGE_LIMIT, type=int)
+    results = top_profile_matches(jd_id, limit=limit, match_type='jd-to-profile', with_explanation=True)
 
     matches = []
     for r in results:
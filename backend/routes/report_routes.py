@@ -1,6 +1,7 @@
 from flask import Blueprint, send_file, request, jsonify
 from utils.pdf_generator import generate_pdf_report
 from models import JD, MatchResult, Profile
+from utils.match_queries import top_profile_matches
 from flask import Blueprint, jsonify
 import os
 
@@ -9,35 +10,19 @@ report_bp = Blueprint('report_bp', __name__)
 @report_bp.route('/generate-pdf/<int:jd_id>', methods=['GET'])
 def generate_pdf(jd_id):
     """
-    Generate a match summary PDF for the given JD, including top 3 unique profile matches.
+    Generate a match summary PDF for the given JD, including its top 3 profile matches.
     """
     jd = JD.query.get(jd_id)
     if not jd:
         return jsonify({"error": "JD not found"}), 404
 
-    matches = (
-        MatchResult.query.filter_by(jd_id=jd_id)
-        .order_by(MatchResult.score.desc())
-        .all()
-    )
-
-    top_matches = []
-    seen_profile_ids = set()
-
-    for match in matches:
-        if not match.profile_id or match.profile_id in seen_profile_ids:
-            continue
-        profile = Profile.query.get(match.profile_id)
-        if not profile:
-            continue
-        top_matches.append({
-            "name": profile.name,
-            "emp_id": profile.emp_id,
-            "score": round(match.score * 100, 2)
-        })
-        seen_profile_ids.add(profile.id)
-        if len(top_matches) >= 3:
-            break
+    matches = top_profile_matches(jd_id, limit=3, match_type='jd-to-resume')
+
+    top_matches = [{
+        "name": match.profile.name,
+        "emp_id": match.profile.emp_id,
+        "score": round(match.score * 100, 2)
+    } for match in matches]
 
     if not top_matches:
         return jsonify({"error": "No valid profile matches found"}), 404
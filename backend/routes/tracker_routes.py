@@ -1,30 +1,38 @@
 # routes/tracker.py
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from sqlalchemy.sql import func
-from datetime import datetime, timedelta
-from models import db, MatchResult, AgentErrorLog, JD, Resume
+from models import db, JD, Resume
+from utils.model_registry import model_stats
+from utils.explanation_cache import explanation_cache_stats
+from utils.extraction_service import extraction_stats
+from utils.extraction_cache import extraction_cache_stats
+from utils.match_store import write_stats
+from utils.database import database_info
+from utils.metrics_rollup import match_totals, daily_match_counts, error_totals
+from utils.latency_metrics import latency_report, WINDOWS
 
 tracker_bp = Blueprint('tracker_bp', __name__)
 
 @tracker_bp.route('/tracker/agent-health', methods=['GET'])
 def get_agent_health_summary():
+    # Everything below is read from the daily rollups (utils/metrics_rollup.py),
+    # so the cost does not grow with match_result / agent_error_log.
     # ────────────────────────────────
     # Total Match Counts
     # ────────────────────────────────
-    total_matches = db.session.query(func.count(MatchResult.id)).scalar()
+    totals = match_totals()
+    total_matches = int(sum(t["matches"] for t in totals.values()))
 
-    jd_to_resume = db.session.query(func.count()).filter(MatchResult.match_type == 'jd-to-resume').scalar()
-    resume_to_jd = db.session.query(func.count()).filter(MatchResult.match_type == 'resume-to-jd').scalar()
-    one_to_one = db.session.query(func.count()).filter(MatchResult.match_type == 'one-to-one').scalar()
+    def count(match_type):
+        return int(totals.get(match_type, {}).get("matches", 0))
 
     # ────────────────────────────────
     # Latency Averages (realistic, by type)
     # ────────────────────────────────
     def avg_latency(match_type):
-        return round(db.session.query(func.avg(MatchResult.latency))
-                     .filter(MatchResult.match_type == match_type)
-                     .scalar() or 0.0, 2)
+        stats = totals.get(match_type)
+        return round(stats["latency_sum"] / stats["latency_count"], 2) if stats and stats["latency_count"] else 0.0
 
     latency_stats = {
         "jd_to_resume": avg_latency("jd-to-resume"),
@@ -35,44 +43,37 @@ def get_agent_health_summary():
     # ────────────────────────────────
     # Error Metrics
     # ────────────────────────────────
-    total_errors = db.session.query(func.count(AgentErrorLog.id)).scalar()
-    unresolved_errors = db.session.query(func.count()).filter(AgentErrorLog.resolved == False).scalar()
-    resolved_errors = total_errors - unresolved_errors
-
-    most_common_error = db.session.query(
-        AgentErrorLog.error_type, func.count().label('count')
-    ).group_by(AgentErrorLog.error_type).order_by(func.count().desc()).first()
+    errors = error_totals()
+    total_errors = sum(e["errors"] for e in errors.values())
+    resolved_errors = sum(e["resolved"] for e in errors.values())
+    unresolved_errors = total_errors - resolved_errors
+    most_common_error = max(((error_type, e["errors"]) for error_type, e in errors.items() if e["errors"]),
+                            key=lambda item: item[1], default=None)
 
     # ────────────────────────────────
     # Daily Usage Trends (last 7 days)
     # ────────────────────────────────
-    today = datetime.utcnow().date()
-    daily_trend = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        count = db.session.query(func.count()).filter(
-            func.date(MatchResult.created_at) == day
-        ).scalar()
-        daily_trend.append({"date": day.strftime("%b %d"), "matches": count})
+    daily_trend = [{"date": day.strftime("%b %d"), "matches": matches} for day, matches in daily_match_counts(7)]
 
     # ────────────────────────────────
     # Bonus Smart Stats
     # ────────────────────────────────
-    jd_uploaded = db.session.query(func.count(JD.id)).scalar()
-    resumes_uploaded = db.session.query(func.count(Resume.id)).scalar()
+    jd_uploaded, resumes_uploaded = db.session.query(
+        db.session.query(func.count(JD.id)).scalar_subquery(),
+        db.session.query(func.count(Resume.id)).scalar_subquery()
+    ).one()
 
-    avg_match_score = round(
-        db.session.query(func.avg(MatchResult.score)).scalar() or 0.0, 2
-    )
+    score_sum = sum(t["score_sum"] for t in totals.values())
+    avg_match_score = round(score_sum / total_matches, 2) if total_matches else 0.0
 
     # Success rate = matched results / total JD-uploaded
     match_success_rate = round((total_matches / jd_uploaded) * 100, 2) if jd_uploaded else 0
 
     return jsonify({
         "total_matches": total_matches,
-        "jd_to_resume": jd_to_resume,
-        "resume_to_jd": resume_to_jd,
-        "one_to_one": one_to_one,
+        "jd_to_resume": count("jd-to-resume"),
+        "resume_to_jd": count("resume-to-jd"),
+        "one_to_one": count("one-to-one"),
         "latency_stats": latency_stats,
 
         "total_errors": total_errors,
@@ -86,5 +87,37 @@ def get_agent_health_summary():
         "jd_uploaded": jd_uploaded,
         "resumes_uploaded": resumes_uploaded,
         "avg_match_score": avg_match_score,
-        "match_success_rate": match_success_rate
+        "match_success_rate": match_success_rate,
+
+        "explanation_cache": explanation_cache_stats()
     })
+
+
+@tracker_bp.route('/tracker/models', methods=['GET'])
+def get_model_registry_stats():
+    return jsonify(model_stats())
+
+
+@tracker_bp.route('/tracker/extraction', methods=['GET'])
+def get_extraction_stats():
+    return jsonify(dict(extraction_stats(), cache=extraction_cache_stats()))
+
+
+@tracker_bp.route('/tracker/writes', methods=['GET'])
+def get_write_stats():
+    return jsonify(write_stats())
+
+
+@tracker_bp.route('/tracker/database', methods=['GET'])
+def get_database_info():
+    return jsonify(database_info())
+
+
+@tracker_bp.route('/tracker/latency', methods=['GET'])
+def get_latency_percentiles():
+    """p50/p95/p99 (ms) per pipeline stage over sliding windows; ?window=5m,1h picks windows."""
+    windows = [w.strip() for w in request.args.get("window", "").split(",") if w.strip()]
+    unknown = [w for w in windows if w not in WINDOWS]
+    if unknown:
+        return jsonify({"error": f"Unknown window(s) {unknown}; use {list(WINDOWS)}"}), 400
+    return jsonify(latency_report(windows or None))
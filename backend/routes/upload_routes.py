@@ -1,23 +1,26 @@
 import os
-import json
-from flask import Blueprint, request, jsonify
+import shutil
+import tempfile
+from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from models import db, JD, Resume
-from utils.parser import extract_text
-from sentence_transformers import SentenceTransformer
 from models import Profile
 import re
 from utils.utils import log_agent_error
-from utils.parser import extract_text
+from utils.extraction_cache import extract_with_cache
+from utils.extraction_service import ExtractionBusy, EXTRACTION_TIMEOUT
 from utils.embedding import generate_embedding
-from utils.skill_extractor import extract_skills
+from utils.feature_store import get_features, store_document_features, delete_features
+from utils.vector_index import index_document, unindex_document
+from utils.tfidf_index import index_text, unindex_text
+from utils.bulk_ingest import ingest, BULK_KINDS
+from utils.incremental_match import schedule_reverse_match
+from utils.match_store import delete_profiles
+from utils.logger import logger
 from flask import send_from_directory
 
 upload_bp = Blueprint('upload_bp', __name__)
 
-# Sentence Transformer Model
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 # Upload Folders
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 UPLOAD_FOLDER_JD = os.path.join(BASE_DIR, '..', 'uploads', 'jds')
@@ -35,27 +38,17 @@ def serve_resume(filename):
  
 @upload_bp.route('/jds/filterable', methods=['GET'])
 def get_jds_for_filters():
-    from utils.skill_extractor import extract_skills
-    from utils.parser import extract_text
-    import re
- 
     clean_jds = []
+    jds = JD.query.all()
+    features = get_features("jd", [jd.id for jd in jds])
  
-    for jd in JD.query.all():
-        jd_text = jd.extracted_text or extract_text(jd.file_path) or ""
+    for jd in jds:
+        jd_features = features.get(jd.id) or {"skills": [], "experience_years": None}
+        cleaned_skills = [s for s in jd_features["skills"] if len(s) > 2 and s.isascii() and s.isalnum()]
  
-        # Extract skills
-        skills = extract_skills(jd_text)
-        cleaned_skills = [s.lower() for s in skills if len(s) > 2 and s.isascii() and s.isalnum()]
- 
-        # Extract experience
-        experience_match = re.search(r'(\d+)\s*\+?\s*(years|yrs)', jd_text.lower())
-        if experience_match:
-            experience = int(experience_match.group(1))
-        elif "fresher" in jd_text.lower():
-            experience = 0
-        else:
-            experience = 3  # <-- ✅ fallback to 3, not 1
+        # Stored experience: None when the JD states none
+        experience = jd_features["experience_years"]
+        experience = 3 if experience is None else int(experience)  # <-- ✅ fallback to 3, not 1
  
         # ✅ Use real DB status from jd.status, fallback to "Pending" if not set
         status = jd.status or "Pending"
@@ -91,20 +84,25 @@ def upload_jd():
     save_path = os.path.join(UPLOAD_FOLDER_JD, filename)
     file.save(save_path)
 
-    text = extract_text(save_path)
-    embedding = model.encode(text).tolist()
+    try:
+        extraction = extract_with_cache(save_path, reject_when_busy=True)
+    except ExtractionBusy as e:
+        return _extraction_busy(e)
+    text = extraction["text"] if extraction else None
 
     jd = JD(
         file_path=f"/uploads/resumes/{filename}",  # for Resume
         uploaded_by=uploaded_by,
         project_code=project_code,
         job_title=job_title,
-        extracted_text=text,
-        embedding_vector=json.dumps(embedding)
+        extracted_text=text
     )
+    jd.embedding = generate_embedding(text)
 
     db.session.add(jd)
     db.session.commit()
+    _update_index("jd", jd.id, jd.embedding, text)
+    store_document_features("jd", jd, text, skills=extraction["skills"] if extraction else None)
 
     return jsonify({
         "message": "JD uploaded",
@@ -128,18 +126,23 @@ def upload_resume():
     save_path = os.path.join(UPLOAD_FOLDER_RESUME, filename)
     file.save(save_path)
 
-    text = extract_text(save_path)
-    embedding = model.encode(text).tolist()
+    try:
+        extraction = extract_with_cache(save_path, reject_when_busy=True)
+    except ExtractionBusy as e:
+        return _extraction_busy(e)
+    text = extraction["text"] if extraction else None
 
     resume = Resume(
         name=name,
         file_path=f"/uploads/resumes/{filename}",  # for Resume
-        extracted_text=text,
-        embedding_vector=json.dumps(embedding)
+        extracted_text=text
     )
+    resume.embedding = generate_embedding(text)
 
     db.session.add(resume)
     db.session.commit()
+    _update_index("resume", resume.id, resume.embedding, text)
+    store_document_features("resume", resume, text, skills=extraction["skills"] if extraction else None)
 
     return jsonify({
         "message": "Resume uploaded",
@@ -164,23 +167,27 @@ def upload_profile():
         save_path = os.path.join(UPLOAD_FOLDER_RESUME, filename)
         file.save(save_path)
  
-        text = extract_text(save_path)
-        if not text:
+        extraction = extract_with_cache(save_path, reject_when_busy=True)
+        if not extraction:
             raise ValueError("Resume unreadable or empty")
+        text = extraction["text"]
  
         embedding = generate_embedding(text)
-        skills_to_use = manual_skills.strip() if manual_skills else ", ".join(extract_skills(text))
+        skills_to_use = manual_skills.strip() if manual_skills else ", ".join(extraction["skills"])
  
         try:
-            experience_years = float(manual_experience.strip()) if manual_experience else estimate_experience(text)
+            experience_years = float(manual_experience.strip()) if manual_experience else float(extraction["experience"])
         except:
-            experience_years = estimate_experience(text)
+            experience_years = float(extraction["experience"])
  
         # Remove existing profile with same emp_id
         existing = Profile.query.filter_by(emp_id=emp_id).first()
         if existing:
-            db.session.delete(existing)
+            replaced_id = existing.id
+            delete_profiles([existing])   # with its matches, ledger, feedback and learning cache
             db.session.commit()
+            _remove_from_index("profile", replaced_id)
+            delete_features("profile", [replaced_id])
  
         profile = Profile(
             emp_id=emp_id,
@@ -190,18 +197,87 @@ def upload_profile():
             skills=skills_to_use,
             experience_years=experience_years,
             resume_path=f"/uploads/resumes/{filename}",
-            extracted_text=text,
-            embedding_vector=json.dumps(embedding)
+            extracted_text=text
         )
+        profile.embedding = embedding
  
         db.session.add(profile)
         db.session.commit()
+        _update_index("profile", profile.id, profile.embedding, text)
+        store_document_features("profile", profile, text)
+        schedule_reverse_match(current_app._get_current_object(), [profile.id])   # score against open JDs
         return jsonify({ "message": "Profile uploaded", "profile_id": profile.id })
  
+    except ExtractionBusy as e:
+        return _extraction_busy(e)
     except Exception as e:
+        db.session.rollback()
         log_agent_error("UploadProfileError", str(e), method="upload-profile")
         return jsonify({"error": "Profile upload failed"}), 500
 
+# ───────────────────────────────
+# Bulk upload: zip of JDs / resumes / profiles
+# ───────────────────────────────
+@upload_bp.route('/upload/bulk', methods=['POST'])
+def upload_bulk():
+    kind = request.form.get('kind', 'profile')
+    archive = request.files.get('file')
+    files = request.files.getlist('files')
+
+    if kind not in BULK_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(BULK_KINDS)}"}), 400
+    if not archive and not files:
+        return jsonify({"error": "Provide a zip as 'file' or documents as 'files'"}), 400
+
+    workdir = tempfile.mkdtemp(prefix="bulk_")
+    try:
+        if archive:
+            source = os.path.join(workdir, secure_filename(archive.filename or "bulk.zip"))
+            archive.save(source)
+        else:
+            source = workdir
+            for f in files:
+                f.save(os.path.join(workdir, secure_filename(f.filename)))
+
+        defaults = {k: request.form[k] for k in ('uploaded_by', 'project_code', 'vertical') if request.form.get(k)}
+        report = ingest(current_app._get_current_object(), kind, source, defaults)
+        return jsonify(report)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log_agent_error("BulkUploadError", str(e), method="upload-bulk")
+        return jsonify({"error": "Bulk upload failed"}), 500
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _extraction_busy(e):
+    """503 for an upload turned away by a full extraction queue; the client retries later."""
+    logger.warning(f"Upload rejected: {e}")
+    response = jsonify({"error": "Document extraction is busy, retry shortly"})
+    response.headers["Retry-After"] = str(int(EXTRACTION_TIMEOUT))
+    return response, 503
+
+
+# ───────────────────────────────
+# Vector / TF-IDF index maintenance (never fails the upload)
+# ───────────────────────────────
+def _update_index(kind, doc_id, embedding, text):
+    try:
+        index_document(kind, doc_id, embedding)
+        index_text(current_app._get_current_object(), kind, doc_id, text)
+    except Exception as e:
+        logger.error(f"Failed to index {kind} {doc_id}: {e}")
+
+
+def _remove_from_index(kind, doc_id):
+    try:
+        unindex_document(kind, doc_id)
+        unindex_text(kind, doc_id)
+    except Exception as e:
+        logger.error(f"Failed to remove {kind} {doc_id} from index: {e}")
+
+
 def estimate_experience(text):
     matches = re.findall(r'(\d{1,2})\+?\s?(?:years?|yrs?)', text.lower())
     return max([int(m) for m in matches if int(m) < 40], default=0)
@@ -1,11 +1,22 @@
 from models import db, Config, User
 from datetime import datetime
+from utils.config_cache import invalidate_config_cache
 
 # ─────────────────────────────
 # CONFIG UTILITIES
 # ─────────────────────────────
 
-ALLOWED_CONFIG_KEYS = {"genai_key", "genai_provider", "genai_enabled", "genai_prompt"}
+ALLOWED_CONFIG_KEYS = {
+    "genai_key", "genai_provider", "genai_enabled", "genai_prompt",
+    "genai_rps", "genai_tokens_per_minute", "genai_timeout", "genai_max_retries", "genai_concurrency",
+    "rank_weight_semantic", "rank_weight_lexical", "rank_weight_skills", "rank_weight_experience",
+    "rank_weight_feedback", "rank_first_stage_k",
+}
+RANK_WEIGHT_KEYS = {"rank_weight_semantic", "rank_weight_lexical", "rank_weight_skills",
+                    "rank_weight_experience", "rank_weight_feedback"}
+NUMERIC_CONFIG_KEYS = {"genai_rps", "genai_tokens_per_minute", "genai_timeout", "genai_max_retries",
+                       "genai_concurrency", "rank_first_stage_k"} | RANK_WEIGHT_KEYS
+ZERO_ALLOWED_KEYS = {"genai_max_retries"} | RANK_WEIGHT_KEYS
 
 def get_all_config_dict():
     """Return all configs as a dictionary."""
@@ -39,6 +50,14 @@ def save_or_update_config(key, value):
             return {"error": "genai_enabled must be 'true' or 'false'"}, 400
         value_str = value_str.lower()
 
+    if key in NUMERIC_CONFIG_KEYS:
+        try:
+            number = float(value_str)
+        except ValueError:
+            return {"error": f"{key} must be a number"}, 400
+        if number < 0 or (number == 0 and key not in ZERO_ALLOWED_KEYS):
+            return {"error": f"{key} must be positive"}, 400
+
     config = Config.query.filter_by(key=key).first()
     if config:
         config.value = value_str
@@ -48,6 +67,7 @@ def save_or_update_config(key, value):
         db.session.add(config)
 
     db.session.commit()
+    invalidate_config_cache()
     return {"message": f"✅ Config '{key}' saved."}, 200
 
 # ─────────────────────────────
@@ -0,0 +1,25 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import logger
+
+# Shared worker pool for work that must not hold an HTTP worker
+# (LLM explanations, re-matching after uploads, ...)
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="radarx-bg")
+
+
+def submit(app, fn, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` on the pool inside an app context of `app`."""
+    def run():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Background task {getattr(fn, '__name__', fn)} failed: {e}", exc_info=True)
+                raise
+            finally:
+                from models import db
+                db.session.remove()
+
+    return _executor.submit(run)
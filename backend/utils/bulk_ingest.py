@@ -0,0 +1,251 @@
+import os
+import csv
+import time
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+from models import db, JD, Resume, Profile
+from utils.parser import extract_text, extract_basic_info_batch
+from utils.extraction_cache import file_hash, analyze_text, get_cached_extractions, store_extractions
+from utils.embedding import generate_embeddings
+from utils.extraction_service import EXTRACTION_WORKERS
+from utils.feature_store import compute_features, save_features, delete_features
+from utils.vector_index import index_documents, unindex_document
+from utils.tfidf_index import index_texts, unindex_text
+from utils.incremental_match import schedule_reverse_match
+from utils.match_store import delete_profiles
+from utils.logger import logger
+
+# ──────────────────────────────
+# Bulk ingestion of JDs / resumes / consultant profiles from a zip or directory.
+# Text extraction runs in parallel, SBERT encodes in large batches and every row
+# is written (with its feature-store row) in one transaction; the vector and
+# TF-IDF indexes are updated once.
+# ──────────────────────────────
+BULK_KINDS = ("jd", "resume", "profile")
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+MANIFEST_NAME = "manifest.csv"   # optional: filename,emp_id,name,email,vertical,skills,experience_years,job_title
+EXTRACT_WORKERS = int(os.getenv("BULK_EXTRACT_WORKERS", str(EXTRACTION_WORKERS)))   # one per extraction process
+EMBED_BATCH_SIZE = int(os.getenv("BULK_EMBED_BATCH_SIZE", "64"))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+UPLOAD_DIRS = {
+    "jd": ("jds", os.path.join(BACKEND_DIR, 'uploads', 'jds')),
+    "resume": ("resumes", os.path.join(BACKEND_DIR, 'uploads', 'resumes')),
+    "profile": ("resumes", os.path.join(BACKEND_DIR, 'uploads', 'resumes')),
+}
+
+
+def _read_manifest(fileobj):
+    rows = csv.DictReader((line.decode("utf-8-sig") if isinstance(line, bytes) else line) for line in fileobj)
+    return {secure_filename(row.get("filename", "")): row for row in rows if row.get("filename")}
+
+
+def collect_files(source, kind):
+    """
+    Copy every supported file from a zip or directory into the upload folder.
+    Returns (saved paths, skipped names, manifest rows keyed by filename).
+    """
+    _, dest = UPLOAD_DIRS[kind]
+    os.makedirs(dest, exist_ok=True)
+    saved, skipped, manifest = [], [], {}
+
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                base = os.path.basename(info.filename)
+                if base.lower() == MANIFEST_NAME:
+                    with zf.open(info) as f:
+                        manifest = _read_manifest(f)
+                    continue
+                if not base.lower().endswith(SUPPORTED_EXTENSIONS):
+                    skipped.append(base)
+                    continue
+                path = os.path.join(dest, secure_filename(base))
+                with zf.open(info) as src, open(path, "wb") as out:
+                    shutil.copyfileobj(src, out)
+                saved.append(path)
+    elif os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for base in sorted(files):
+                src = os.path.join(root, base)
+                if base.lower() == MANIFEST_NAME:
+                    with open(src, encoding="utf-8-sig") as f:
+                        manifest = _read_manifest(f)
+                    continue
+                if not base.lower().endswith(SUPPORTED_EXTENSIONS):
+                    skipped.append(base)
+                    continue
+                path = os.path.join(dest, secure_filename(base))
+                if os.path.abspath(src) != os.path.abspath(path):
+                    shutil.copyfile(src, path)
+                saved.append(path)
+    else:
+        raise ValueError(f"{source} is neither a zip file nor a directory")
+    return saved, skipped, manifest
+
+
+def _parse_one(path):
+    """Text, skills and experience for a cache miss; runs on the extraction pool."""
+    text = extract_text(path)
+    return analyze_text(text) if text else None
+
+
+def _row_fields(kind, entry, info):
+    fields = {"text": entry["text"], "extracted_skills": entry["skills"]}
+    if kind == "profile":
+        fields["skills"] = ", ".join(entry["skills"])
+        fields["experience_years"] = float(entry["experience"] or 0)
+    fields.update(info or {})
+    return fields
+
+
+def _float_or(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _build_row(kind, path, fields, meta, defaults):
+    filename = os.path.basename(path)
+    stem = os.path.splitext(filename)[0]
+    web_path = f"/uploads/{UPLOAD_DIRS[kind][0]}/{filename}"
+    text = fields["text"]
+
+    if kind == "jd":
+        return JD(
+            file_path=web_path,
+            uploaded_by=meta.get("uploaded_by") or defaults.get("uploaded_by", "bulk"),
+            project_code=meta.get("project_code") or defaults.get("project_code", "GENERIC"),
+            job_title=meta.get("job_title") or stem.replace("_", " "),
+            extracted_text=text
+        )
+    if kind == "resume":
+        return Resume(
+            name=meta.get("name") or fields.get("name") or stem,
+            email=meta.get("email") or fields.get("email"),
+            file_path=web_path,
+            extracted_text=text
+        )
+    return Profile(
+        emp_id=meta.get("emp_id") or stem,
+        name=meta.get("name") or fields.get("name") or stem,
+        email=meta.get("email") or fields.get("email") or "",
+        vertical=meta.get("vertical") or defaults.get("vertical", "N/A"),
+        skills=meta.get("skills") or fields["skills"],
+        experience_years=_float_or(meta.get("experience_years"), fields["experience_years"]),
+        resume_path=web_path,
+        extracted_text=text
+    )
+
+
+def ingest(app, kind, source, defaults=None, workers=EXTRACT_WORKERS, batch_size=EMBED_BATCH_SIZE):
+    """
+    Ingest every document under `source` (zip or directory). Needs an app context.
+    Returns a report with per-stage timings and documents/second.
+    """
+    if kind not in BULK_KINDS:
+        raise ValueError(f"kind must be one of {BULK_KINDS}")
+    defaults = defaults or {}
+    start = time.time()
+    timings = {}
+
+    paths, skipped, manifest = collect_files(source, kind)
+    logger.info(f"📦 Bulk {kind} ingest: {len(paths)} files ({len(skipped)} unsupported skipped)")
+
+    # ── 1. parallel text extraction (files already seen, by content hash, are not parsed again) ──
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        hashes = list(pool.map(file_hash, paths))
+        cached = get_cached_extractions(hashes)
+        misses = {}
+        for path, content_hash in zip(paths, hashes):
+            if content_hash not in cached and content_hash not in misses:
+                misses[content_hash] = path
+        parsed = dict(zip(misses, pool.map(_parse_one, misses.values())))
+        store_extractions({h: e for h, e in parsed.items() if e},
+                          {h: os.path.getsize(p) for h, p in misses.items()})
+        entries = [cached.get(h) or parsed.get(h) for h in hashes]
+    timings["extract"] = round(time.time() - t0, 3)
+
+    # ── names/emails for people, one batched spaCy pass ──
+    t0 = time.time()
+    readable = [e for e in entries if e]
+    infos = iter(extract_basic_info_batch([e["text"] for e in readable]) if kind != "jd" else [None] * len(readable))
+    extracted = [_row_fields(kind, e, next(infos)) if e else None for e in entries]
+    timings["names"] = round(time.time() - t0, 3)
+    cache_hits = sum(1 for h in hashes if h in cached)
+
+    docs = [(path, fields) for path, fields in zip(paths, extracted) if fields]
+    failed = [os.path.basename(path) for path, fields in zip(paths, extracted) if not fields]
+
+    # ── 2. batched embeddings ──
+    t0 = time.time()
+    embeddings = generate_embeddings([fields["text"] for _, fields in docs], batch_size=batch_size)
+    timings["embed"] = round(time.time() - t0, 3)
+
+    # ── 3. one transaction for every row ──
+    t0 = time.time()
+    rows, row_fields = {}, {}
+    for (path, fields), embedding in zip(docs, embeddings):
+        row = _build_row(kind, path, fields, manifest.get(os.path.basename(path), {}), defaults)
+        row.embedding = embedding
+        # Profiles are unique per emp_id: the last file for an employee wins
+        key = row.emp_id if kind == "profile" else path
+        rows[key], row_fields[key] = row, fields
+
+    replaced = []
+    try:
+        if kind == "profile" and rows:
+            replaced = delete_profiles(Profile.query.filter(Profile.emp_id.in_(list(rows))).all())
+        db.session.add_all(rows.values())
+        db.session.flush()
+
+        delete_features(kind, replaced, commit=False)
+        for key, row in rows.items():
+            # manifest skills (profiles) win over the extracted ones
+            skills = row.skills if kind == "profile" else row_fields[key]["extracted_skills"]
+            years = row.experience_years if kind == "profile" else None
+            save_features(kind, row.id, compute_features(row.extracted_text, skills, years),
+                          commit=False, is_new=True)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    timings["write"] = round(time.time() - t0, 3)
+
+    # ── 4. indexes, updated once for the whole batch ──
+    t0 = time.time()
+    try:
+        for doc_id in replaced:
+            unindex_document(kind, doc_id)
+            unindex_text(kind, doc_id)
+        index_documents(kind, [(row.id, row.embedding) for row in rows.values()])
+        index_texts(app, kind, [(row.id, row.extracted_text) for row in rows.values()])
+    except Exception as e:
+        logger.error(f"Bulk {kind} indexing failed: {e}")
+    timings["index"] = round(time.time() - t0, 3)
+    if kind == "profile" and rows:
+        schedule_reverse_match(app, [row.id for row in rows.values()])
+
+    total = time.time() - start
+    timings["total"] = round(total, 3)
+    report = {
+        "kind": kind,
+        "files": len(paths),
+        "ingested": len(rows),
+        "replaced": len(replaced),
+        "extraction_cache_hits": cache_hits,
+        "unreadable": failed,
+        "skipped": skipped,
+        "ids": [row.id for row in rows.values()],
+        "timings": timings,
+        "docs_per_sec": round(len(rows) / total, 2) if total > 0 else None,
+    }
+    logger.info(f"✅ Bulk {kind} ingest: {len(rows)} documents in {timings['total']}s "
+                f"({report['docs_per_sec']} docs/s)")
+    return report
@@ -0,0 +1,55 @@
+import os
+import time
+import threading
+from flask import current_app as app
+from models import Config
+
+# ──────────────────────────────
+# Process-wide snapshot of the Config table.
+# Loaded with one query, reused until a local write invalidates it or the TTL
+# expires (the TTL bounds how long other workers can serve a stale value).
+# ──────────────────────────────
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL_SECONDS", "30"))
+
+_lock = threading.Lock()
+_state = {"values": None, "loaded_at": 0.0, "version": 0, "derived": {}}
+
+
+def _reload():
+    with app.app_context():
+        values = {conf.key: conf.value for conf in Config.query.all()}
+    _state["values"] = values
+    _state["loaded_at"] = time.monotonic()
+    _state["version"] += 1
+    _state["derived"] = {}
+    return values
+
+
+def get_config_snapshot():
+    """All config values as a dict; hits the DB at most once per TTL."""
+    with _lock:
+        if _state["values"] is None or time.monotonic() - _state["loaded_at"] > CONFIG_CACHE_TTL:
+            return _reload()
+        return _state["values"]
+
+
+def get_derived(name, build):
+    """Memoize `build(values)` against the current snapshot (e.g. the parsed GenAI config)."""
+    values = get_config_snapshot()
+    with _lock:
+        derived = _state["derived"]
+        if name not in derived:
+            derived[name] = build(values)
+        return derived[name]
+
+
+def invalidate_config_cache():
+    """Call after any write to the Config table."""
+    with _lock:
+        _state["values"] = None
+        _state["derived"] = {}
+
+
+def config_cache_version():
+    with _lock:
+        return _state["version"]
@@ -0,0 +1,88 @@
+import os
+from sqlalchemy import event
+from models import db
+from utils.logger import logger
+
+# ──────────────────────────────
+# Database backend selection and tuning.
+# DATABASE_URL picks the backend (default: the bundled SQLite file).
+#   SQLite     – WAL journal, busy timeout, mmap and synchronous=NORMAL on every
+#                connection, so readers never block the writer and writers wait
+#                instead of failing with "database is locked".
+#   PostgreSQL – pooled connections (size, overflow, recycle, pre-ping).
+# ──────────────────────────────
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(BACKEND_DIR, 'match_results.db')
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def database_url():
+    url = os.getenv("DATABASE_URL") or DEFAULT_DATABASE_URL
+    if url.startswith("postgres://"):   # Heroku-style URLs
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the backend in `url`."""
+    if url.startswith("sqlite"):
+        return {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    finally:
+        cursor.close()
+
+
+def init_database(app, url=None, tune=True):
+    """
+    Configure `app` for DATABASE_URL (or `url`), bind db to it and apply backend tuning
+    (tune=False keeps driver defaults, for comparisons in db_load_test.py).
+    """
+    url = url or database_url()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    options = engine_options(url) if tune else {}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+        if tune and engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _sqlite_pragmas)
+        logger.info(f"🗄️ Database: {engine.dialect.name} ({engine.url.render_as_string(hide_password=True)})")
+    return app
+
+
+def database_info():
+    """Backend, pool and (for SQLite) effective pragma values."""
+    engine = db.engine
+    info = {"dialect": engine.dialect.name, "url": engine.url.render_as_string(hide_password=True),
+            "pool": engine.pool.status()}
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            info["pragmas"] = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                               for name in ("journal_mode", "busy_timeout", "synchronous", "mmap_size")}
+    return info
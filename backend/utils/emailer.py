@@ -2,7 +2,9 @@ import smtplib
 from email.message import EmailMessage
 import os
 from utils.logger import logger  # ✅ Add logger
+from utils.latency_metrics import timed
  
+@timed("email")
 def send_email_with_attachments(subject, to_email, cc_list, html_body, attachments):
     from email.message import EmailMessage
     import smtplib
@@ -1,14 +1,27 @@
-from sentence_transformers import SentenceTransformer
-import json
-
-# Load the model once
-model = SentenceTransformer("all-MiniLM-L6-v2")
+import numpy as np
+from utils.model_registry import get_model
+from utils.latency_metrics import timed
 
+@timed("embedding")
 def generate_embedding(text):
     """
-    Generate JSON-serializable embedding for a given text.
+    Generate a float32 embedding for a given text (store it via `obj.embedding = ...`).
     """
     if not text or len(text.strip()) == 0:
         return None
-    embedding = model.encode(text).tolist()  # Convert to list so it can be stored as JSON
-    return json.dumps(embedding)
+    return np.asarray(get_model().encode(text), dtype=np.float32)
+
+
+@timed("embedding")
+def generate_embeddings(texts, batch_size=64):
+    """
+    Encode many texts in batches; returns a list aligned with `texts` (None for empty ones).
+    """
+    rows = [i for i, t in enumerate(texts) if t and t.strip()]
+    out = [None] * len(texts)
+    if not rows:
+        return out
+    vectors = np.asarray(get_model().encode([texts[i] for i in rows], batch_size=batch_size), dtype=np.float32)
+    for i, vec in zip(rows, vectors):
+        out[i] = vec
+    return out
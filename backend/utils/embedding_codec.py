@@ -0,0 +1,121 @@
+import os
+import json
+import struct
+import numpy as np
+
+# ──────────────────────────────
+# Packed embedding blob layout
+#   4-byte header: magic 'E', dtype code, flags, reserved
+#   int8 only:     float32 scale
+#   payload:       raw little-endian vector
+# Header sizes keep the payload 4-byte aligned so float32 views are zero-copy.
+# ──────────────────────────────
+MAGIC = ord("E")
+DTYPES = {"float32": 0, "float16": 1, "int8": 2}
+DTYPE_CODES = {code: name for name, code in DTYPES.items()}
+FLAG_NORMALIZED = 0x01
+
+DEFAULT_DTYPE = os.getenv("EMBEDDING_STORAGE_DTYPE", "float32").lower()
+DEFAULT_NORMALIZE = os.getenv("EMBEDDING_NORMALIZE", "true").lower() == "true"
+
+
+def pack_embedding(vec, dtype=None, normalize=None):
+    """Pack a vector into a compact binary blob (float32, float16 or int8)."""
+    if vec is None:
+        return None
+    dtype = (dtype or DEFAULT_DTYPE).lower()
+    normalize = DEFAULT_NORMALIZE if normalize is None else normalize
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported embedding dtype '{dtype}', expected one of {list(DTYPES)}")
+
+    arr = np.asarray(vec, dtype=np.float32).ravel()
+    flags = 0
+    if normalize:
+        norm = np.linalg.norm(arr)
+        if norm:
+            arr = arr / norm
+        flags |= FLAG_NORMALIZED
+
+    header = struct.pack("<BBBB", MAGIC, DTYPES[dtype], flags, 0)
+    if dtype == "float32":
+        return header + arr.astype("<f4").tobytes()
+    if dtype == "float16":
+        return header + arr.astype("<f2").tobytes()
+
+    scale = float(np.abs(arr).max()) / 127.0 or 1.0
+    quantized = np.clip(np.round(arr / scale), -127, 127).astype(np.int8)
+    return header + struct.pack("<f", scale) + quantized.tobytes()
+
+
+def _read_header(blob):
+    magic, code, flags, _ = struct.unpack_from("<BBBB", blob, 0)
+    if magic != MAGIC or code not in DTYPE_CODES:
+        raise ValueError("Not a packed embedding blob")
+    return DTYPE_CODES[code], flags
+
+
+def embedding_view(blob):
+    """
+    Zero-copy NumPy view over the stored payload, in its stored dtype.
+    Returns (view, scale); scale is None unless the blob is int8-quantized.
+    """
+    dtype, _ = _read_header(blob)
+    if dtype == "float32":
+        return np.frombuffer(blob, dtype="<f4", offset=4), None
+    if dtype == "float16":
+        return np.frombuffer(blob, dtype="<f2", offset=4), None
+    scale = struct.unpack_from("<f", blob, 4)[0]
+    return np.frombuffer(blob, dtype=np.int8, offset=8), scale
+
+
+def unpack_embedding(blob):
+    """
+    Decode a blob into float32. float32 blobs come back as a read-only view
+    without copying; float16/int8 blobs are dequantized.
+    """
+    if not blob:
+        return None
+    view, scale = embedding_view(blob)
+    if view.dtype == np.float32:
+        return view
+    if scale is None:
+        return view.astype(np.float32)
+    return view.astype(np.float32) * np.float32(scale)
+
+
+def is_normalized(blob):
+    return bool(_read_header(blob)[1] & FLAG_NORMALIZED)
+
+
+def decode_legacy_json(value):
+    """Decode a legacy JSON text embedding (handles the old double-encoded form)."""
+    if not value:
+        return None
+    vec = json.loads(value)
+    if isinstance(vec, str):
+        vec = json.loads(vec)
+    return np.asarray(vec, dtype=np.float32) if vec else None
+
+
+def decode_stored_embedding(blob, legacy_json=None):
+    """Prefer the packed blob, fall back to the legacy JSON column for unmigrated rows."""
+    if blob:
+        return unpack_embedding(blob)
+    try:
+        return decode_legacy_json(legacy_json)
+    except ValueError:
+        return None
+
+
+# ──────────────────────────────
+# Model mixin: `.embedding` reads/writes the packed blob
+# ──────────────────────────────
+class EmbeddingMixin:
+    @property
+    def embedding(self):
+        return decode_stored_embedding(self.embedding_blob, self.embedding_vector)
+
+    @embedding.setter
+    def embedding(self, vec):
+        self.embedding_blob = pack_embedding(vec)
+        self.embedding_vector = None
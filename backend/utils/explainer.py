@@ -1,33 +1,32 @@
 import re
-import cohere
-from sentence_transformers import SentenceTransformer, util
-from utils.skill_extractor import extract_skills, categorize_skills
-from utils.parser import extract_experience
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from utils.feature_store import compute_features
 from utils.utils import log_agent_error
-from models import Config
-from flask import current_app as app
+from utils.skill_embeddings import skill_matrix
+from utils.genai_client import get_genai_client
+from utils.explanation_cache import cache_key, get_cached_summaries, store_summaries
+from utils.config_cache import get_derived
+from utils.latency_metrics import timed
+from utils.logger import logger
 
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
 MAX_SUMMARY_CHARS = 2000  # To avoid DB issues
 
 
-def semantic_skill_score(jd_skills, resume_skills, threshold=0.75):
+def semantic_skill_score(jd_skills, resume_skills, threshold=0.75, jd_rows=None, resume_rows=None):
     if not jd_skills or not resume_skills:
         return [], 0.0
-    jd_emb = model.encode(jd_skills, convert_to_tensor=True)
-    res_emb = model.encode(resume_skills, convert_to_tensor=True)
-
-    matched = []
-    used_resume_indices = set()
-    for i, jd_vec in enumerate(jd_emb):
-        scores = util.pytorch_cos_sim(jd_vec, res_emb)[0]
-        sorted_scores = [(j, float(score)) for j, score in enumerate(scores)]
-        for j, score in sorted(sorted_scores, key=lambda x: x[1], reverse=True):
-            if score >= threshold and j not in used_resume_indices:
-                matched.append((jd_skills[i], resume_skills[j], round(score, 2)))
-                used_resume_indices.add(j)
-                break
+    # Cached skill vectors are unit length, so one matrix product gives all cosines
+    scores = skill_matrix(jd_skills, jd_rows) @ skill_matrix(resume_skills, resume_rows).T
+
+    # One-to-one assignment maximizing total similarity over pairs above threshold
+    eligible = np.where(scores >= threshold, scores, 0.0)
+    rows, cols = linear_sum_assignment(eligible, maximize=True)
+    keep = scores[rows, cols] >= threshold
+    matched = [(jd_skills[i], resume_skills[j], round(float(scores[i, j]), 2))
+               for i, j in zip(rows[keep], cols[keep])]
+
     ratio = len(matched) / max(len(jd_skills), 1)
     return matched, round(ratio, 2)
 
@@ -44,42 +43,100 @@ def extract_sentences_with_keywords(text, keywords):
     return found[:5]
 
 
+GENAI_NUMERIC_KEYS = {
+    "genai_rps": ("rps", float),
+    "genai_tokens_per_minute": ("tokens_per_minute", int),
+    "genai_timeout": ("timeout", float),
+    "genai_max_retries": ("max_retries", int),
+    "genai_concurrency": ("concurrency", int),
+}
+
+
+def _parse_genai_config(values):
+    config = {
+        "provider": (values.get("genai_provider") or "").strip().lower(),
+        "api_key": (values.get("genai_key") or "").strip(),
+        "enabled": (values.get("genai_enabled") or "false").strip().lower() == "true",
+        "prompt": (values.get("genai_prompt") or "").strip()
+    }
+
+    # Client limits; anything missing or malformed keeps the client default
+    for key, (name, cast) in GENAI_NUMERIC_KEYS.items():
+        if key in values:
+            try:
+                config[name] = cast(values[key])
+            except (TypeError, ValueError):
+                pass
+    return config
+
+
 def fetch_genai_config():
-    """Fetch GenAI config values safely inside app context."""
-    with app.app_context():
-        provider_cfg = Config.query.filter_by(key="genai_provider").first()
-        key_cfg = Config.query.filter_by(key="genai_key").first()
-        enabled_cfg = Config.query.filter_by(key="genai_enabled").first()
-        prompt_cfg = Config.query.filter_by(key="genai_prompt").first()
+    """GenAI config from the process-wide config snapshot (no DB query on the hot path)."""
+    return dict(get_derived("genai", _parse_genai_config))
+
+
+def build_genai_prompt(instruction, jd_text, resume_text):
+    return f"""
+You are an expert AI recruiter. Follow the instruction below and analyze the candidate's resume in relation to the job description.
 
-        return {
-            "provider": (provider_cfg.value or "").strip().lower() if provider_cfg else "",
-            "api_key": (key_cfg.value or "").strip() if key_cfg else "",
-            "enabled": (enabled_cfg.value or "false").strip().lower() == "true" if enabled_cfg else False,
-            "prompt": (prompt_cfg.value or "").strip() if prompt_cfg else ""
-        }
+📌 Instruction:
+{(instruction or "").strip()}
+
+📄 Job Description:
+{jd_text[:1500]}
 
+👤 Resume:
+{resume_text[:1500]}
+""".strip()
+
+
+def _apply_genai_result(explanation, client, result):
+    if isinstance(result, Exception):
+        # Provider down, circuit open or retries exhausted: keep the SBERT explanation
+        log_agent_error("GenAIExplanationError", str(result), method="generate_explanation")
+        explanation["gpt_summary"] = f"⚠️ GenAI failed: {result}"
+        explanation["source"] = "SBERT"
+    elif result:
+        explanation["gpt_summary"] = result[:MAX_SUMMARY_CHARS]
+        explanation["source"] = client.provider.name.capitalize()
+    else:
+        explanation["gpt_summary"] = f"⚠️ {client.provider.name.capitalize()} returned no content"
+        explanation["source"] = client.provider.name.capitalize()
+    return explanation
 
-def generate_explanation(jd_text, resume_text, use_gpt=False):
-    print("✅ generate_explanation called")
 
-    jd_skills = extract_skills(jd_text)
-    resume_skills = extract_skills(resume_text)
+def _years(value):
+    value = value or 0
+    return int(value) if float(value).is_integer() else value
+
+
+@timed("explanation")
+def build_explanation(jd_text, resume_text, jd_features=None, resume_features=None):
+    """
+    SBERT/skill-based explanation: cheap, local, no network.
+    Stored features (utils/feature_store.py) are used when given instead of re-running extraction.
+    """
+    jd_features = jd_features or compute_features(jd_text)
+    resume_features = resume_features or compute_features(resume_text)
+    jd_skills = jd_features["skills"]
+    resume_skills = resume_features["skills"]
 
     jd_set = set(jd_skills)
     resume_set = set(resume_skills)
 
     exact_match = sorted(jd_set & resume_set)
     missing = sorted(jd_set - resume_set)
-    semantic_pairs, semantic_ratio = semantic_skill_score(jd_skills, resume_skills)
+    semantic_pairs, semantic_ratio = semantic_skill_score(jd_skills, resume_skills,
+                                                          jd_rows=jd_features.get("skill_ids"),
+                                                          resume_rows=resume_features.get("skill_ids"))
     highlights = extract_sentences_with_keywords(resume_text, exact_match)
-    categorized = categorize_skills(list(resume_set))
+    categorized = resume_features["skill_categories"]
 
-    jd_exp = extract_experience(jd_text)
-    res_exp = extract_experience(resume_text)
+    jd_exp = _years(jd_features["experience_years"])
+    res_exp = _years(resume_features["experience_years"])
     exp_match = abs(jd_exp - res_exp) <= 1
 
-    explanation = {
+    return {
         "summary": f"{len(exact_match)} exact, {len(semantic_pairs)} semantic matches. "
                    f"Experience: {res_exp} vs {jd_exp} yrs — {'✅ OK' if exp_match else '⚠️ Mismatch'}",
         "skills_matched": exact_match[:15],
@@ -93,46 +150,69 @@ def generate_explanation(jd_text, resume_text, use_gpt=False):
         "source": "SBERT"
     }
 
-    try:
-        config = fetch_genai_config()
-        print(f"🔍 GenAI Config — Enabled: {config['enabled']}, Provider: {config['provider']}, Key present: {bool(config['api_key'])}")
-
-        if use_gpt and config["enabled"] and config["provider"] == "cohere" and config["api_key"]:
-            print("💡 Using Cohere for explanation")
-            co = cohere.Client(config["api_key"])
 
-            instruction = (config["prompt"] or "").strip()
+def add_genai_summary(explanation, jd_text, resume_text):
+    """Attach an LLM summary (`gpt_summary`) to an explanation when GenAI is configured."""
+    return add_genai_summaries([(explanation, jd_text, resume_text)])[0]
 
-            final_prompt = f"""
-You are an expert AI recruiter. Follow the instruction below and analyze the candidate's resume in relation to the job description.
-
-📌 Instruction:
-{instruction}
-
-📄 Job Description:
-{jd_text[:1500]}
 
-👤 Resume:
-{resume_text[:1500]}
-""".strip()
-
-            response = co.chat(message=final_prompt, model="command-r")
-
-            if hasattr(response, "text") and response.text.strip():
-                explanation["gpt_summary"] = response.text.strip()[:MAX_SUMMARY_CHARS]
-                explanation["source"] = "Cohere"
-            else:
-                explanation["gpt_summary"] = "⚠️ Cohere returned no content"
-                explanation["source"] = "Cohere"
-        else:
-            print("⚠️ GenAI is disabled or skipped, fallback to SBERT only")
+def add_genai_summaries(items):
+    """
+    Attach LLM summaries to several explanations at once.
+    `items` is a list of (explanation, jd_text, resume_text); requests run concurrently
+    through the shared, rate-limited client.
+    """
+    explanations = [explanation for explanation, _, _ in items]
+    try:
+        config = fetch_genai_config()
+        client = get_genai_client(config)
+        logger.debug(f"🔍 GenAI Config — Enabled: {config['enabled']}, Provider: {config['provider']}, Key present: {bool(config['api_key'])}")
+        if client is None:
+            logger.debug("⚠️ GenAI is disabled or skipped, fallback to SBERT only")
+            return explanations
+
+        # Identical JD/resume/prompt/model inputs are answered from the cache
+        provider, model = client.provider.name, client.model
+        keys = [cache_key(jd_text, resume_text, config["prompt"], provider, model) for _, jd_text, resume_text in items]
+        cached = get_cached_summaries(keys)
+        todo = [i for i, key in enumerate(keys) if key not in cached]
+
+        logger.debug(f"💡 Using {provider} for {len(todo)} explanation(s), {len(items) - len(todo)} cached")
+        prompts = [build_genai_prompt(config["prompt"], items[i][1], items[i][2]) for i in todo]
+        results = dict(zip(todo, client.generate_many(prompts))) if todo else {}
+
+        fresh = {}
+        for i, (explanation, key) in enumerate(zip(explanations, keys)):
+            result = cached.get(key) if key in cached else results[i]
+            _apply_genai_result(explanation, client, result)
+            if i in results and isinstance(result, str) and result:
+                fresh[key] = result[:MAX_SUMMARY_CHARS]
+        store_summaries(fresh, provider, model)
 
     except Exception as e:
         log_agent_error("GenAIExplanationError", str(e), method="generate_explanation")
-        explanation["gpt_summary"] = f"⚠️ GenAI failed: {e}"
-        explanation["source"] = "SBERT"
-
+        for explanation in explanations:
+            explanation["gpt_summary"] = f"⚠️ GenAI failed: {e}"
+            explanation["source"] = "SBERT"
+
+    return explanations
+
+
+def add_local_summary(explanation):
+    """Offline stand-in for the LLM summary, built from the SBERT explanation."""
+    matched = ", ".join(explanation["skills_matched"][:5]) or "no listed skills"
+    missing = ", ".join(explanation["skills_missing"][:5]) or "none"
+    explanation["gpt_summary"] = (
+        f"Candidate covers {matched}. Gaps: {missing}. "
+        f"Experience {explanation['experience_years_resume']} vs "
+        f"{explanation['experience_years_jd']} yrs required."
+    )[:MAX_SUMMARY_CHARS]
+    explanation["source"] = "Local"
     return explanation
 
 
-    
\ No newline at end of file
+def generate_explanation(jd_text, resume_text, use_gpt=False, jd_features=None, resume_features=None):
+    explanation = build_explanation(jd_text, resume_text, jd_features, resume_features)
+    if use_gpt:
+        add_genai_summary(explanation, jd_text, resume_text)
+    return explanation
@@ -0,0 +1,114 @@
+import os
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from models import db, ExplanationCache
+from utils.logger import logger
+
+# ──────────────────────────────
+# Persistent, content-addressed cache of LLM summaries
+# ──────────────────────────────
+CACHE_TTL_HOURS = float(os.getenv("EXPLANATION_CACHE_TTL_HOURS", "720"))
+CACHE_MAX_ENTRIES = int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "50000"))
+EVICT_EVERY_N_WRITES = 100
+TEXT_LIMIT = 1500   # same truncation the prompt uses
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+
+def _bump(key, n=1):
+    with _lock:
+        _counters[key] += n
+
+
+def cache_key(jd_text, resume_text, instruction, provider, model):
+    h = hashlib.sha256()
+    for part in (jd_text[:TEXT_LIMIT], resume_text[:TEXT_LIMIT], (instruction or "").strip(), provider, model):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def get_cached_summaries(keys):
+    """Return {key: summary} for every key cached and not expired; counts hits/misses."""
+    if not keys:
+        return {}
+    cutoff = datetime.utcnow() - timedelta(hours=CACHE_TTL_HOURS)
+    rows = ExplanationCache.query.filter(
+        ExplanationCache.key.in_(set(keys)),
+        ExplanationCache.created_at >= cutoff
+    ).all()
+    found = {row.key: row.summary for row in rows}
+
+    if rows:
+        now = datetime.utcnow()
+        for row in rows:
+            row.hits = (row.hits or 0) + 1
+            row.last_used_at = now
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    hits = sum(1 for k in keys if k in found)
+    _bump("hits", hits)
+    _bump("misses", len(keys) - hits)
+    return found
+
+
+def store_summaries(entries, provider, model):
+    """Persist {key: summary}; runs TTL/size eviction every EVICT_EVERY_N_WRITES writes."""
+    if not entries:
+        return
+    try:
+        for key, summary in entries.items():
+            db.session.merge(ExplanationCache(
+                key=key, provider=provider, model=model, summary=summary,
+                hits=0, created_at=datetime.utcnow(), last_used_at=datetime.utcnow()
+            ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Explanation cache write failed: {e}")
+        return
+
+    with _lock:
+        before = _counters["writes"]
+        _counters["writes"] += len(entries)
+        due = before // EVICT_EVERY_N_WRITES != _counters["writes"] // EVICT_EVERY_N_WRITES
+    if due:
+        evict()
+
+
+def evict():
+    """Drop expired entries, then the least recently used ones beyond CACHE_MAX_ENTRIES."""
+    try:
+        cutoff = datetime.utcnow() - timedelta(hours=CACHE_TTL_HOURS)
+        removed = ExplanationCache.query.filter(ExplanationCache.created_at < cutoff).delete(synchronize_session=False)
+
+        overflow = ExplanationCache.query.count() - CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale = (db.session.query(ExplanationCache.key)
+                     .order_by(ExplanationCache.last_used_at.asc())
+                     .limit(overflow)
+                     .subquery())
+            removed += ExplanationCache.query.filter(ExplanationCache.key.in_(db.select(stale.c.key))) \
+                .delete(synchronize_session=False)
+        db.session.commit()
+        _bump("evicted", removed)
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Explanation cache eviction failed: {e}")
+
+
+def explanation_cache_stats():
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["misses"]
+    return dict(
+        counters,
+        hit_rate=round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        entries=ExplanationCache.query.count(),
+        lifetime_hits=int(db.session.query(db.func.coalesce(db.func.sum(ExplanationCache.hits), 0)).scalar()),
+    )
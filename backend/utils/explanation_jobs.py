@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import uuid
+from models import db, ExplanationJob, MatchResult
+from utils.background import submit
+from utils.explainer import add_genai_summary, add_local_summary
+from utils.utils import log_agent_error
+from utils.logger import logger
+
+# 'genai' calls the configured provider; 'local' builds the summary offline (no network)
+EXPLANATION_WORKER_MODE = os.getenv("EXPLANATION_WORKER_MODE", "genai").lower()
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def enqueue_explanations(app, jd_id, match_type, items, mode=None):
+    """
+    Queue LLM summaries for already-stored matches.
+    `items` is a list of (match_result_id, jd_text, resume_text). Returns the job id.
+    """
+    job = ExplanationJob(
+        id=uuid.uuid4().hex,
+        jd_id=jd_id,
+        match_type=match_type,
+        match_ids=json.dumps([match_id for match_id, _, _ in items]),
+        mode=mode or EXPLANATION_WORKER_MODE,
+        status="queued" if items else "completed",
+        total=len(items),
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    for match_id, jd_text, resume_text in items:
+        submit(app, _explain_one, job.id, job.mode, match_id, jd_text, resume_text)
+    logger.info(f"Explanation job {job.id} queued with {len(items)} items ({job.mode})")
+    return job.id
+
+
+def _explain_one(job_id, mode, match_id, jd_text, resume_text):
+    db.session.query(ExplanationJob).filter_by(id=job_id, status="queued").update({"status": "running"})
+    db.session.commit()
+
+    ok, original = True, None
+    try:
+        match = MatchResult.query.get(match_id)
+        if match is None:
+            logger.info(f"Explanation job {job_id}: match {match_id} no longer exists, skipped")
+        else:
+            original = match.explanation
+            explanation = json.loads(original or "{}")
+            previous_latency, method = match.explanation_latency, match.method
+            db.session.commit()   # don't hold a transaction open across the LLM call
+
+            start = time.time()
+            if mode == "local":
+                add_local_summary(explanation)
+            else:
+                add_genai_summary(explanation, jd_text, resume_text)
+            explanation["explanation_status"] = DONE
+
+            # Write only if the row still holds the explanation we started from: a re-match
+            # that upserted it meanwhile carries a newer score/explanation and its own job.
+            updated = _update_if_unchanged(match_id, original, {
+                "explanation": json.dumps(explanation),
+                "method": explanation.get("source", method),
+                "explanation_latency": round((previous_latency or 0.0) + time.time() - start, 4),
+            })
+            db.session.commit()
+            if not updated:
+                logger.info(f"Explanation job {job_id}: match {match_id} changed during the summary, not overwritten")
+    except Exception as e:
+        ok = False
+        db.session.rollback()
+        log_agent_error("ExplanationJobError", f"job {job_id}, match {match_id}: {e}", method="explanation-job")
+        _mark_failed(match_id, original)
+
+    counter = ExplanationJob.completed if ok else ExplanationJob.failed
+    db.session.query(ExplanationJob).filter_by(id=job_id).update({counter: counter + 1})
+    db.session.commit()
+
+    job = ExplanationJob.query.get(job_id)
+    if job.completed + job.failed >= job.total:
+        job.status = "completed"
+        db.session.commit()
+
+
+def _update_if_unchanged(match_id, original, values):
+    """Compare-and-set on the stored explanation text. Returns True if the row was updated."""
+    stored = MatchResult.explanation.is_(None) if original is None else MatchResult.explanation == original
+    return db.session.query(MatchResult).filter(MatchResult.id == match_id, stored).update(
+        values, synchronize_session=False) > 0
+
+
+def _mark_failed(match_id, original):
+    if original is None:
+        return
+    try:
+        explanation = json.loads(original)
+        explanation["explanation_status"] = FAILED
+        _update_if_unchanged(match_id, original, {"explanation": json.dumps(explanation)})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+
+def job_snapshot(job_id):
+    """Job progress plus every item's current explanation, or None if unknown."""
+    db.session.expire_all()
+    job = ExplanationJob.query.get(job_id)
+    if not job:
+        return None
+
+    match_ids = json.loads(job.match_ids or "[]")
+    rows = {m.id: m for m in MatchResult.query.filter(MatchResult.id.in_(match_ids)).all()} if match_ids else {}
+    items = []
+    for match_id in match_ids:
+        match = rows.get(match_id)
+        explanation = json.loads(match.explanation or "{}") if match else {}
+        items.append({
+            "match_id": match_id,
+            "profile_id": match.profile_id if match else None,
+            "resume_id": match.resume_id if match else None,
+            "status": explanation.get("explanation_status", DONE),
+            "explanation": explanation,
+        })
+
+    return {
+        "job_id": job.id,
+        "jd_id": job.jd_id,
+        "match_type": job.match_type,
+        "mode": job.mode,
+        "status": job.status,
+        "total": job.total,
+        "completed": job.completed,
+        "failed": job.failed,
+        "items": items,
+    }
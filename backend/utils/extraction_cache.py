@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from models import db, ExtractionCache
+from utils.parser import extract_text, extract_experience
+from utils.skill_extractor import extract_skills
+from utils.logger import logger
+
+# ──────────────────────────────
+# Extraction results (text, skills, experience) cached once per unique file content.
+# The same PDF uploaded under several names is parsed only once.
+# ──────────────────────────────
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+UPLOAD_SUBDIRS = ("resumes", "jds")
+HASH_CHUNK_BYTES = 1024 * 1024
+
+_lock = threading.Lock()
+_counters = {"hits": 0, "misses": 0, "unreadable": 0, "missing_files": 0}
+
+
+def _bump(key, n=1):
+    with _lock:
+        _counters[key] += n
+
+
+def resolve_upload_path(path):
+    """
+    Map a stored path ('/uploads/resumes/x.pdf', relative or absolute) to a file on disk.
+    JDs were historically stored with a /uploads/resumes/ prefix while saved under
+    uploads/jds, so every upload folder is tried by file name as a fallback.
+    """
+    if not path:
+        return None
+    if os.path.isfile(path):
+        return path
+    relative = path.replace("\\", "/").lstrip("/")
+    candidate = os.path.join(BACKEND_DIR, relative)
+    if os.path.isfile(candidate):
+        return candidate
+    name = os.path.basename(relative)
+    for sub in UPLOAD_SUBDIRS:
+        candidate = os.path.join(BACKEND_DIR, "uploads", sub, name)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def analyze_text(text):
+    """The per-document fields cached alongside the text."""
+    return {"text": text, "skills": extract_skills(text), "experience": extract_experience(text)}
+
+
+def _entry(row):
+    return {
+        "text": row.extracted_text,
+        "skills": json.loads(row.skills or "[]"),
+        "experience": row.experience_years or 0,
+    }
+
+
+def get_cached_extractions(hashes):
+    """{hash: entry} for every cached hash; counts hits and misses."""
+    hashes = set(hashes)
+    if not hashes:
+        return {}
+    rows = ExtractionCache.query.filter(ExtractionCache.content_hash.in_(hashes)).all()
+    if rows:
+        now = datetime.utcnow()
+        for row in rows:
+            row.hits = (row.hits or 0) + 1
+            row.last_used_at = now
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+    _bump("hits", len(rows))
+    _bump("misses", len(hashes) - len(rows))
+    return {row.content_hash: _entry(row) for row in rows}
+
+
+def store_extractions(entries, sizes=None):
+    """Persist {hash: entry}; failures only cost a future re-parse."""
+    if not entries:
+        return
+    sizes = sizes or {}
+    try:
+        for content_hash, entry in entries.items():
+            db.session.merge(ExtractionCache(
+                content_hash=content_hash,
+                extracted_text=entry["text"],
+                skills=json.dumps(entry["skills"]),
+                experience_years=entry["experience"],
+                size_bytes=sizes.get(content_hash),
+                hits=0,
+                created_at=datetime.utcnow(),
+                last_used_at=datetime.utcnow()
+            ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Extraction cache write failed: {e}")
+
+
+def extract_with_cache(path, reject_when_busy=False):
+    """
+    {"text", "skills", "experience", "hash"} for a file (parsing it only on a cache miss), or None.
+    reject_when_busy is passed on to extract_text (upload requests).
+    """
+    resolved = resolve_upload_path(path)
+    if not resolved:
+        _bump("missing_files")
+        logger.warning(f"File not found for extraction: {path}")
+        return None
+
+    content_hash = file_hash(resolved)
+    entry = get_cached_extractions([content_hash]).get(content_hash)
+    if entry is None:
+        text = extract_text(resolved, reject_when_busy=reject_when_busy)
+        if not text:
+            _bump("unreadable")
+            return None
+        entry = analyze_text(text)
+        store_extractions({content_hash: entry}, {content_hash: os.path.getsize(resolved)})
+    return dict(entry, hash=content_hash)
+
+
+def cached_text(path):
+    entry = extract_with_cache(path)
+    return entry["text"] if entry else None
+
+
+def extraction_cache_stats():
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["misses"]
+    return dict(
+        counters,
+        hit_rate=round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        entries=ExtractionCache.query.count(),
+        lifetime_hits=int(db.session.query(db.func.coalesce(db.func.sum(ExtractionCache.hits), 0)).scalar()),
+    )
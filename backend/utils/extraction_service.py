@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from utils.latency_metrics import record as record_latency
+from utils.logger import logger
+
+# ──────────────────────────────
+# Document text extraction off the request thread.
+# Every file is parsed in its own child process (utils/extraction_worker.py) so
+# a hung or runaway PDF can be killed without touching other jobs. The child is
+# a fresh interpreter, not a fork of the web worker: that process is
+# multithreaded and holds SBERT/torch, which a forked child would inherit. The
+# child streams text page by page on stdout: if it times out, the pages read so
+# far are kept. A thread pool of EXTRACTION_WORKERS drivers caps concurrency.
+# Upload requests wait for their own file (the response carries the new row's
+# id), but are turned away at once with ExtractionBusy when more than
+# EXTRACTION_MAX_QUEUED files are already waiting, rather than sitting in the queue.
+# ──────────────────────────────
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "60"))
+EXTRACTION_QUEUE_TIMEOUT = float(os.getenv("EXTRACTION_QUEUE_TIMEOUT_SECONDS", "30"))
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", "1024"))   # heap/data limit per child
+EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", "200"))
+EXTRACTION_MAX_QUEUED = int(os.getenv("EXTRACTION_MAX_QUEUED", str(2 * EXTRACTION_WORKERS)))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_pool = ThreadPoolExecutor(max_workers=max(1, EXTRACTION_WORKERS), thread_name_prefix="extract")
+_lock = threading.Lock()
+_stats = {"ok": 0, "partial": 0, "timeout": 0, "error": 0, "crashed": 0, "rejected": 0,
+          "pages": 0, "in_flight": 0, "seconds": 0.0}
+
+
+class ExtractionBusy(Exception):
+    """Raised for requests that would have to queue behind EXTRACTION_MAX_QUEUED files."""
+
+
+def _bump(key, n=1):
+    with _lock:
+        _stats[key] += n
+
+
+# ──────────────────────────────
+# Driver (runs on the thread pool)
+# ──────────────────────────────
+def _read_messages(stream, messages):
+    for line in stream:
+        try:
+            messages.append(json.loads(line))
+        except ValueError:
+            continue
+
+
+def _run(path, timeout):
+    start = time.time()
+    _bump("in_flight")
+    messages, timed_out = [], False
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "utils.extraction_worker", os.path.abspath(path),
+             str(EXTRACTION_MEMORY_MB), str(EXTRACTION_MAX_PAGES)],
+            cwd=BACKEND_DIR, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8")
+        reader = threading.Thread(target=_read_messages, args=(proc.stdout, messages), daemon=True)
+        reader.start()
+        try:
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            proc.kill()
+            proc.wait()
+        reader.join()
+        proc.stdout.close()
+    finally:
+        _bump("in_flight", -1)
+
+    pages, status, detail = [], "crashed", None   # crashed: died (rlimit, segfault) without reporting
+    for kind, payload in messages:
+        if kind == "page":
+            pages.append(payload)
+        elif kind == "truncated":
+            logger.warning(f"Extraction of {path} stopped at {payload} pages")
+        elif kind == "done":
+            status = "ok"
+        elif kind == "error":
+            status, detail = "error", payload
+    if timed_out and status == "crashed":
+        status = "timeout"
+
+    if status in ("timeout", "crashed") and pages:
+        status = "partial"   # keep the pages that were streamed before the limit hit
+    _bump(status)
+    _bump("pages", len(pages))
+    _bump("seconds", time.time() - start)
+    record_latency("extraction", time.time() - start)
+    if status != "ok":
+        logger.warning(f"Extraction {status} for {path}" + (f": {detail}" if detail else ""))
+    return " ".join(pages) if pages and status in ("ok", "partial") else None
+
+
+# ──────────────────────────────
+# Public API
+# ──────────────────────────────
+def submit_extraction(path, timeout=None):
+    """Queue a file; the Future resolves to its raw text (or None)."""
+    return _pool.submit(_run, path, timeout or EXTRACTION_TIMEOUT)
+
+
+def extraction_busy():
+    return _pool._work_queue.qsize() >= EXTRACTION_MAX_QUEUED
+
+
+def extract_document(path, timeout=None, queue_timeout=None, reject_when_busy=False):
+    """
+    Raw text of one document, parsed in a child process. The caller waits at most
+    queue_timeout + timeout seconds; None if the file failed, timed out or was never started.
+    With reject_when_busy (request threads), a full queue or a queue wait that runs
+    out raises ExtractionBusy instead.
+    """
+    if reject_when_busy and extraction_busy():
+        _bump("rejected")
+        raise ExtractionBusy(f"{EXTRACTION_MAX_QUEUED} files already waiting for extraction")
+    timeout = timeout or EXTRACTION_TIMEOUT
+    queue_timeout = EXTRACTION_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+    future = submit_extraction(path, timeout)
+    try:
+        return future.result(timeout=queue_timeout + timeout + 1)
+    except FutureTimeout:
+        future.cancel()
+        _bump("rejected")
+        logger.warning(f"Extraction queue busy, gave up on {path}")
+        if reject_when_busy:
+            raise ExtractionBusy(f"extraction of {path} did not start within {queue_timeout}s")
+        return None
+
+
+def extract_documents(paths, timeout=None):
+    """Raw text for many files, extracted concurrently across all workers (bulk imports)."""
+    futures = [submit_extraction(path, timeout) for path in paths]
+    return [f.result() for f in futures]
+
+
+def extraction_stats():
+    with _lock:
+        stats = dict(_stats)
+    files = sum(stats[k] for k in ("ok", "partial", "timeout", "error", "crashed"))
+    stats["seconds"] = round(stats["seconds"], 3)
+    stats["avg_seconds"] = round(stats["seconds"] / files, 4) if files else 0.0
+    stats["queued"] = _pool._work_queue.qsize()
+    stats["settings"] = {
+        "workers": EXTRACTION_WORKERS,
+        "timeout": EXTRACTION_TIMEOUT,
+        "queue_timeout": EXTRACTION_QUEUE_TIMEOUT,
+        "max_queued": EXTRACTION_MAX_QUEUED,
+        "memory_mb": EXTRACTION_MEMORY_MB,
+        "max_pages": EXTRACTION_MAX_PAGES,
+    }
+    return stats
@@ -0,0 +1,66 @@
+"""
+Child process for utils/extraction_service: parses one document and streams its
+text page by page to stdout, one JSON message per line:
+
+    ["page", text] … ["truncated", pages] ["done", null]   or   ["error", message]
+
+    python -m utils.extraction_worker <path> <memory_mb> <max_pages>
+
+Runs in a fresh interpreter and imports nothing from the app, so it starts small
+whatever the web worker has loaded.
+"""
+import os
+import sys
+import json
+
+try:
+    import resource   # POSIX only; memory limits are skipped elsewhere
+except ImportError:
+    resource = None
+
+
+def _send(kind, payload=None):
+    sys.stdout.write(json.dumps([kind, payload]) + "\n")
+    sys.stdout.flush()
+
+
+def limit_memory(memory_mb):
+    """
+    Cap the data segment (heap and private anonymous mappings). RLIMIT_AS would
+    also count shared libraries and reserved address space, which says little
+    about how much the parser actually allocates.
+    """
+    limit_kind = getattr(resource, "RLIMIT_DATA", None) if resource else None
+    if limit_kind is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(limit_kind, (limit, limit))
+
+
+def extract(path, memory_mb, max_pages):
+    try:
+        limit_memory(memory_mb)
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".pdf":
+            import PyPDF2
+            with open(path, "rb") as f:
+                reader = PyPDF2.PdfReader(f)
+                for number, page in enumerate(reader.pages):
+                    if number >= max_pages:
+                        _send("truncated", number)
+                        break
+                    _send("page", page.extract_text() or "")
+        elif ext == ".docx":
+            import docx2txt
+            _send("page", docx2txt.process(path) or "")
+        else:
+            _send("error", f"Unsupported file extension {ext}")
+            return
+        _send("done")
+    except MemoryError:
+        _send("error", f"memory limit of {memory_mb} MB exceeded")
+    except Exception as e:
+        _send("error", str(e))
+
+
+if __name__ == "__main__":
+    extract(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
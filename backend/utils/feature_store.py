@@ -0,0 +1,120 @@
+import re
+import json
+from models import db, DocumentFeatures, JD, Profile, Resume
+from utils.skill_extractor import extract_skills, categorize_skills
+from utils.skill_embeddings import skill_id
+from utils.logger import logger
+
+# ──────────────────────────────
+# Per-document features computed once (at upload) and read everywhere else:
+# normalized skills, skill categories, skill-embedding table rows, experience.
+# Documents stored before the feature store existed are filled on first read.
+# ──────────────────────────────
+DOC_MODELS = {"jd": JD, "profile": Profile, "resume": Resume}
+EXPERIENCE_PATTERN = re.compile(r'(\d{1,2})\+?\s?(?:years?|yrs?)')
+
+
+def normalize_skills(skills):
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    return sorted({s.strip().lower() for s in skills or [] if s and s.strip()})
+
+
+def detect_experience(text):
+    """Years required/held, 0 for freshers, None when the text does not say."""
+    lower = (text or "").lower()
+    years = [int(m) for m in EXPERIENCE_PATTERN.findall(lower) if int(m) < 40]
+    if years:
+        return float(max(years))
+    return 0.0 if "fresher" in lower else None
+
+
+def compute_features(text, skills=None, experience_years=None):
+    """Feature dict for one document; pass known skills/experience to skip extracting them."""
+    skills = normalize_skills(skills if skills is not None else extract_skills(text or ""))
+    if experience_years is None:
+        experience_years = detect_experience(text)
+    return {
+        "skills": skills,
+        "skill_categories": categorize_skills(skills),
+        "skill_ids": [skill_id(s) for s in skills],
+        "experience_years": experience_years,
+    }
+
+
+def _as_dict(row):
+    return {
+        "skills": json.loads(row.skills or "[]"),
+        "skill_categories": json.loads(row.skill_categories or "{}"),
+        "skill_ids": json.loads(row.skill_ids or "[]"),
+        "experience_years": row.experience_years,
+    }
+
+
+def save_features(doc_type, doc_id, features, commit=True, is_new=False):
+    """Insert or replace the stored features of one document."""
+    row = None if is_new else DocumentFeatures.query.filter_by(doc_type=doc_type, doc_id=doc_id).first()
+    row = row or DocumentFeatures(doc_type=doc_type, doc_id=doc_id)
+    row.skills = json.dumps(features["skills"])
+    row.skill_categories = json.dumps(features["skill_categories"])
+    row.skill_ids = json.dumps(features["skill_ids"])
+    row.experience_years = features["experience_years"]
+    db.session.add(row)
+    if commit:
+        db.session.commit()
+    return features
+
+
+def store_document_features(doc_type, doc, text=None, skills=None, experience_years=None, commit=True):
+    """Compute and persist features for a freshly uploaded JD/profile/resume (never fails the upload)."""
+    try:
+        if doc_type == "profile":
+            skills = skills if skills is not None else (doc.skills or None)
+            experience_years = experience_years if experience_years is not None else doc.experience_years
+        features = compute_features(text or doc.extracted_text, skills, experience_years)
+        return save_features(doc_type, doc.id, features, commit=commit)
+    except Exception as e:
+        if commit:
+            db.session.rollback()
+        logger.error(f"Failed to store features for {doc_type} {doc.id}: {e}")
+        return None
+
+
+def delete_features(doc_type, doc_ids, commit=True):
+    if not doc_ids:
+        return
+    DocumentFeatures.query.filter(DocumentFeatures.doc_type == doc_type,
+                                  DocumentFeatures.doc_id.in_(list(doc_ids))).delete(synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
+def get_features(doc_type, doc_ids):
+    """{doc_id: features} with one query; documents without stored features are computed once and saved."""
+    doc_ids = list({int(i) for i in doc_ids})
+    if not doc_ids:
+        return {}
+    rows = DocumentFeatures.query.filter(DocumentFeatures.doc_type == doc_type,
+                                         DocumentFeatures.doc_id.in_(doc_ids)).all()
+    found = {row.doc_id: _as_dict(row) for row in rows}
+
+    missing = [i for i in doc_ids if i not in found]
+    if missing:
+        model = DOC_MODELS[doc_type]
+        try:
+            for doc in model.query.filter(model.id.in_(missing)).all():
+                skills = doc.skills if doc_type == "profile" and doc.skills else None
+                years = doc.experience_years if doc_type == "profile" else None
+                found[doc.id] = save_features(doc_type, doc.id,
+                                              compute_features(doc.extracted_text, skills, years),
+                                              commit=False, is_new=True)
+            db.session.commit()
+            logger.info(f"Backfilled features for {len(missing)} {doc_type} document(s)")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Feature backfill failed for {doc_type}: {e}")
+    return found
+
+
+def get_document_features(doc_type, doc_id):
+    return get_features(doc_type, [doc_id]).get(int(doc_id))
@@ -0,0 +1,256 @@
+import os
+import time
+import random
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from utils.latency_metrics import timed
+from utils.logger import logger
+
+# ──────────────────────────────
+# Defaults (overridable through Config keys genai_rps, genai_tokens_per_minute, ...)
+# ──────────────────────────────
+DEFAULT_SETTINGS = {
+    "rps": 2.0,
+    "tokens_per_minute": 40000,
+    "timeout": 30.0,
+    "max_retries": 3,
+    "concurrency": 4,
+}
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+EXPECTED_OUTPUT_TOKENS = 400
+
+
+class GenAIUnavailable(Exception):
+    """Raised when the provider cannot be used (circuit open or retries exhausted)."""
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+# ──────────────────────────────
+# Providers
+# ──────────────────────────────
+class CohereProvider:
+    name = "cohere"
+    model = "command-r"
+
+    def __init__(self, api_key, timeout):
+        import cohere
+        # One client per key: the underlying HTTP session keeps connections alive
+        self.client = cohere.Client(api_key=api_key, timeout=timeout)
+
+    def generate(self, prompt):
+        response = self.client.chat(message=prompt, model=self.model)
+        return (getattr(response, "text", "") or "").strip()
+
+
+class FakeProvider:
+    """Local stand-in for load testing: configurable latency and failure rate, no network."""
+    name = "fake"
+    model = "fake-1"
+
+    def __init__(self, latency=0.2, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def generate(self, prompt):
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.failure_rate:
+            raise ConnectionError("fake provider failure")
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"[fake summary {digest}] Candidate reviewed against the job description."
+
+
+PROVIDERS = {"cohere": CohereProvider, "fake": FakeProvider}
+
+
+# ──────────────────────────────
+# Rate limiting and circuit breaking
+# ──────────────────────────────
+class RateLimiter:
+    """Token bucket for requests/second plus a sliding 60s window for LLM tokens."""
+
+    def __init__(self, rps, tokens_per_minute):
+        self.rps = max(rps, 0.01)
+        self.capacity = max(1.0, self.rps)
+        self.tokens_per_minute = tokens_per_minute
+        self.available = self.capacity
+        self.last_refill = time.monotonic()
+        self.window = deque()   # (timestamp, tokens)
+        self.window_total = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.last_refill) * self.rps)
+                self.last_refill = now
+                while self.window and now - self.window[0][0] >= 60:
+                    self.window_total -= self.window.popleft()[1]
+
+                budget_ok = not self.tokens_per_minute or self.window_total + tokens <= self.tokens_per_minute \
+                    or not self.window
+                if self.available >= 1 and budget_ok:
+                    self.available -= 1
+                    self.window.append((now, tokens))
+                    self.window_total += tokens
+                    return
+                wait = (1 - self.available) / self.rps if self.available < 1 else \
+                    60 - (now - self.window[0][0])
+            if time.monotonic() + wait > deadline:
+                raise GenAIUnavailable("rate limit wait exceeded timeout")
+            time.sleep(max(wait, 0.01))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self):
+        with self.lock:
+            return self.state != "open"
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+# ──────────────────────────────
+# Client
+# ──────────────────────────────
+class GenAIClient:
+    def __init__(self, provider, settings):
+        self.provider = provider
+        self.settings = settings
+        self.limiter = RateLimiter(settings["rps"], settings["tokens_per_minute"])
+        self.breaker = CircuitBreaker()
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0}
+        self.pool = ThreadPoolExecutor(max_workers=int(settings["concurrency"]),
+                                       thread_name_prefix=f"genai-{provider.name}")
+        # generate_many fans out here: its tasks block on self.pool, so they cannot share it
+        self.batch_pool = ThreadPoolExecutor(max_workers=int(settings["concurrency"]),
+                                             thread_name_prefix=f"genai-{provider.name}-batch")
+        self.lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self.provider.model
+
+    def _bump(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def generate(self, prompt):
+        """One completion with rate limiting, per-call timeout, jittered retries and a circuit breaker."""
+        if not self.breaker.allow():
+            self._bump("short_circuited")
+            raise GenAIUnavailable(f"{self.provider.name} circuit open")
+
+        timeout = float(self.settings["timeout"])
+        tokens = estimate_tokens(prompt) + EXPECTED_OUTPUT_TOKENS
+        attempts = int(self.settings["max_retries"]) + 1
+        last_error = None
+
+        for attempt in range(attempts):
+            self.limiter.acquire(tokens, timeout)
+            self._bump("calls")
+            try:
+                future = self.pool.submit(self.provider.generate, prompt)
+                with timed("llm"):
+                    text = future.result(timeout=timeout)
+                self.breaker.record_success()
+                return text
+            except Exception as e:
+                last_error = e
+                self.breaker.record_failure()
+                if attempt + 1 >= attempts or not self.breaker.allow():
+                    break
+                self._bump("retries")
+                # Full jitter: sleep uniformly in [0, min(cap, base * 2^attempt)]
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+
+        self._bump("failures")
+        logger.warning(f"GenAI {self.provider.name} failed after retries: {last_error}")
+        raise GenAIUnavailable(str(last_error))
+
+    def generate_many(self, prompts):
+        """Run several prompts concurrently; each result is text or the raised exception."""
+        futures = [self.batch_pool.submit(self.generate, p) for p in prompts]
+        results = []
+        for f in futures:
+            try:
+                results.append(f.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def describe(self):
+        with self.lock:
+            stats = dict(self.stats)
+        return dict(stats, provider=self.provider.name, model=self.model,
+                    circuit=self.breaker.state, settings=self.settings)
+
+
+FAKE_LATENCY_SECONDS = float(os.getenv("GENAI_FAKE_LATENCY", "0.2"))
+FAKE_FAILURE_RATE = float(os.getenv("GENAI_FAKE_FAILURE_RATE", "0.0"))
+
+_clients = {}   # provider name -> ((api_key, settings), GenAIClient)
+_clients_lock = threading.Lock()
+
+
+def get_genai_client(config):
+    """
+    Shared client for the configured provider, or None if GenAI is off/unconfigured.
+    One client per provider; it is replaced when the key or limits change.
+    """
+    provider_name = config.get("provider")
+    if not config.get("enabled") or provider_name not in PROVIDERS:
+        return None
+    if provider_name != "fake" and not config.get("api_key"):
+        return None
+
+    settings = {k: config.get(k, v) for k, v in DEFAULT_SETTINGS.items()}
+    fingerprint = (config.get("api_key"), tuple(sorted(settings.items())))
+    with _clients_lock:
+        entry = _clients.get(provider_name)
+        if entry and entry[0] == fingerprint:
+            return entry[1]
+        if provider_name == "fake":
+            provider = FakeProvider(FAKE_LATENCY_SECONDS, FAKE_FAILURE_RATE)
+        else:
+            provider = PROVIDERS[provider_name](config["api_key"], float(settings["timeout"]))
+        # A replaced client is not shut down: requests still holding it finish their calls,
+        # and its idle pool threads exit once the last reference is gone.
+        client = GenAIClient(provider, settings)
+        _clients[provider_name] = (fingerprint, client)
+        return client
+
+
+def genai_client_stats():
+    with _clients_lock:
+        return [client.describe() for _, client in _clients.values()]
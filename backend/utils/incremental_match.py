@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, or_
+from models import db, JD, Profile, MatchResult, MatchLedger, LiveStatusTracker
+from utils.ranker import rank_profiles, score_profile_against_jds
+from utils.explainer import generate_explanation
+from utils.explanation_jobs import enqueue_explanations, PENDING
+from utils.feature_store import get_features, get_document_features
+from utils.match_store import bulk_upsert, write_matches, delete_matches
+from utils.extraction_cache import cached_text
+from utils.background import submit
+from utils.utils import log_agent_error
+from utils.logger import logger
+
+# ──────────────────────────────
+# Incremental JD → profile matching.
+# Every profile scored for a JD is written to match_ledger with the profile
+# version (updated_at, else created_at) it was scored against, and the JD's
+# LiveStatusTracker keeps the newest profile version its last run saw. A re-run
+# scores only profiles that are newer than both and merges them into the stored
+# ranking; top matches whose profile did not change keep their explanation.
+# Uploaded profiles are also reverse-matched against every open JD in the
+# background, so recruiters see new candidates without re-running JD matches.
+# ──────────────────────────────
+MATCH_TYPE = 'jd-to-resume'
+AUTO_REMATCH_ON_UPLOAD = os.getenv("AUTO_REMATCH_ON_UPLOAD", "true").lower() == "true"
+AUTO_REMATCH_TOP_K = int(os.getenv("AUTO_REMATCH_TOP_K", "3"))
+REVERSE_MATCH_MIN_SCORE = float(os.getenv("REVERSE_MATCH_MIN_SCORE", "0.5"))
+OPEN_JD_STATUSES = ("Pending", "Review")
+LEDGER_KEY = ("jd_id", "profile_id")
+LEDGER_UPDATE_COLUMNS = ("profile_version", "score", "features", "scored_at")
+
+profile_version = db.func.coalesce(Profile.updated_at, Profile.created_at)
+_rematch_lock = threading.Lock()
+
+
+def latest_profile_version():
+    return db.session.query(db.func.max(profile_version)).scalar()
+
+
+def stale_profile_ids(jd_id, matched_through):
+    """Profiles added or changed since the JD was last matched."""
+    rows = db.session.query(Profile.id).outerjoin(
+        MatchLedger, and_(MatchLedger.jd_id == jd_id, MatchLedger.profile_id == Profile.id)
+    ).filter(or_(
+        and_(MatchLedger.id.is_(None), profile_version > matched_through),
+        MatchLedger.profile_version < profile_version,
+    )).all()
+    return [profile_id for profile_id, in rows]
+
+
+def record_scores(jd_id, ranked, replace=False):
+    """Bulk-upsert ledger rows for freshly scored profiles (replace=True drops the JD's old ledger first)."""
+    if replace:
+        MatchLedger.query.filter_by(jd_id=jd_id).delete(synchronize_session=False)
+    versions = dict(db.session.query(Profile.id, profile_version).filter(
+        Profile.id.in_([r["id"] for r in ranked])).all()) if ranked else {}
+    return _write_ledger([(jd_id, item["id"], versions.get(item["id"]), item) for item in ranked])
+
+
+def _write_ledger(entries):
+    """entries: (jd_id, profile_id, profile version, ranked item). Returns the write report."""
+    now = datetime.utcnow()
+    rows = [{
+        "jd_id": jd_id,
+        "profile_id": profile_id,
+        "profile_version": version,
+        "score": round(item["score"], 4),
+        "features": json.dumps(item["features"]),
+        "scored_at": now,
+    } for jd_id, profile_id, version, item in entries]
+    _, report = bulk_upsert(MatchLedger, rows, LEDGER_KEY, LEDGER_UPDATE_COLUMNS, returning=False)
+    return report
+
+
+def mark_matched(jd_id, matched_through):
+    status = LiveStatusTracker.query.filter_by(jd_id=jd_id).first()
+    if not status:
+        status = LiveStatusTracker(jd_id=jd_id)
+        db.session.add(status)
+    status.compared = True
+    status.ranked = True
+    status.matched_through = matched_through
+    return status
+
+
+def ledger_ranking(jd_id, k):
+    """The JD's stored ranking, best first, skipping profiles that no longer exist."""
+    rows = db.session.query(MatchLedger).join(Profile, Profile.id == MatchLedger.profile_id).filter(
+        MatchLedger.jd_id == jd_id).order_by(MatchLedger.score.desc()).limit(k).all()
+    return [{"id": row.profile_id, "score": row.score, "features": json.loads(row.features or "{}")}
+            for row in rows]
+
+
+def _drop_matches(jd_id, profile_ids=None):
+    """Remove stored JD → profile matches that a new score supersedes."""
+    query = MatchResult.query.filter(MatchResult.jd_id == jd_id, MatchResult.match_type == MATCH_TYPE)
+    if profile_ids is not None:
+        query = query.filter(MatchResult.profile_id.in_(list(profile_ids)))
+    delete_matches(query)
+
+
+def _trim_matches(limits):
+    """
+    Delete each JD's jd → profile matches ranked below its limit ({jd_id: keep}).
+    Returns the ids of the deleted matches.
+    """
+    trimmed = []
+    for jd_id, keep in limits.items():
+        trimmed += [match_id for match_id, in db.session.query(MatchResult.id).filter(
+            MatchResult.jd_id == jd_id, MatchResult.match_type == MATCH_TYPE
+        ).order_by(MatchResult.score.desc(), MatchResult.id).offset(keep).all()]
+    if trimmed:
+        delete_matches(MatchResult.query.filter(MatchResult.id.in_(trimmed)))
+    return set(trimmed)
+
+
+# ──────────────────────────────
+# Full and incremental runs
+# ──────────────────────────────
+def full_rank(jd, jd_text, jd_vec, top_k):
+    """Score the JD against every retrieved profile and reset its ledger. Returns the top_k."""
+    matched_through = latest_profile_version()
+    ranked = rank_profiles(jd, jd_text, jd_vec, None)
+    report = record_scores(jd.id, ranked, replace=True)
+    logger.info(f"Ledger for JD {jd.id}: {report['written']} scores written in {report['seconds']}s "
+                f"({report['rows_per_sec']} rows/s)")
+    _drop_matches(jd.id)
+    mark_matched(jd.id, matched_through)
+    db.session.commit()
+    return ranked[:top_k]
+
+
+def incremental_rank(jd, jd_text, jd_vec, matched_through, top_k):
+    """
+    Score only profiles added or changed since the last run and merge them into the ledger.
+    Returns (top_k ranking, {profile_id: MatchResult} still valid for it, number of profiles rescored).
+    """
+    latest = latest_profile_version()
+    stale = stale_profile_ids(jd.id, matched_through)
+    if stale:
+        record_scores(jd.id, rank_profiles(jd, jd_text, jd_vec, None, candidate_ids=stale))
+        _drop_matches(jd.id, stale)
+    mark_matched(jd.id, latest or matched_through)
+    db.session.commit()
+
+    ranked = ledger_ranking(jd.id, top_k)
+    reusable = {match.profile_id: match for match in MatchResult.query.filter(
+        MatchResult.jd_id == jd.id, MatchResult.match_type == MATCH_TYPE,
+        MatchResult.profile_id.in_([r["id"] for r in ranked])
+    ).all()} if ranked else {}
+    return ranked, reusable, len(stale)
+
+
+def build_profile_matches(jd, jd_text, ranked, scoring_latency, async_explanations=True):
+    """
+    SBERT explanation and an upserted (uncommitted) MatchResult for each ranked profile.
+    Returns ([(ranked item, profile, match, explanation, resume text)] in rank order, write report).
+    """
+    profiles = {p.id: p for p in Profile.query.filter(Profile.id.in_([r["id"] for r in ranked])).all()} if ranked else {}
+    jd_features = get_document_features("jd", jd.id)
+    profile_features = get_features("profile", list(profiles))
+
+    built, rows = [], []
+    for item in ranked:
+        profile = profiles.get(item["id"])
+        if not profile:
+            continue
+        try:
+            resume_text = profile.extracted_text or cached_text(profile.resume_path)
+            if not resume_text:
+                continue
+
+            exp_start = time.time()
+            explanation = generate_explanation(jd_text, resume_text, jd_features=jd_features,
+                                               resume_features=profile_features.get(profile.id))
+            explanation["score_breakdown"] = item["features"]
+            if async_explanations:
+                explanation["explanation_status"] = PENDING
+            exp_latency = round(time.time() - exp_start, 4)
+
+            rows.append(dict(
+                jd_id=jd.id,
+                profile_id=profile.id,
+                score=round(item["score"], 4),
+                explanation=json.dumps(explanation),
+                match_type=MATCH_TYPE,
+                method=explanation.get("source", "SBERT"),
+                latency=round(scoring_latency + exp_latency, 4),
+                explanation_latency=exp_latency
+            ))
+            built.append((item, profile, explanation, resume_text))
+        except Exception as e:
+            log_agent_error("MatchError", str(e), method=MATCH_TYPE)
+
+    matches, report = write_matches(rows)
+    return [(item, profile, match, explanation, resume_text)
+            for (item, profile, explanation, resume_text), match in zip(built, matches) if match is not None], report
+
+
+# ──────────────────────────────
+# Reverse matching: a new or updated profile against every open JD
+# ──────────────────────────────
+def record_profile_scores(profile_id, scored):
+    """Bulk-upsert the ledger rows of one profile across many JDs."""
+    version = db.session.query(profile_version).filter(Profile.id == profile_id).scalar()
+    return _write_ledger([(item["id"], profile_id, version, item) for item in scored])
+
+
+def _stored_cutoffs(jd_ids):
+    """{jd_id: (lowest stored score, number of stored matches)} for the JDs' jd → profile matches."""
+    rows = db.session.query(
+        MatchResult.jd_id, db.func.min(MatchResult.score), db.func.count(MatchResult.id)
+    ).filter(MatchResult.jd_id.in_(jd_ids), MatchResult.match_type == MATCH_TYPE).group_by(MatchResult.jd_id).all()
+    return {jd_id: (lowest, count) for jd_id, lowest, count in rows}
+
+
+def reverse_match_profiles(profile_ids, top_k=AUTO_REMATCH_TOP_K):
+    """
+    Score each profile against all open JDs in one pass and upsert a MatchResult
+    wherever it makes the JD's stored top_k (or, for JDs with fewer stored matches,
+    scores at least REVERSE_MATCH_MIN_SCORE). The match it displaces is deleted, so
+    a JD keeps max(top_k, matches stored before) rows. Needs an app context;
+    returns the number of matches written.
+    """
+    app = current_app._get_current_object()
+    written = 0
+    with _rematch_lock:
+        open_ids = [jd_id for jd_id, in db.session.query(JD.id).filter(
+            or_(JD.status.in_(OPEN_JD_STATUSES), JD.status.is_(None))).all()]
+        if not open_ids:
+            return 0
+        ledgered = {s.jd_id for s in LiveStatusTracker.query.filter(
+            LiveStatusTracker.jd_id.in_(open_ids), LiveStatusTracker.ranked.is_(True),
+            LiveStatusTracker.matched_through.isnot(None)).all()}
+
+        for profile in Profile.query.filter(Profile.id.in_(list(profile_ids))).all():
+            try:
+                start = time.time()
+                profile_text = profile.extracted_text or cached_text(profile.resume_path)
+                scored = score_profile_against_jds(profile, profile_text, profile.embedding, open_ids)
+                # matched JDs keep their ledger current, so their next incremental run skips this profile
+                record_profile_scores(profile.id, [r for r in scored if r["id"] in ledgered])
+
+                cutoffs = _stored_cutoffs([r["id"] for r in scored])
+                entering = []
+                for item in scored:
+                    lowest, count = cutoffs.get(item["id"], (None, 0))
+                    if (lowest is not None and item["score"] > lowest) or \
+                            (count < top_k and item["score"] >= REVERSE_MATCH_MIN_SCORE):
+                        entering.append(item)
+                scoring_latency = round(time.time() - start, 4)
+
+                built = []
+                jds = {jd.id: jd for jd in JD.query.filter(JD.id.in_([r["id"] for r in entering])).all()} if entering else {}
+                for item in entering:
+                    jd = jds.get(item["id"])
+                    jd_text = jd.extracted_text if jd else None
+                    if not jd_text:
+                        continue
+                    entries, _ = build_profile_matches(jd, jd_text, [dict(item, id=profile.id)], scoring_latency)
+                    built += [(jd_text, entry) for entry in entries]
+                if built:
+                    trimmed = _trim_matches({jd_id: max(top_k, cutoffs.get(jd_id, (None, 0))[1])
+                                             for jd_id in {entry[2].jd_id for _, entry in built}})
+                    built = [(jd_text, entry) for jd_text, entry in built if entry[2].id not in trimmed]
+                db.session.commit()
+
+                if built:
+                    enqueue_explanations(app, None, MATCH_TYPE, [(match.id, jd_text, resume_text)
+                                                                 for jd_text, (_, _, match, _, resume_text) in built])
+                written += len(built)
+                logger.info(f"🔁 Reverse match: profile {profile.id} scored against {len(scored)} open JD(s) "
+                            f"in {scoring_latency}s, {len(built)} match(es) upserted")
+            except Exception as e:
+                db.session.rollback()
+                log_agent_error("ReverseMatchError", str(e), method=MATCH_TYPE)
+    return written
+
+
+def schedule_reverse_match(app, profile_ids):
+    """Queue reverse_match_profiles on the background pool (no-op when AUTO_REMATCH_ON_UPLOAD is off)."""
+    if not AUTO_REMATCH_ON_UPLOAD or not profile_ids:
+        return None
+    return submit(app, reverse_match_profiles, list(profile_ids))
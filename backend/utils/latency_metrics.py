@@ -0,0 +1,132 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# ──────────────────────────────
+# In-process latency histograms per pipeline stage, for p50/p95/p99 over
+# sliding windows (/tracker/latency).
+# Each histogram uses log-spaced buckets (DDSketch style). Any quantile is
+# accurate to LATENCY_RELATIVE_ERROR, memory grows with the spread of values
+# rather than their number, and two histograms merge by adding bucket counts.
+# Samples go into one histogram per LATENCY_SLOT_SECONDS slot; a window query
+# merges the slots it covers and older slots are dropped.
+# ──────────────────────────────
+STAGES = ("extraction", "embedding", "scoring", "explanation", "llm", "db_write", "email")
+WINDOWS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600}
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+LATENCY_RELATIVE_ERROR = float(os.getenv("LATENCY_RELATIVE_ERROR", "0.01"))
+LATENCY_SLOT_SECONDS = int(os.getenv("LATENCY_SLOT_SECONDS", "10"))
+MIN_TRACKED_SECONDS = 1e-6   # anything faster is counted in the lowest bucket
+
+_series = {}   # stage -> deque[(slot number, LatencyHistogram)]
+_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of durations in seconds; mergeable, constant relative error."""
+
+    def __init__(self, relative_error=LATENCY_RELATIVE_ERROR):
+        self.relative_error = relative_error
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, seconds):
+        return math.ceil(math.log(max(seconds, MIN_TRACKED_SECONDS)) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def record(self, seconds):
+        index = self._index(seconds)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge histograms with different relative errors")
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return min(self._value(index), self.max)
+        return self.max
+
+    def summary(self):
+        """count, mean, max and QUANTILES in milliseconds."""
+        def ms(seconds):
+            return round(seconds * 1000, 3) if seconds is not None else None
+        stats = {"count": self.count, "mean": ms(self.total / self.count) if self.count else None,
+                 "max": ms(self.max) if self.count else None}
+        stats.update({name: ms(self.quantile(q)) for name, q in QUANTILES.items()})
+        return stats
+
+
+def record(stage, seconds):
+    """Add one duration (seconds) for `stage`."""
+    slot = int(time.time() // LATENCY_SLOT_SECONDS)
+    oldest = slot - max(WINDOWS.values()) // LATENCY_SLOT_SECONDS
+    with _lock:
+        series = _series.setdefault(stage, deque())
+        if not series or series[-1][0] < slot:
+            series.append((slot, LatencyHistogram()))
+        while series and series[0][0] < oldest:
+            series.popleft()
+        series[-1][1].record(seconds)
+
+
+@contextmanager
+def timed(stage):
+    """Time the block (or, used as @timed(stage), every call) and record it under `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def window_histogram(stage, seconds):
+    """The stage's samples from the last `seconds`, merged into one histogram."""
+    first = int(time.time() // LATENCY_SLOT_SECONDS) - seconds // LATENCY_SLOT_SECONDS + 1
+    merged = LatencyHistogram()
+    with _lock:
+        for slot, histogram in _series.get(stage, ()):
+            if slot >= first:
+                merged.merge(histogram)
+    return merged
+
+
+def latency_report(windows=None):
+    """{stage: {window: summary}} for every stage and the requested windows (default: all)."""
+    windows = [w for w in (windows or WINDOWS) if w in WINDOWS]
+    with _lock:
+        stages = list(STAGES) + sorted(set(_series) - set(STAGES))
+    return {
+        "relative_error": LATENCY_RELATIVE_ERROR,
+        "slot_seconds": LATENCY_SLOT_SECONDS,
+        "stages": {stage: {w: window_histogram(stage, WINDOWS[w]).summary() for w in windows} for stage in stages},
+    }
+
+
+def reset_latency():
+    with _lock:
+        _series.clear()
@@ -0,0 +1,64 @@
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager, load_only
+from models import db, MatchResult, Profile
+
+# ──────────────────────────────
+# Read side of match_result: "top N unique profiles per JD" as one statement.
+# ROW_NUMBER() keeps each profile's best row (a profile can be stored under
+# several match types), a second ROW_NUMBER() ranks those per JD and the limit
+# is applied in SQL, so the cost depends on N, not on how many rows a JD has
+# accumulated. Profiles come back in the same query (no per-row lookups).
+# ──────────────────────────────
+PROFILE_SUMMARY_COLUMNS = (Profile.id, Profile.emp_id, Profile.name, Profile.email, Profile.vertical,
+                           Profile.skills, Profile.experience_years, Profile.resume_path)
+
+
+def _ranked_match_ids(jd_ids, match_type=None):
+    """Subquery of (id, jd_id, rank) with one row per (JD, profile), best score first."""
+    best_per_profile = select(
+        MatchResult.id, MatchResult.jd_id, MatchResult.score,
+        db.func.row_number().over(
+            partition_by=(MatchResult.jd_id, MatchResult.profile_id),
+            order_by=(MatchResult.score.desc(), MatchResult.id.desc()),
+        ).label("profile_rank"),
+    ).join(Profile, Profile.id == MatchResult.profile_id).where(MatchResult.jd_id.in_(jd_ids))
+    if match_type:
+        best_per_profile = best_per_profile.where(MatchResult.match_type == match_type)
+    best_per_profile = best_per_profile.subquery()
+
+    return select(
+        best_per_profile.c.id, best_per_profile.c.jd_id,
+        db.func.row_number().over(
+            partition_by=best_per_profile.c.jd_id,
+            order_by=(best_per_profile.c.score.desc(), best_per_profile.c.id.desc()),
+        ).label("rank"),
+    ).where(best_per_profile.c.profile_rank == 1).subquery()
+
+
+def top_profile_matches_for_jds(jd_ids, limit=10, match_type=None, with_explanation=False):
+    """
+    {jd_id: [MatchResult, …]} holding each JD's top `limit` distinct profiles (limit=None: all),
+    best first, with `match.profile` already loaded. Explanations are only loaded on request.
+    """
+    jd_ids = list(jd_ids)
+    if not jd_ids:
+        return {}
+    ranked = _ranked_match_ids(jd_ids, match_type)
+    query = MatchResult.query.join(ranked, ranked.c.id == MatchResult.id) \
+        .join(Profile, Profile.id == MatchResult.profile_id) \
+        .options(contains_eager(MatchResult.profile).load_only(*PROFILE_SUMMARY_COLUMNS))
+    if not with_explanation:
+        query = query.options(load_only(MatchResult.id, MatchResult.jd_id, MatchResult.profile_id,
+                                        MatchResult.score, MatchResult.match_type, MatchResult.created_at))
+    if limit is not None:
+        query = query.filter(ranked.c.rank <= limit)
+
+    results = {jd_id: [] for jd_id in jd_ids}
+    for match in query.order_by(ranked.c.jd_id, ranked.c.rank).all():
+        results[match.jd_id].append(match)
+    return results
+
+
+def top_profile_matches(jd_id, limit=10, match_type=None, with_explanation=False):
+    """The JD's top `limit` distinct profile matches, best first (see top_profile_matches_for_jds)."""
+    return top_profile_matches_for_jds([jd_id], limit, match_type, with_explanation)[jd_id]
@@ -0,0 +1,262 @@
+import os
+import time
+import threading
+from datetime import datetime
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, MatchResult, MatchLedger, Feedback, MatchLearningCache, MATCH_KEY_INDEX
+from utils.latency_metrics import record as record_latency
+from utils.metrics_rollup import match_deltas, merge_deltas, apply_match_deltas, subtract_match_rows
+from utils.logger import logger
+
+# ──────────────────────────────
+# MatchResult storage: exactly one row per (jd, profile, resume, match type),
+# enforced by the ux_match_result_key unique index. Writes are bulk
+# INSERT … ON CONFLICT DO UPDATE, so re-matching replaces rows in place instead
+# of appending duplicates that readers then have to filter out. Large batches
+# are written in chunks, each in its own SAVEPOINT (see bulk_upsert). Every
+# write and delete also updates the daily_match_stats rollup (utils/metrics_rollup).
+# ──────────────────────────────
+LEGACY_INDEX = "ix_match_unique"   # the old non-unique index on (jd_id, profile_id, resume_id)
+KEY_COLUMNS = ("jd_id", "profile_id", "resume_id", "match_type")
+UPDATE_COLUMNS = ("score", "explanation", "method", "latency", "explanation_latency", "created_at")
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+MATCH_WRITE_CHUNK_SIZE = int(os.getenv("MATCH_WRITE_CHUNK_SIZE", "500"))   # rows per executemany / savepoint
+
+match_key = tuple(MATCH_KEY_INDEX.expressions)
+_key_index_ready = False
+_lock = threading.Lock()
+_write_stats = {}
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _record(table, rows, failed, chunks, seconds):
+    with _lock:
+        stats = _write_stats.setdefault(table, {"rows": 0, "failed": 0, "chunks": 0, "seconds": 0.0})
+        stats["rows"] += rows
+        stats["failed"] += failed
+        stats["chunks"] += chunks
+        stats["seconds"] += seconds
+
+
+def bulk_upsert(model, rows, key_columns, update_columns, index_elements=None, on_conflict=True,
+                chunk_size=None, returning=True):
+    """
+    Upsert dict rows with one executemany INSERT … ON CONFLICT DO UPDATE per chunk, in the
+    caller's transaction. Each chunk runs inside a SAVEPOINT; a failing chunk is retried row
+    by row so a bad row is skipped instead of rolling back the whole batch.
+    Returns (stored objects aligned with `rows`, None for failed rows; write report).
+    """
+    start = time.time()
+    chunk_size = max(1, chunk_size or MATCH_WRITE_CHUNK_SIZE)
+    latest = {}
+    for row in rows:   # the last row wins when one batch repeats a key
+        latest[tuple(row.get(c) for c in key_columns)] = row
+    unique_rows = list(latest.values())
+
+    insert = UPSERT_DIALECTS.get(db.engine.dialect.name) if on_conflict else None
+    if insert is not None:
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements or [getattr(model, c) for c in key_columns],
+                                          set_={column: stmt.excluded[column] for column in update_columns})
+
+    def write(chunk):
+        if insert is None:
+            return _upsert_with_orm(model, chunk, key_columns)
+        if not returning:
+            db.session.execute(stmt, chunk)
+            return chunk
+        return db.session.scalars(stmt.returning(model, sort_by_parameter_order=True), chunk,
+                                  execution_options={"populate_existing": True}).all()
+
+    stored, errors, chunks = [], [], 0
+    for chunk in _chunks(unique_rows, chunk_size):
+        chunks += 1
+        try:
+            with db.session.begin_nested():
+                stored += write(chunk)
+        except Exception:
+            for row in chunk:
+                try:
+                    with db.session.begin_nested():
+                        stored += write([row])
+                except Exception as e:
+                    stored.append(None)
+                    errors.append(str(e).split("\n")[0])
+
+    by_key = {tuple(row.get(c) for c in key_columns): obj for row, obj in zip(unique_rows, stored)}
+    seconds = time.time() - start
+    report = {
+        "rows": len(unique_rows),
+        "written": len(unique_rows) - len(errors),
+        "failed": len(errors),
+        "chunks": chunks,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(len(unique_rows) / seconds, 1) if seconds > 0 else None,
+        "errors": errors[:5],
+    }
+    _record(model.__tablename__, report["written"], report["failed"], chunks, seconds)
+    record_latency("db_write", seconds)
+    if errors:
+        logger.warning(f"⚠️ {model.__tablename__}: {len(errors)} of {len(unique_rows)} row(s) failed to write: {errors[0]}")
+    return [by_key[tuple(row.get(c) for c in key_columns)] for row in rows], report
+
+
+def _upsert_with_orm(model, rows, key_columns):
+    """Fallback without ON CONFLICT (other databases, or before compaction): update-or-add by key."""
+    stored = []
+    for row in rows:
+        obj = model.query.filter_by(**{c: row.get(c) for c in key_columns}).order_by(model.id).first() or model()
+        for column, value in row.items():
+            setattr(obj, column, value)
+        db.session.add(obj)
+        stored.append(obj)
+    db.session.flush()
+    return stored
+
+
+def _key(row):
+    return tuple(row.get(c) for c in KEY_COLUMNS)
+
+
+def _stored_rows(keys):
+    """Rollup columns of the stored rows a write will replace, by match key (one query)."""
+    if not keys:
+        return {}
+    rows = db.session.query(*(getattr(MatchResult, c) for c in KEY_COLUMNS), MatchResult.created_at,
+                            MatchResult.latency, MatchResult.score).filter(
+        MatchResult.jd_id.in_({k[0] for k in keys}),
+        MatchResult.match_type.in_({k[3] for k in keys}),
+        or_(MatchResult.profile_id.in_({k[1] for k in keys if k[1] is not None}),
+            MatchResult.resume_id.in_({k[2] for k in keys if k[2] is not None})),
+    ).order_by(MatchResult.id).all()
+    columns = KEY_COLUMNS + ("created_at", "latency", "score")
+    stored = {}
+    for row in rows:
+        row = dict(zip(columns, row))
+        if _key(row) in keys:
+            stored.setdefault(_key(row), row)   # the row the ORM fallback would update, if keys repeat
+    return stored
+
+
+def write_matches(rows, chunk_size=None):
+    """Upsert MatchResult rows given as dicts. Returns (MatchResult or None per row, write report)."""
+    now = datetime.utcnow()
+    rows = [dict({"profile_id": None, "resume_id": None}, **row, created_at=row.get("created_at") or now)
+            for row in rows]
+    previous = _stored_rows({_key(row) for row in rows})
+    matches, report = bulk_upsert(MatchResult, rows, KEY_COLUMNS, UPDATE_COLUMNS, index_elements=match_key,
+                                  on_conflict=key_index_ready(), chunk_size=chunk_size)
+
+    written = {_key(row): row for row, match in zip(rows, matches) if match is not None}
+    apply_match_deltas(merge_deltas(match_deltas(written.values()),
+                                    match_deltas([previous[k] for k in written if k in previous], sign=-1)))
+    return matches, report
+
+
+def delete_matches(query):
+    """Delete the MatchResult rows selected by `query`, keeping the rollups in step. Returns rows removed."""
+    subtract_match_rows(query)
+    return query.delete(synchronize_session=False)
+
+
+def upsert_match(**row):
+    (match,), report = write_matches([row])
+    if match is None:
+        raise RuntimeError(f"Failed to store match: {report['errors'][0]}")
+    return match
+
+
+def delete_profiles(profiles):
+    """
+    Delete profiles (in the caller's transaction) together with their match results,
+    ledger rows, feedback and learning-cache rows. Deleting only the Profile would make
+    the ORM null MatchResult.profile_id, which collides in ux_match_result_key as soon
+    as a second replaced profile had a match for the same JD.
+    """
+    profile_ids = [p.id for p in profiles]
+    if not profile_ids:
+        return []
+    delete_matches(MatchResult.query.filter(MatchResult.profile_id.in_(profile_ids)))
+    for model in (MatchLedger, Feedback, MatchLearningCache):
+        model.query.filter(model.profile_id.in_(profile_ids)).delete(synchronize_session=False)
+    for profile in profiles:
+        db.session.expire(profile, ["match_results", "ledger_entries"])   # already deleted above
+        db.session.delete(profile)
+    db.session.flush()
+    return profile_ids
+
+
+def write_stats():
+    """Cumulative bulk-write throughput per table since start-up."""
+    with _lock:
+        stats = {table: dict(values) for table, values in _write_stats.items()}
+    for values in stats.values():
+        values["rows_per_sec"] = round(values["rows"] / values["seconds"], 1) if values["seconds"] else None
+        values["seconds"] = round(values["seconds"], 3)
+    return {"chunk_size": MATCH_WRITE_CHUNK_SIZE, "tables": stats}
+
+
+# ──────────────────────────────
+# One-off compaction of rows written before the unique index existed
+# ──────────────────────────────
+def duplicate_match_count():
+    groups = db.session.query(db.func.count(MatchResult.id).label("n")).group_by(*match_key).subquery()
+    return int(db.session.query(db.func.coalesce(db.func.sum(groups.c.n - 1), 0)).scalar())
+
+
+def compact_matches():
+    """Delete duplicate MatchResult rows, keeping the newest (highest id) of each key. Returns rows removed."""
+    keep = db.session.query(db.func.max(MatchResult.id)).group_by(*match_key)
+    removed = delete_matches(MatchResult.query.filter(MatchResult.id.notin_(keep)))
+    db.session.commit()
+    if removed:
+        logger.info(f"🧹 Compacted match_result: removed {removed} duplicate row(s)")
+    return removed
+
+
+def _index_exists(name):
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+    elif dialect == "postgresql":
+        query = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+    else:
+        return inspect(db.engine).has_index("match_result", name)
+    with db.engine.connect() as conn:
+        return conn.execute(text(query), {"name": name}).first() is not None
+
+
+def key_index_ready():
+    """True once the unique key index exists (upserts use ON CONFLICT only then)."""
+    global _key_index_ready
+    if not _key_index_ready:
+        _key_index_ready = _index_exists(MATCH_KEY_INDEX.name)
+    return _key_index_ready
+
+
+def ensure_match_key_index(compact=False):
+    """
+    Create the unique key index on databases that predate it. Existing duplicates
+    are only deleted when compact=True (compact_matches.py); until then writes use
+    the ORM fallback. Returns the number of rows removed. Needs an app context.
+    """
+    global _key_index_ready
+    if key_index_ready():
+        return 0
+    duplicates = duplicate_match_count()
+    if duplicates and not compact:
+        logger.warning(f"⚠️ match_result has {duplicates} duplicate row(s); run `python compact_matches.py` "
+                       f"to remove them and create {MATCH_KEY_INDEX.name}")
+        return 0
+    removed = compact_matches() if duplicates else 0
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP INDEX IF EXISTS {LEGACY_INDEX}"))
+    MATCH_KEY_INDEX.create(db.engine)
+    _key_index_ready = True
+    logger.info(f"Schema sync: created unique index {MATCH_KEY_INDEX.name}")
+    return removed
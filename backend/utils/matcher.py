@@ -1,15 +1,11 @@
-from sentence_transformers import SentenceTransformer, util
-import json
-import torch  # ✅ You need this to convert JSON to tensors
+import numpy as np
 from utils.utils import log_agent_error  # ✅ To log errors
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-def compute_full_text_score(jd_embedding_str, profile_embedding_str):
+def compute_full_text_score(jd_vec, profile_vec):
+    """Cosine similarity of two float32 embeddings (see Model.embedding)."""
     try:
-        jd_vec = torch.tensor(json.loads(jd_embedding_str))
-        profile_vec = torch.tensor(json.loads(profile_embedding_str))
-        return float(util.cos_sim(jd_vec, profile_vec)[0][0])
+        denom = float(np.linalg.norm(jd_vec) * np.linalg.norm(profile_vec))
+        return float(np.dot(jd_vec, profile_vec) / denom) if denom else 0.0
     except Exception as e:
         log_agent_error("EmbeddingError", str(e), method="compute_full_text_score")
         return 0.0
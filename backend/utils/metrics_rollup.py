@@ -0,0 +1,230 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, inspect, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, MatchResult, AgentErrorLog, DailyMatchStats, DailyErrorStats
+from utils.logger import logger
+
+# ──────────────────────────────
+# Daily rollups behind /tracker/agent-health.
+# daily_match_stats holds, per (UTC day of created_at, match type), the number of
+# match_result rows plus their score and latency sums; daily_error_stats holds
+# error and resolved counts per (day, error type). Both are kept in step on write,
+# in the writer's transaction, so the dashboard reads a few dozen rows instead
+# of aggregating the base tables:
+#   match_result    – utils/match_store (bulk upserts and deletes bypass ORM events)
+#   agent_error_log – ORM insert/update/delete events below
+# rebuild_rollups() recomputes both from scratch (backfill_metrics.py).
+# ──────────────────────────────
+MATCH_ROLLUP_KEY = ("day", "match_type")
+MATCH_ROLLUP_VALUES = ("matches", "score_sum", "latency_sum", "latency_count")
+ERROR_ROLLUP_KEY = ("day", "error_type")
+ERROR_ROLLUP_VALUES = ("errors", "resolved")
+UNKNOWN = "unknown"          # bucket for rows without a match / error type
+UNDATED = date(1970, 1, 1)   # bucket for legacy rows without created_at
+
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _day(value):
+    if value is None:
+        return UNDATED
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])   # SQLite date() returns text
+
+
+def _increment(model, key_columns, value_columns, deltas, executor=None):
+    """Add {key tuple: [values]} deltas onto the rollup rows, creating missing ones."""
+    rows = [dict(zip(key_columns, key), **dict(zip(value_columns, values)))
+            for key, values in deltas.items() if any(values)]
+    if not rows:
+        return
+    executor = executor or db.session
+    bind = executor.get_bind() if executor is db.session else executor
+    upsert = _UPSERTS.get(bind.dialect.name)
+    if upsert is not None:
+        stmt = upsert(model)
+        stmt = stmt.on_conflict_do_update(index_elements=[getattr(model, c) for c in key_columns],
+                                          set_={c: getattr(model, c) + stmt.excluded[c] for c in value_columns})
+        executor.execute(stmt, rows)
+        return
+    for row in rows:
+        where = [getattr(model, c) == row[c] for c in key_columns]
+        result = executor.execute(update(model).where(*where).values(
+            {c: getattr(model, c) + row[c] for c in value_columns}))
+        if not result.rowcount:
+            executor.execute(insert(model).values(row))
+
+
+# ──────────────────────────────
+# match_result
+# ──────────────────────────────
+def match_deltas(rows, sign=1):
+    """Rollup deltas for match rows given as dicts or MatchResult objects."""
+    deltas = {}
+    for row in rows:
+        get = row.get if isinstance(row, dict) else (lambda column, row=row: getattr(row, column))
+        values = deltas.setdefault((_day(get("created_at")), get("match_type") or UNKNOWN), [0, 0.0, 0.0, 0])
+        latency = get("latency")
+        values[0] += sign
+        values[1] += sign * (get("score") or 0.0)
+        if latency is not None:
+            values[2] += sign * latency
+            values[3] += sign
+    return deltas
+
+
+def _add(deltas, key, values):
+    current = deltas.get(key)
+    deltas[key] = [a + b for a, b in zip(current, values)] if current else list(values)
+
+
+def merge_deltas(*deltas):
+    merged = {}
+    for delta in deltas:
+        for key, values in delta.items():
+            _add(merged, key, values)
+    return merged
+
+
+def apply_match_deltas(deltas, executor=None):
+    _increment(DailyMatchStats, MATCH_ROLLUP_KEY, MATCH_ROLLUP_VALUES, deltas, executor)
+
+
+def _grouped_match_stats(query):
+    rows = query.with_entities(
+        db.func.date(MatchResult.created_at), MatchResult.match_type, db.func.count(MatchResult.id),
+        db.func.sum(MatchResult.score), db.func.sum(MatchResult.latency), db.func.count(MatchResult.latency),
+    ).group_by(db.func.date(MatchResult.created_at), MatchResult.match_type).all()
+    stats = {}
+    for day, match_type, count, score_sum, latency_sum, latency_count in rows:
+        _add(stats, (_day(day), match_type or UNKNOWN), [count, score_sum or 0.0, latency_sum or 0.0, latency_count])
+    return stats
+
+
+def subtract_match_rows(query):
+    """Take the MatchResult rows selected by `query` out of the rollups (call before deleting them)."""
+    apply_match_deltas({key: [-v for v in values] for key, values in _grouped_match_stats(query).items()})
+
+
+# ──────────────────────────────
+# agent_error_log (ORM events: errors are written one at a time through the session)
+# ──────────────────────────────
+def _error_delta(target, errors, resolved):
+    return {(_day(target.created_at), target.error_type or UNKNOWN): [errors, resolved]}
+
+
+@event.listens_for(AgentErrorLog, "after_insert")
+def _error_inserted(mapper, connection, target):
+    _increment(DailyErrorStats, ERROR_ROLLUP_KEY, ERROR_ROLLUP_VALUES,
+               _error_delta(target, 1, 1 if target.resolved else 0), connection)
+
+
+@event.listens_for(AgentErrorLog, "after_update")
+def _error_updated(mapper, connection, target):
+    state = inspect(target)
+    changed = {attr: state.attrs[attr].history for attr in ("resolved", "created_at", "error_type")}
+    if not any(history.has_changes() for history in changed.values()):
+        return
+    old = {attr: (history.deleted[0] if history.deleted else getattr(target, attr))
+           for attr, history in changed.items()}
+    before = {(_day(old["created_at"]), old["error_type"] or UNKNOWN): [-1, -1 if old["resolved"] else 0]}
+    after = _error_delta(target, 1, 1 if target.resolved else 0)
+    _increment(DailyErrorStats, ERROR_ROLLUP_KEY, ERROR_ROLLUP_VALUES, merge_deltas(before, after), connection)
+
+
+@event.listens_for(AgentErrorLog, "after_delete")
+def _error_deleted(mapper, connection, target):
+    _increment(DailyErrorStats, ERROR_ROLLUP_KEY, ERROR_ROLLUP_VALUES,
+               _error_delta(target, -1, -1 if target.resolved else 0), connection)
+
+
+def _grouped_error_stats():
+    rows = db.session.query(
+        db.func.date(AgentErrorLog.created_at), AgentErrorLog.error_type, db.func.count(AgentErrorLog.id),
+        db.func.sum(db.case((AgentErrorLog.resolved.is_(True), 1), else_=0)),
+    ).group_by(db.func.date(AgentErrorLog.created_at), AgentErrorLog.error_type).all()
+    stats = {}
+    for day, error_type, count, resolved in rows:
+        _add(stats, (_day(day), error_type or UNKNOWN), [count, resolved or 0])
+    return stats
+
+
+# ──────────────────────────────
+# Backfill / verification
+# ──────────────────────────────
+def rebuild_rollups():
+    """Recompute both rollup tables from match_result and agent_error_log. Returns rollup row counts."""
+    DailyMatchStats.query.delete(synchronize_session=False)
+    DailyErrorStats.query.delete(synchronize_session=False)
+    apply_match_deltas(_grouped_match_stats(MatchResult.query))
+    _increment(DailyErrorStats, ERROR_ROLLUP_KEY, ERROR_ROLLUP_VALUES, _grouped_error_stats())
+    db.session.commit()
+    counts = {"daily_match_stats": DailyMatchStats.query.count(), "daily_error_stats": DailyErrorStats.query.count()}
+    logger.info(f"📊 Rebuilt metrics rollups: {counts}")
+    return counts
+
+
+def _stored(model, key_columns, value_columns):
+    return {tuple(getattr(row, c) for c in key_columns): [getattr(row, c) or 0 for c in value_columns]
+            for row in model.query.all()}
+
+
+def _diff(expected, stored):
+    drift = []
+    for key in set(expected) | set(stored):
+        want, have = expected.get(key), stored.get(key)
+        want = want if want is not None else [0] * len((have or [0]))
+        have = have if have is not None else [0] * len(want)
+        if any(abs(a - b) > 1e-6 for a, b in zip(want, have)):
+            drift.append({"key": [str(k) for k in key], "expected": want, "stored": have})
+    return drift
+
+
+def rollup_drift():
+    """Buckets where the rollups disagree with the base tables (empty when in step)."""
+    return {
+        "daily_match_stats": _diff(_grouped_match_stats(MatchResult.query),
+                                   _stored(DailyMatchStats, MATCH_ROLLUP_KEY, MATCH_ROLLUP_VALUES)),
+        "daily_error_stats": _diff(_grouped_error_stats(),
+                                   _stored(DailyErrorStats, ERROR_ROLLUP_KEY, ERROR_ROLLUP_VALUES)),
+    }
+
+
+def ensure_rollups():
+    """Backfill the rollups once, when they are empty but the base tables are not. Needs an app context."""
+    empty = DailyMatchStats.query.first() is None and DailyErrorStats.query.first() is None
+    if empty and (MatchResult.query.first() is not None or AgentErrorLog.query.first() is not None):
+        rebuild_rollups()
+
+
+# ──────────────────────────────
+# Dashboard reads
+# ──────────────────────────────
+def match_totals():
+    """{match_type: {matches, score_sum, latency_sum, latency_count}} over all days."""
+    rows = db.session.query(
+        DailyMatchStats.match_type, *(db.func.sum(getattr(DailyMatchStats, c)) for c in MATCH_ROLLUP_VALUES)
+    ).group_by(DailyMatchStats.match_type).all()
+    return {row[0]: dict(zip(MATCH_ROLLUP_VALUES, (value or 0 for value in row[1:]))) for row in rows}
+
+
+def daily_match_counts(days=7, today=None):
+    """[(date, matches)] for the last `days` UTC days, oldest first, zero-filled."""
+    today = today or datetime.utcnow().date()
+    first = today - timedelta(days=days - 1)
+    rows = db.session.query(DailyMatchStats.day, db.func.sum(DailyMatchStats.matches)).filter(
+        DailyMatchStats.day >= first, DailyMatchStats.day <= today).group_by(DailyMatchStats.day).all()
+    counts = {_day(day): int(total or 0) for day, total in rows}
+    return [(first + timedelta(days=i), counts.get(first + timedelta(days=i), 0)) for i in range(days)]
+
+
+def error_totals():
+    """{error_type: {errors, resolved}} over all days."""
+    rows = db.session.query(
+        DailyErrorStats.error_type, db.func.sum(DailyErrorStats.errors), db.func.sum(DailyErrorStats.resolved)
+    ).group_by(DailyErrorStats.error_type).all()
+    return {error_type: {"errors": int(errors or 0), "resolved": int(resolved or 0)}
+            for error_type, errors, resolved in rows}
@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+import resource
+from utils.logger import logger
+
+# ──────────────────────────────
+# Process-wide registry of SentenceTransformer models and the spaCy pipeline.
+# Each model is loaded on first use and shared by every module in the worker.
+# ──────────────────────────────
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+MODEL_DEVICE = os.getenv("SBERT_DEVICE") or None        # e.g. "cpu", "cuda:0"; None = auto
+MODEL_THREADS = int(os.getenv("SBERT_NUM_THREADS", "0"))  # 0 = leave torch default
+
+SPACY_MODEL = os.getenv("SPACY_MODEL", "en_core_web_sm")
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))    # >1 forks workers inside nlp.pipe
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+# Only NER is used (names in extract_basic_info); everything else is never loaded
+SPACY_EXCLUDE = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+_models = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _rss_bytes():
+    """Current resident set size; falls back to peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_model(name=DEFAULT_MODEL):
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(name)
+        if model is not None:
+            return model
+
+        from sentence_transformers import SentenceTransformer
+        import torch
+
+        if MODEL_THREADS > 0:
+            torch.set_num_threads(MODEL_THREADS)
+
+        rss_before = _rss_bytes()
+        start = time.time()
+        model = SentenceTransformer(name, device=MODEL_DEVICE)
+        load_seconds = round(time.time() - start, 3)
+
+        _stats[name] = {
+            "model": name,
+            "device": str(model.device),
+            "threads": torch.get_num_threads(),
+            "load_seconds": load_seconds,
+            "rss_delta_mb": round((_rss_bytes() - rss_before) / (1024 * 1024), 1),
+            "parameters": sum(p.numel() for p in model.parameters()),
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        _models[name] = model
+        logger.info(f"Loaded SentenceTransformer '{name}' in {load_seconds}s on {model.device}")
+        return model
+
+
+def get_spacy(name=SPACY_MODEL):
+    """Shared spaCy pipeline with NER only; loaded once per process on first use."""
+    key = f"spacy:{name}"
+    nlp = _models.get(key)
+    if nlp is not None:
+        return nlp
+
+    with _lock:
+        nlp = _models.get(key)
+        if nlp is not None:
+            return nlp
+
+        import spacy
+
+        rss_before = _rss_bytes()
+        start = time.time()
+        nlp = spacy.load(name, exclude=SPACY_EXCLUDE)
+        # The shared tok2vec only feeds tagger/parser in the small models; skip it when nothing listens
+        if "tok2vec" in nlp.pipe_names and not getattr(nlp.get_pipe("tok2vec"), "listening_components", None):
+            nlp.disable_pipe("tok2vec")
+        load_seconds = round(time.time() - start, 3)
+
+        _stats[key] = {
+            "model": key,
+            "device": "cpu",
+            "pipeline": list(nlp.pipe_names),
+            "n_process": SPACY_N_PROCESS,
+            "batch_size": SPACY_BATCH_SIZE,
+            "load_seconds": load_seconds,
+            "rss_delta_mb": round((_rss_bytes() - rss_before) / (1024 * 1024), 1),
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        _models[key] = nlp
+        logger.info(f"Loaded spaCy '{name}' in {load_seconds}s with pipes {nlp.pipe_names}")
+        return nlp
+
+
+def model_stats():
+    """Load-time and memory metrics for every model loaded in this process."""
+    return {
+        "pid": os.getpid(),
+        "rss_mb": round(_rss_bytes() / (1024 * 1024), 1),
+        "models": list(_stats.values()),
+    }
@@ -1,51 +1,56 @@
-import os
 import re
-import docx2txt
-import PyPDF2
-import spacy
 import logging
+from utils.extraction_service import extract_document
+from utils.model_registry import get_spacy, SPACY_N_PROCESS, SPACY_BATCH_SIZE
 
-
-nlp = spacy.load("en_core_web_sm")
+NAME_WINDOW_CHARS = 500   # names sit at the top of a resume
 
 logger = logging.getLogger(__name__)
 
-def extract_text(path):
-    ext = os.path.splitext(path)[1].lower()
-    try:
-        if ext == ".pdf":
-            with open(path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                text = " ".join(page.extract_text() or "" for page in reader.pages)
-        elif ext == ".docx":
-            text = docx2txt.process(path)
-        else:
-            logger.warning(f"Unsupported file extension {ext} for file {path}")
-            return None
-        return clean_text(text) if text and len(text.strip()) >= 30 else None
-    except Exception as e:
-        logger.error(f"Error extracting text from {path}: {e}")
-        return None
+def extract_text(path, reject_when_busy=False):
+    """
+    Cleaned text of a .pdf/.docx, or None. Parsing runs in a time- and
+    memory-limited child process (utils/extraction_service.py); reject_when_busy
+    raises ExtractionBusy instead of queueing behind a full extraction queue.
+    """
+    text = extract_document(path, reject_when_busy=reject_when_busy)
+    return clean_text(text) if text and len(text.strip()) >= 30 else None
     
 def clean_text(text):
     return "\n".join([line.strip() for line in text.split("\n") if line.strip()])
 
-def extract_basic_info(text):
+def _basic_info(text, doc):
     email_match = re.search(r'\b[\w\.-]+@[\w\.-]+\.\w+\b', text)
     email = email_match.group(0) if email_match else None
     name = None
-    try:
-        doc = nlp(text[:500])
+    if doc is not None:
         for ent in doc.ents:
             if ent.label_ == "PERSON":
                 name = ent.text.strip()
                 break
-    except:
-        pass
     if not name:
         name = text.strip().split("\n")[0]
     return {"name": name, "email": email}
 
+
+def extract_basic_info(text):
+    try:
+        doc = get_spacy()(text[:NAME_WINDOW_CHARS])
+    except Exception:
+        doc = None
+    return _basic_info(text, doc)
+
+
+def extract_basic_info_batch(texts, n_process=SPACY_N_PROCESS, batch_size=SPACY_BATCH_SIZE):
+    """extract_basic_info for many texts through one batched nlp.pipe call (bulk ingestion)."""
+    try:
+        docs = list(get_spacy().pipe((t[:NAME_WINDOW_CHARS] for t in texts),
+                                     batch_size=batch_size, n_process=n_process))
+    except Exception as e:
+        logger.error(f"Batched name extraction failed: {e}")
+        docs = [None] * len(texts)
+    return [_basic_info(text, doc) for text, doc in zip(texts, docs)]
+
 def extract_experience(text):
     matches = re.findall(r'(\d{1,2})\+?\s?(?:years?|yrs?)', text.lower())
     return max([int(m) for m in matches if int(m) < 40], default=0)
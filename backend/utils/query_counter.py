@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db
+
+# ──────────────────────────────
+# Count the SQL statements a block of code issues, e.g. to check that an
+# endpoint runs a fixed number of queries however many rows it reads:
+#
+#     with count_queries() as counter:
+#         client.get("/match/results/1")
+#     assert counter.count <= 2, counter.statements
+# ──────────────────────────────
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+        self.seconds = 0.0
+        self._started = None
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        if self._started is not None:
+            self.seconds += time.perf_counter() - self._started
+            self._started = None
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Yield a QueryCounter recording every statement run on `engine` (default: db.engine) in the block."""
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._before)
+    event.listen(engine, "after_cursor_execute", counter._after)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._before)
+        event.remove(engine, "after_cursor_execute", counter._after)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Raise AssertionError when the block issues more than `limit` statements."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {s.splitlines()[0]}" for i, s in enumerate(counter.statements))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
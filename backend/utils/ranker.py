@@ -0,0 +1,254 @@
+import numpy as np
+from models import db, MatchLearningCache
+from utils.config_cache import get_derived
+from utils.vector_index import get_index, parse_embedding, top_k_indices
+from utils.tfidf_index import lexical_scores, align_scores
+from utils.skill_extractor import compute_similarity_score
+from utils.feature_store import compute_features, get_features, get_document_features
+from utils.latency_metrics import timed
+
+# ──────────────────────────────
+# Hybrid two-stage ranker
+# Stage 1: cheap retrieval (ANN over embeddings ∪ corpus TF-IDF) of a few hundred candidates.
+# Stage 2: rerank them with a weighted sum of feature columns computed as arrays:
+#   semantic   – embedding cosine
+#   lexical    – corpus TF-IDF cosine
+#   skills     – share of required skills the candidate has
+#   experience – min(have / required years, 1)
+#   feedback   – MatchLearningCache adjustment (signed, added on top)
+# ──────────────────────────────
+DEFAULT_WEIGHTS = {
+    "semantic": 0.5,
+    "lexical": 0.2,
+    "skills": 0.2,
+    "experience": 0.1,
+    "feedback": 0.1,
+}
+DEFAULT_FIRST_STAGE_K = 300
+LEXICAL_RECALL_SHARE = 3    # lexical retrieval adds first_stage_k / 3 candidates the ANN may have missed
+
+RANK_CONFIG_KEYS = {f"rank_weight_{name}": name for name in DEFAULT_WEIGHTS}
+FIRST_STAGE_CONFIG_KEY = "rank_first_stage_k"
+FEATURES = ("semantic", "lexical", "skills", "experience", "feedback")
+
+
+def _parse_rank_config(values):
+    weights = dict(DEFAULT_WEIGHTS)
+    for key, name in RANK_CONFIG_KEYS.items():
+        try:
+            weights[name] = max(float(values[key]), 0.0)
+        except (KeyError, TypeError, ValueError):
+            pass
+    try:
+        first_stage_k = max(int(float(values[FIRST_STAGE_CONFIG_KEY])), 1)
+    except (KeyError, TypeError, ValueError):
+        first_stage_k = DEFAULT_FIRST_STAGE_K
+    return {"weights": weights, "first_stage_k": first_stage_k}
+
+
+def rank_settings():
+    """Ranker weights from the config snapshot (Config keys rank_weight_*, rank_first_stage_k)."""
+    return get_derived("ranker", _parse_rank_config)
+
+
+# ──────────────────────────────
+# Document attributes (from the feature store, no NLP on stored documents)
+# ──────────────────────────────
+def _attributes(features):
+    return set(features["skills"]), float(features["experience_years"] or 0)
+
+
+def document_attributes(kind, doc, text):
+    """(skill set, years of experience) for one JD, profile or resume."""
+    features = get_document_features(kind, doc.id) if doc.id else None
+    return _attributes(features or compute_features(text))
+
+
+def _batch_attributes(kind, ids):
+    """{id: (skill set, years)} for many candidates with one query."""
+    return {doc_id: _attributes(features) for doc_id, features in get_features(kind, ids).items()}
+
+
+def _incidence(skill_sets, vocab):
+    """Binary (len(skill_sets), len(vocab)) matrix."""
+    matrix = np.zeros((len(skill_sets), len(vocab)), dtype=np.float32)
+    for row, skills in enumerate(skill_sets):
+        cols = [vocab[s] for s in skills if s in vocab]
+        matrix[row, cols] = 1.0
+    return matrix
+
+
+def skill_overlap(required, have):
+    """
+    Share of required skills covered, per row (1.0 when nothing is required).
+    `required` and `have` are lists of skill sets of the same length (or length 1,
+    broadcast against the other).
+    """
+    vocab = {s: i for i, s in enumerate(sorted(set().union(*required)))}
+    if not vocab:
+        return np.ones(max(len(required), len(have)), dtype=np.float32)
+    req = _incidence(required, vocab)
+    got = _incidence(have, vocab)
+    needed = req.sum(axis=1)
+    covered = (req * got).sum(axis=1)
+    return np.where(needed > 0, covered / np.maximum(needed, 1), 1.0).astype(np.float32)
+
+
+def experience_fit(required_years, have_years):
+    required_years = np.asarray(required_years, dtype=np.float32)
+    have_years = np.asarray(have_years, dtype=np.float32)
+    fit = np.clip(have_years / np.maximum(required_years, 1e-6), 0.0, 1.0)
+    return np.where(required_years > 0, fit, 1.0).astype(np.float32)
+
+
+def _feedback(jd_ids, other_column, other_ids):
+    """{(jd_id, other_id): summed adjustment} from MatchLearningCache."""
+    rows = db.session.query(
+        MatchLearningCache.jd_id, other_column, db.func.sum(MatchLearningCache.cumulative_score_adjustment)
+    ).filter(
+        MatchLearningCache.jd_id.in_(jd_ids), other_column.in_(other_ids)
+    ).group_by(MatchLearningCache.jd_id, other_column).all()
+    return {(jd_id, other_id): float(adj or 0.0) for jd_id, other_id, adj in rows}
+
+
+def combine(features, weights):
+    """Weighted score in [0, 1]; feedback is a signed nudge on top of the normalized sum."""
+    base = [name for name in FEATURES if name != "feedback"]
+    total = sum(weights[name] for name in base) or 1.0
+    score = sum(weights[name] * features[name] for name in base) / total
+    score = score + weights["feedback"] * np.clip(features["feedback"], -1.0, 1.0)
+    return np.clip(score, 0.0, 1.0)
+
+
+# ──────────────────────────────
+# Two-stage retrieval + rerank
+# ──────────────────────────────
+def _retrieve(kind, query_vec, query_text, first_stage_k):
+    """Stage 1: ANN candidates plus the best lexical hits. Returns (candidate ids, lexical scores)."""
+    candidates = []
+    if query_vec is not None:
+        ann_ids, _ = get_index(kind).search(query_vec, first_stage_k)
+        candidates.append(ann_ids)
+    lex_ids, lex_all = lexical_scores(kind, query_text) if query_text else (np.empty(0, np.int64), np.empty(0))
+    if len(lex_ids):
+        candidates.append(lex_ids[top_k_indices(lex_all, max(first_stage_k // LEXICAL_RECALL_SHARE, 1))])
+    ids = np.unique(np.concatenate(candidates)).astype(np.int64) if candidates else np.empty(0, np.int64)
+    return ids, (lex_ids, lex_all)
+
+
+def _semantic(kind, query_vec, ids):
+    if query_vec is None or not len(ids):
+        return np.zeros(len(ids), dtype=np.float32)
+    q = parse_embedding(query_vec)
+    q = q / (np.linalg.norm(q) or 1.0)
+    vectors = get_index(kind).vectors_for(ids)
+    return vectors @ q if vectors.shape[1] == len(q) else np.zeros(len(ids), dtype=np.float32)
+
+
+def _results(ids, features, weights, k):
+    scores = combine(features, weights)
+    best = top_k_indices(scores, len(scores) if k is None else k)
+    return [{
+        "id": int(ids[i]),
+        "score": float(scores[i]),
+        "features": {name: round(float(features[name][i]), 4) for name in FEATURES},
+    } for i in best]
+
+
+@timed("scoring")
+def rank_profiles(jd, jd_text, jd_vec, k, candidate_ids=None):
+    """
+    Top-k profiles for a JD: [{"id", "score", "features"}, ...], best first.
+    k=None keeps every candidate; candidate_ids skips retrieval and scores exactly those profiles.
+    """
+    settings = rank_settings()
+    if candidate_ids is None:
+        ids, (lex_ids, lex_all) = _retrieve("profile", jd_vec, jd_text, settings["first_stage_k"])
+    else:
+        ids = np.unique(np.asarray(list(candidate_ids), dtype=np.int64))
+        lex_ids, lex_all = lexical_scores("profile", jd_text) if jd_text else (np.empty(0, np.int64), np.empty(0))
+    attrs = _batch_attributes("profile", ids.tolist())
+    ids = np.asarray([i for i in ids if int(i) in attrs], dtype=np.int64)
+    if not len(ids):
+        return []
+
+    jd_skills, jd_years = document_attributes("jd", jd, jd_text)
+    feedback = _feedback([jd.id], MatchLearningCache.profile_id, ids.tolist())
+    features = {
+        "semantic": _semantic("profile", jd_vec, ids),
+        "lexical": align_scores(lex_ids, lex_all, ids),
+        "skills": skill_overlap([jd_skills], [attrs[int(i)][0] for i in ids]),
+        "experience": experience_fit(jd_years, [attrs[int(i)][1] for i in ids]),
+        "feedback": np.asarray([feedback.get((jd.id, int(i)), 0.0) for i in ids], dtype=np.float32),
+    }
+    return _results(ids, features, settings["weights"], k)
+
+
+@timed("scoring")
+def rank_jds(resume, resume_text, resume_vec, k):
+    """Top-k JDs for a resume: [{"id", "score", "features"}, ...], best first."""
+    settings = rank_settings()
+    ids, (lex_ids, lex_all) = _retrieve("jd", resume_vec, resume_text, settings["first_stage_k"])
+    attrs = _batch_attributes("jd", ids.tolist())
+    ids = np.asarray([i for i in ids if int(i) in attrs], dtype=np.int64)
+    if not len(ids):
+        return []
+
+    resume_skills, resume_years = document_attributes("resume", resume, resume_text)
+    feedback = _feedback(ids.tolist(), MatchLearningCache.resume_id, [resume.id])
+    features = {
+        "semantic": _semantic("jd", resume_vec, ids),
+        "lexical": align_scores(lex_ids, lex_all, ids),
+        "skills": skill_overlap([attrs[int(i)][0] for i in ids], [resume_skills]),
+        "experience": experience_fit([attrs[int(i)][1] for i in ids], resume_years),
+        "feedback": np.asarray([feedback.get((int(i), resume.id), 0.0) for i in ids], dtype=np.float32),
+    }
+    return _results(ids, features, settings["weights"], k)
+
+
+@timed("scoring")
+def score_profile_against_jds(profile, profile_text, profile_vec, jd_ids):
+    """
+    Hybrid score of one profile against many JDs in a single vectorized pass
+    (reverse matching): [{"id", "score", "features"}, ...] for every JD, best first.
+    Scores equal what rank_profiles gives the same pair.
+    """
+    settings = rank_settings()
+    attrs = _batch_attributes("jd", jd_ids)
+    ids = np.asarray(sorted(attrs), dtype=np.int64)
+    if not len(ids):
+        return []
+
+    lex_ids, lex_all = lexical_scores("jd", profile_text) if profile_text else (np.empty(0, np.int64), np.empty(0))
+    profile_skills, profile_years = document_attributes("profile", profile, profile_text)
+    feedback = _feedback(ids.tolist(), MatchLearningCache.profile_id, [profile.id])
+    features = {
+        "semantic": _semantic("jd", profile_vec, ids),
+        "lexical": align_scores(lex_ids, lex_all, ids),
+        "skills": skill_overlap([attrs[int(i)][0] for i in ids], [profile_skills]),
+        "experience": experience_fit([attrs[int(i)][1] for i in ids], profile_years),
+        "feedback": np.asarray([feedback.get((int(i), profile.id), 0.0) for i in ids], dtype=np.float32),
+    }
+    return _results(ids, features, settings["weights"], None)
+
+
+@timed("scoring")
+def score_pair(jd, jd_text, resume, resume_text):
+    """Hybrid score of one JD/resume pair: {"score", "features"}."""
+    settings = rank_settings()
+    jd_vec, resume_vec = parse_embedding(jd.embedding), parse_embedding(resume.embedding)
+    semantic = 0.0
+    if jd_vec is not None and resume_vec is not None and len(jd_vec) == len(resume_vec):
+        semantic = float(jd_vec @ resume_vec / ((np.linalg.norm(jd_vec) * np.linalg.norm(resume_vec)) or 1.0))
+
+    jd_skills, jd_years = document_attributes("jd", jd, jd_text)
+    resume_skills, resume_years = document_attributes("resume", resume, resume_text)
+    adjustment = _feedback([jd.id], MatchLearningCache.resume_id, [resume.id]).get((jd.id, resume.id), 0.0)
+    features = {
+        "semantic": np.asarray([semantic], dtype=np.float32),
+        "lexical": np.asarray([compute_similarity_score(jd_text, resume_text)], dtype=np.float32),
+        "skills": skill_overlap([jd_skills], [resume_skills]),
+        "experience": experience_fit([jd_years], [resume_years]),
+        "feedback": np.asarray([adjustment], dtype=np.float32),
+    }
+    return _results(np.asarray([resume.id]), features, settings["weights"], 1)[0]
@@ -0,0 +1,29 @@
+from sqlalchemy import inspect, text
+from models import db
+from utils.match_store import ensure_match_key_index
+from utils.metrics_rollup import ensure_rollups
+from utils.logger import logger
+
+
+def sync_schema():
+    """
+    Create missing tables and add any nullable columns declared on the models
+    but absent from an existing database (db.create_all never alters tables),
+    then make sure match_result has its unique key index and the metrics rollups
+    are backfilled. Needs an app context.
+    """
+    db.create_all()
+    inspector = inspect(db.engine)
+
+    for table in db.metadata.sorted_tables:
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+            logger.info(f"Schema sync: added column {table.name}.{column.name} ({col_type})")
+
+    ensure_match_key_index()
+    ensure_rollups()
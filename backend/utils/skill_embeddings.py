@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.model_registry import get_model
+from utils.skill_extractor import SKILL_WHITELIST
+
+# ──────────────────────────────
+# Skill-phrase embedding table
+#   whitelist skills: encoded once in a single batch, stored as a normalized matrix
+#   anything else:    encoded on demand and kept in a bounded LRU
+# ──────────────────────────────
+SKILL_CACHE_SIZE = int(os.getenv("SKILL_EMBEDDING_CACHE_SIZE", "4096"))
+
+_lock = threading.Lock()
+_table = {"skills": None, "ids": None, "matrix": None}
+_lru = OrderedDict()
+_counters = {"table_hits": 0, "lru_hits": 0, "misses": 0}
+
+
+def _encode(phrases):
+    vecs = np.asarray(get_model().encode(list(phrases), batch_size=64), dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+def _ensure_table():
+    if _table["matrix"] is not None:
+        return
+    with _lock:
+        if _table["matrix"] is None:
+            skills = sorted(SKILL_WHITELIST)
+            _table["ids"] = {skill: i for i, skill in enumerate(skills)}
+            _table["matrix"] = _encode(skills)
+            _table["skills"] = skills
+
+
+def skill_id(skill):
+    """Row of `skill` in the precomputed whitelist table, or None for off-list skills."""
+    _ensure_table()
+    return _table["ids"].get(skill)
+
+
+def skill_matrix(skills, rows=None):
+    """
+    Normalized embeddings for `skills`, one row each, encoding only uncached phrases.
+    `rows` optionally carries precomputed table rows (from the feature store).
+    """
+    _ensure_table()
+    ids, table, names = _table["ids"], _table["matrix"], _table["skills"]
+    out = np.empty((len(skills), table.shape[1]), dtype=np.float32)
+    missing = []
+
+    with _lock:
+        for i, skill in enumerate(skills):
+            row = rows[i] if rows is not None else None
+            if row is None or row >= len(names) or names[row] != skill:   # stale after a taxonomy change
+                row = ids.get(skill)
+            if row is not None:
+                out[i] = table[row]
+                _counters["table_hits"] += 1
+            elif skill in _lru:
+                _lru.move_to_end(skill)
+                out[i] = _lru[skill]
+                _counters["lru_hits"] += 1
+            else:
+                missing.append(i)
+
+    if missing:
+        phrases = list(dict.fromkeys(skills[i] for i in missing))
+        encoded = dict(zip(phrases, _encode(phrases)))
+        with _lock:
+            _counters["misses"] += len(phrases)
+            for phrase, vec in encoded.items():
+                _lru[phrase] = vec
+                _lru.move_to_end(phrase)
+            while len(_lru) > SKILL_CACHE_SIZE:
+                _lru.popitem(last=False)
+        for i in missing:
+            out[i] = encoded[skills[i]]
+    return out
+
+
+def skill_cache_stats():
+    with _lock:
+        return dict(_counters, table_size=len(_table["skills"] or []), lru_size=len(_lru))
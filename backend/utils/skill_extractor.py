@@ -1,34 +1,99 @@
 import os
 import re
-import spacy
+import json
 from nltk.corpus import stopwords
 from collections import defaultdict
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from utils.tfidf_index import get_corpus
 
-# Load Spacy model and NLTK stopwords once
-nlp = spacy.load("en_core_web_sm")
+# Load NLTK stopwords once
 stop_words = set(stopwords.words("english"))
 
-# Whitelist skills and their categories
-SKILL_WHITELIST = {
-    'python', 'java', 'c++', 'c#', 'html', 'css', 'javascript', 'typescript', 'sql',
-    'react', 'node.js', 'angular', 'flask', 'django', 'spring', 'next.js',
-    'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'linux',
-    'power bi', 'tableau', 'pandas', 'numpy', 'matplotlib',
-    'git', 'github', 'bitbucket',
-    'api', 'rest', 'graphql', 'nlp', 'machine learning', 'deep learning'
-}
-
-CATEGORY_MAP = {
-    'Languages': {'python', 'java', 'c++', 'c#', 'html', 'css', 'javascript', 'typescript', 'sql'},
-    'Frameworks': {'react', 'angular', 'flask', 'django', 'spring', 'next.js'},
-    'Cloud/DevOps': {'aws', 'azure', 'gcp', 'docker', 'kubernetes', 'linux'},
-    'Tools': {'git', 'github', 'bitbucket'},
-    'Data/Analytics': {'power bi', 'tableau', 'pandas', 'numpy', 'matplotlib'},
-    'AI/ML': {'nlp', 'machine learning', 'deep learning'},
-    'APIs': {'api', 'rest', 'graphql'},
-}
+# ──────────────────────────────
+# Skill taxonomy (canonical name, category, synonyms) loaded from a data file
+# ──────────────────────────────
+TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH",
+                          os.path.join(os.path.dirname(__file__), '..', 'data', 'skill_taxonomy.json'))
+
+# Tokens keep in-word symbols so 'c++', 'c#', 'node.js' and '.net' survive; '/' and '-' split
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:\.[a-z0-9+#]+)*|(?<![a-z0-9])\.[a-z0-9]+")
+_END = "\0"
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SkillMatcher:
+    """
+    Token-level trie over every skill name and synonym.
+    One left-to-right pass takes the longest phrase starting at each token, so the
+    cost is O(tokens × longest phrase) whatever the taxonomy size, and matches
+    always fall on word boundaries ('java' is not found inside 'javascript').
+    """
+
+    def __init__(self, patterns):
+        self.root = {}
+        self.size = 0
+        for phrase, canonical in patterns:
+            tokens = tokenize(phrase)
+            if not tokens:
+                continue
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[_END] = canonical
+            self.size += 1
+
+    def find(self, text):
+        tokens = tokenize(text)
+        found = set()
+        i, n = 0, len(tokens)
+        while i < n:
+            node = self.root.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            end = i + 1 if _END in node else None
+            skill = node.get(_END)
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    end, skill = j, node[_END]
+            if end is None:
+                i += 1
+            else:
+                found.add(skill)
+                i = end
+        return found
+
+
+def load_taxonomy(path=TAXONOMY_PATH):
+    """Return ({skill: category}, SkillMatcher) for a taxonomy JSON file."""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)["skills"]
+    categories, patterns = {}, []
+    for entry in entries:
+        name = entry["name"].strip().lower()
+        categories[name] = entry.get("category") or "Others"
+        if entry.get("match_name", True):
+            patterns.append((name, name))
+        patterns.extend((alias.strip().lower(), name) for alias in entry.get("aliases", []))
+    return categories, SkillMatcher(patterns)
+
+
+SKILL_CATEGORIES, SKILL_MATCHER = load_taxonomy()
+SKILL_WHITELIST = set(SKILL_CATEGORIES)
+
+CATEGORY_MAP = defaultdict(set)
+for _skill, _category in SKILL_CATEGORIES.items():
+    CATEGORY_MAP[_category].add(_skill)
+CATEGORY_MAP = dict(CATEGORY_MAP)
 
 NOISE_WORDS = {"team", "project", "solution", "experience", "technologies", "development", "ability", "skill"}
 
@@ -43,25 +108,11 @@ def clean_tokens(text):
 
 
 # ──────────────────────────────
-# Extract skills from text using whitelist & n-grams
+# Extract skills from text with the compiled taxonomy matcher
 # ──────────────────────────────
 def extract_skills(text):
-    tokens = clean_tokens(text)
-    text_lower = text.lower()
-    found = set()
-
-    # Match whitelist skills directly in text (full text match)
-    for skill in SKILL_WHITELIST:
-        if skill in text_lower:
-            found.add(skill)
-
-    # Check bigrams (2-word sequences) for multi-word skills
-    bigrams = [' '.join(tokens[i:i+2]) for i in range(len(tokens) - 1)]
-    for bg in bigrams:
-        if bg in SKILL_WHITELIST:
-            found.add(bg)
-
-    return sorted(found)
+    """Canonical taxonomy skills mentioned in `text` (synonyms resolved), sorted."""
+    return sorted(SKILL_MATCHER.find(text or ""))
 
 
 # ──────────────────────────────
@@ -70,22 +121,20 @@ def extract_skills(text):
 def categorize_skills(skills):
     grouped = defaultdict(list)
     for skill in skills:
-        placed = False
-        for category, items in CATEGORY_MAP.items():
-            if skill in items:
-                grouped[category].append(skill)
-                placed = True
-                break
-        if not placed:
-            grouped["Others"].append(skill)
+        grouped[SKILL_CATEGORIES.get(skill, "Others")].append(skill)
     return dict(grouped)
 
 
 # ──────────────────────────────
 # Compute TF-IDF cosine similarity score between two texts
+# (corpus-wide IDF when the shared model is fitted, per-pair fit otherwise)
 # ──────────────────────────────
 def compute_similarity_score(text1, text2):
     try:
+        corpus = get_corpus()
+        if corpus.ready:
+            vec1, vec2 = corpus.transform(text1), corpus.transform(text2)
+            return float((vec1 @ vec2.T).sum())
         vectorizer = TfidfVectorizer().fit([text1, text2])
         tfidf_matrix = vectorizer.transform([text1, text2])
         score = float(cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0])
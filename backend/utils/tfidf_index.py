@@ -0,0 +1,343 @@
+import os
+import time
+import atexit
+import threading
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from utils.logger import logger
+from utils.vector_index import INDEX_DIR, top_k_indices, file_lock
+
+# ──────────────────────────────
+# Corpus-wide TF-IDF model over JDs, profiles and resumes.
+# IDF is learned from the whole corpus; each document's sparse vector is kept
+# (row-aligned with its DB id) so lexical scoring is one sparse mat-vec product.
+# Uploads only update the in-memory matrices; the whole corpus is persisted as
+# one snapshot file (tmp + os.replace, so readers see the old or the new one,
+# never a mix), at most every TFIDF_SAVE_DELAY_SECONDS and off the request thread.
+# Saves from all workers are serialized by a file lock and merge onto the newest
+# snapshot, so one worker's save never drops another worker's uploads.
+# ──────────────────────────────
+TFIDF_KINDS = ("jd", "profile", "resume")
+MAX_FEATURES = int(os.getenv("TFIDF_MAX_FEATURES", "50000"))
+REFIT_FRACTION = float(os.getenv("TFIDF_REFIT_FRACTION", "0.2"))      # refit after 20% new docs
+REFIT_INTERVAL_HOURS = float(os.getenv("TFIDF_REFIT_INTERVAL_HOURS", "24"))
+SAVE_DELAY_SECONDS = float(os.getenv("TFIDF_SAVE_DELAY_SECONDS", "5"))   # batches saves after uploads
+
+VECTORIZER_PATH = os.path.join(INDEX_DIR, "tfidf_vectorizer.joblib")   # vectorizer + every matrix
+LOCK_PATH = VECTORIZER_PATH + ".lock"
+
+
+def _matrix_path(kind):   # pre-snapshot layout, still read by load()
+    return os.path.join(INDEX_DIR, f"tfidf_{kind}.npz")
+
+
+def _ids_path(kind):
+    return os.path.join(INDEX_DIR, f"tfidf_{kind}_ids.npy")
+
+
+def _new_vectorizer():
+    return TfidfVectorizer(stop_words="english", sublinear_tf=True, max_features=MAX_FEATURES)
+
+
+class TfidfCorpus:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.vectorizer = None
+        self.rows = {}        # kind -> (ids ndarray, csr_matrix)
+        self.fitted_docs = 0
+        self.docs_since_fit = 0
+        self.fitted_at = 0.0
+        self.loaded_mtime = None
+        self.refitting = False
+        self.save_scheduled = False
+        self.pending = []     # local changes not yet in the saved snapshot, replayed after load/fit
+
+    @property
+    def ready(self):
+        return self.vectorizer is not None
+
+    # ── fit / persist ──
+    def fit(self, documents):
+        """`documents` is {kind: [(id, text), ...]}."""
+        texts = [text for docs in documents.values() for _, text in docs]
+        if not texts:
+            return
+        vectorizer = _new_vectorizer().fit(texts)
+        rows = {}
+        for kind, docs in documents.items():
+            ids = np.asarray([doc_id for doc_id, _ in docs], dtype=np.int64)
+            matrix = vectorizer.transform([text for _, text in docs]) if docs \
+                else sparse.csr_matrix((0, len(vectorizer.vocabulary_)))
+            rows[kind] = (ids, matrix.tocsr())
+        with self.lock:
+            self.vectorizer = vectorizer
+            self.rows = rows
+            self.fitted_docs = len(texts)
+            self.docs_since_fit = 0
+            self.fitted_at = time.time()
+            self._replay()
+
+    def save(self):
+        """
+        Write the corpus under the inter-process file lock. If another worker saved
+        since we loaded, its snapshot is loaded first and our unsaved changes are
+        replayed on top, so neither worker's documents are lost.
+        """
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with file_lock(LOCK_PATH):
+            with self.lock:
+                if self.is_stale() and os.path.exists(VECTORIZER_PATH):
+                    self.load()
+            self._write()
+
+    def _write(self):
+        """Snapshot file written atomically; caller holds the file lock. Scoring is not blocked while it writes."""
+        with self.lock:
+            if not self.ready:
+                return
+            state = {
+                "vectorizer": self.vectorizer,
+                "rows": dict(self.rows),   # matrices are replaced, never mutated, so references are enough
+                "fitted_docs": self.fitted_docs,
+                "docs_since_fit": self.docs_since_fit,
+                "fitted_at": self.fitted_at,
+            }
+            saved = len(self.pending)
+        tmp_path = f"{VECTORIZER_PATH}.{os.getpid()}.tmp"
+        joblib.dump(state, tmp_path)
+        os.replace(tmp_path, VECTORIZER_PATH)
+        with self.lock:
+            del self.pending[:saved]   # changes made during the write stay pending
+            self.loaded_mtime = os.path.getmtime(VECTORIZER_PATH)
+
+    def load(self):
+        with self.lock:
+            state = joblib.load(VECTORIZER_PATH)
+            rows = state.get("rows")
+            if rows is None:   # older snapshots kept one .npz/.npy pair per kind
+                rows = {}
+                for kind in TFIDF_KINDS:
+                    if os.path.exists(_matrix_path(kind)):
+                        rows[kind] = (np.load(_ids_path(kind)), sparse.load_npz(_matrix_path(kind)).tocsr())
+            self.vectorizer = state["vectorizer"]
+            self.fitted_docs = state["fitted_docs"]
+            self.docs_since_fit = state["docs_since_fit"]
+            self.fitted_at = state["fitted_at"]
+            self.rows = rows
+            self.loaded_mtime = os.path.getmtime(VECTORIZER_PATH)
+            self._replay()
+
+    def _replay(self):
+        """Re-apply unsaved local changes on top of freshly loaded or fitted state."""
+        for op, kind, payload in self.pending:
+            if op == "upsert":
+                self._upsert_rows(kind, payload)
+            else:
+                self._remove_row(kind, payload)
+
+    def is_stale(self):
+        try:
+            return self.loaded_mtime is None or os.path.getmtime(VECTORIZER_PATH) > self.loaded_mtime
+        except OSError:
+            return False
+
+    # ── incremental updates (vocabulary/IDF fixed until the next refit) ──
+    def _upsert_rows(self, kind, docs):
+        new_ids = np.asarray([doc_id for doc_id, _ in docs], dtype=np.int64)
+        vecs = self.vectorizer.transform([text for _, text in docs]).tocsr()
+        ids, matrix = self.rows.get(kind, (np.empty(0, dtype=np.int64), sparse.csr_matrix((0, vecs.shape[1]))))
+        keep = ~np.isin(ids, new_ids)
+        self.rows[kind] = (np.append(ids[keep], new_ids), sparse.vstack([matrix[keep], vecs]).tocsr())
+
+    def _remove_row(self, kind, doc_id):
+        if kind in self.rows:
+            ids, matrix = self.rows[kind]
+            keep = ids != doc_id
+            self.rows[kind] = (ids[keep], matrix[keep])
+
+    def upsert(self, kind, doc_id, text):
+        self.upsert_many(kind, [(doc_id, text)])
+
+    def upsert_many(self, kind, docs):
+        """Bulk upsert of [(id, text), ...] with a single transform and vstack."""
+        with self.lock:
+            if not self.ready or not docs:
+                return
+            self._upsert_rows(kind, docs)
+            self.pending.append(("upsert", kind, docs))
+            self.docs_since_fit += len(docs)
+
+    def remove(self, kind, doc_id):
+        with self.lock:
+            if kind not in self.rows:
+                return
+            self._remove_row(kind, doc_id)
+            self.pending.append(("remove", kind, doc_id))
+
+    def needs_refit(self):
+        with self.lock:
+            if not self.ready:
+                return True
+            grew = self.docs_since_fit > REFIT_FRACTION * max(self.fitted_docs, 1)
+            aged = self.docs_since_fit and time.time() - self.fitted_at > REFIT_INTERVAL_HOURS * 3600
+            return bool(grew or aged)
+
+    # ── scoring ──
+    def transform(self, text):
+        with self.lock:
+            return self.vectorizer.transform([text]) if self.ready else None
+
+    def scores(self, kind, text):
+        """Cosine of `text` against every stored `kind` document: one sparse mat-vec product."""
+        with self.lock:
+            if not self.ready or kind not in self.rows:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            ids, matrix = self.rows[kind]
+            query = self.vectorizer.transform([text])
+            return ids, np.asarray((matrix @ query.T).todense()).ravel()
+
+
+def align_scores(ids, scores, doc_ids):
+    """Pick `scores` for `doc_ids` (0.0 where a doc is not in the corpus), vectorized."""
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    out = np.zeros(len(doc_ids), dtype=np.float32)
+    if not len(ids) or not len(doc_ids):
+        return out
+    sorter = np.argsort(ids)
+    pos = np.clip(np.searchsorted(ids, doc_ids, sorter=sorter), 0, len(ids) - 1)
+    found = ids[sorter[pos]] == doc_ids
+    out[found] = scores[sorter[pos[found]]]
+    return out
+
+
+# ──────────────────────────────
+# Process-wide corpus
+# ──────────────────────────────
+_corpus = TfidfCorpus()
+
+
+def _documents_from_db():
+    from models import JD, Profile, Resume
+    documents = {}
+    for kind, model in (("jd", JD), ("profile", Profile), ("resume", Resume)):
+        rows = model.query.with_entities(model.id, model.extracted_text) \
+            .filter(model.extracted_text.isnot(None)).all()
+        documents[kind] = [(doc_id, text) for doc_id, text in rows if text and text.strip()]
+    return documents
+
+
+def refit_corpus():
+    """Fit the vectorizer over every stored document and persist. Needs an app context."""
+    start = time.time()
+    documents = _documents_from_db()
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    with file_lock(LOCK_PATH):   # the fresh fit replaces whatever snapshot is on disk
+        _corpus.fit(documents)
+        _corpus._write()
+    logger.info(f"TF-IDF corpus refit on {_corpus.fitted_docs} documents in {round(time.time() - start, 2)}s")
+    return _corpus
+
+
+def _schedule_save():
+    """Save the corpus SAVE_DELAY_SECONDS from now on a timer thread; uploads in between share the save."""
+    with _corpus.lock:
+        if _corpus.save_scheduled:
+            return
+        _corpus.save_scheduled = True
+
+    def run():
+        _corpus.save_scheduled = False   # changes from here on schedule the next save
+        try:
+            _corpus.save()
+        except Exception as e:
+            logger.error(f"Failed to save TF-IDF corpus: {e}")
+
+    timer = threading.Timer(SAVE_DELAY_SECONDS, run)
+    timer.daemon = True
+    timer.start()
+
+
+@atexit.register
+def flush_tfidf():
+    """Save unsaved changes now (process exit, tests)."""
+    if _corpus.pending:
+        try:
+            _corpus.save()
+        except Exception as e:
+            logger.error(f"Failed to save TF-IDF corpus: {e}")
+
+
+def get_corpus():
+    if _corpus.is_stale() and os.path.exists(VECTORIZER_PATH):
+        _corpus.load()
+    return _corpus
+
+
+def load_tfidf():
+    """Load the persisted corpus at app start (fitting it the first time)."""
+    try:
+        if os.path.exists(VECTORIZER_PATH):
+            _corpus.load()
+        else:
+            refit_corpus()
+        logger.info(f"TF-IDF corpus ready: {_corpus.fitted_docs} documents")
+    except Exception as e:
+        logger.error(f"Failed to load TF-IDF corpus: {e}")
+
+
+def _schedule_refit(app):
+    with _corpus.lock:
+        if _corpus.refitting:
+            return
+        _corpus.refitting = True
+
+    def run():
+        try:
+            refit_corpus()
+        finally:
+            _corpus.refitting = False
+
+    from utils.background import submit
+    submit(app, run)
+
+
+def index_text(app, kind, doc_id, text):
+    """Add/replace one uploaded document; refits in the background once enough new docs arrived."""
+    if not text:
+        return
+    corpus = get_corpus()
+    corpus.upsert(kind, doc_id, text)
+    _schedule_save()
+    if corpus.needs_refit():
+        _schedule_refit(app)
+
+
+def index_texts(app, kind, docs):
+    """Bulk variant of index_text for [(id, text), ...]."""
+    docs = [(doc_id, text) for doc_id, text in docs if text]
+    if not docs:
+        return
+    corpus = get_corpus()
+    corpus.upsert_many(kind, docs)
+    _schedule_save()
+    if corpus.needs_refit():
+        _schedule_refit(app)
+
+
+def unindex_text(kind, doc_id):
+    corpus = get_corpus()
+    corpus.remove(kind, doc_id)
+    _schedule_save()
+
+
+def lexical_scores(kind, text):
+    return get_corpus().scores(kind, text)
+
+
+def lexical_top_k(kind, text, k):
+    """[(doc_id, score), ...] of the k best `kind` documents for `text`."""
+    ids, scores = lexical_scores(kind, text)
+    best = top_k_indices(scores, k)
+    return [(int(ids[i]), float(scores[i])) for i in best]
@@ -0,0 +1,477 @@
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+import numpy as np
+from utils.logger import logger
+from utils.embedding_codec import unpack_embedding, decode_legacy_json, decode_stored_embedding
+
+try:
+    import fcntl   # POSIX only; elsewhere saves are not serialized across processes
+except ImportError:
+    fcntl = None
+
+# On-disk location of the persisted indexes (one .npz file per document kind)
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'index'))
+
+MIN_TRAIN_SIZE = 256     # below this an exact scan is as fast as probing lists
+RETRAIN_GROWTH = 4       # re-cluster once the index has grown 4x since training
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 20000
+DEFAULT_NPROBE = 8
+SAVE_DELAY_SECONDS = float(os.getenv("VECTOR_INDEX_SAVE_DELAY_SECONDS", "5"))   # batches saves after uploads
+
+
+# ──────────────────────────────
+# Vector helpers
+# ──────────────────────────────
+def parse_embedding(value):
+    """
+    Coerce an embedding (array, list, packed blob or legacy JSON text) into a float32 vector.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return unpack_embedding(bytes(value))
+    if isinstance(value, str):
+        return decode_legacy_json(value)
+    vec = np.asarray(value, dtype=np.float32)
+    return vec if vec.size else None
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, using a partial sort."""
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def spherical_kmeans(vectors, nlist, iterations=KMEANS_ITERATIONS, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > KMEANS_SAMPLE:
+        sample = vectors[rng.choice(len(vectors), KMEANS_SAMPLE, replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+# ──────────────────────────────
+# IVF (inverted file) cosine index
+# ──────────────────────────────
+class VectorIndex:
+    """
+    Inverted-file index over L2-normalized embeddings.
+    Vectors are clustered with spherical k-means; a query only scores the
+    members of its `nprobe` closest clusters. Small indexes fall back to an
+    exact scan. Removals are tombstoned and compacted on save.
+    Changes not yet saved are kept in `pending` and replayed when a copy saved
+    by another worker is loaded, so concurrent workers merge instead of
+    overwriting each other.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.lock = threading.RLock()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = None
+        self.assign = np.empty(0, dtype=np.int32)
+        self.alive = np.empty(0, dtype=bool)
+        self.centroids = None
+        self.lists = {}
+        self.positions = {}
+        self.trained_size = 0
+        self.loaded_mtime = None
+        self.save_scheduled = False
+        self.pending = []     # [(op, doc_ids, vectors)] not yet in the saved copy
+
+    @property
+    def path(self):
+        return os.path.join(INDEX_DIR, f"{self.kind}.npz")
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    # ── build / train ──
+    def build(self, ids, vectors):
+        with self.lock:
+            self.ids = np.asarray(ids, dtype=np.int64)
+            self.vectors = normalize_rows(np.asarray(vectors, dtype=np.float32)) if len(ids) else None
+            self.alive = np.ones(len(self.ids), dtype=bool)
+            self.assign = np.zeros(len(self.ids), dtype=np.int32)
+            self.centroids = None
+            self._train()
+
+    def _train(self):
+        n = len(self.ids)
+        self.trained_size = n
+        if n < MIN_TRAIN_SIZE:
+            self.centroids = None
+            self.assign = np.zeros(n, dtype=np.int32)
+        else:
+            nlist = max(1, int(np.sqrt(n)))
+            self.centroids = spherical_kmeans(self.vectors, nlist)
+            self.assign = np.argmax(self.vectors @ self.centroids.T, axis=1).astype(np.int32)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        self.positions = {int(doc_id): pos for pos, doc_id in enumerate(self.ids) if self.alive[pos]}
+        self.lists = {}
+        live = np.flatnonzero(self.alive)
+        for c in np.unique(self.assign[live]) if len(live) else []:
+            self.lists[int(c)] = live[self.assign[live] == c]
+
+    def _compact(self):
+        keep = self.alive
+        if keep.all():
+            return
+        self.ids = self.ids[keep]
+        self.vectors = self.vectors[keep] if self.vectors is not None and keep.any() else None
+        self.assign = self.assign[keep]
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self._rebuild_lists()
+
+    # ── incremental updates ──
+    def add(self, doc_id, vec):
+        vec = normalize_rows(np.asarray(vec, dtype=np.float32).reshape(1, -1))
+        with self.lock:
+            self._remove(doc_id)
+            self.pending.append(("add", [doc_id], vec))
+            pos = len(self.ids)
+            c = int(np.argmax(self.centroids @ vec[0])) if self.centroids is not None else 0
+            self.ids = np.append(self.ids, np.int64(doc_id))
+            self.vectors = vec if self.vectors is None else np.vstack([self.vectors, vec])
+            self.assign = np.append(self.assign, np.int32(c))
+            self.alive = np.append(self.alive, True)
+            self.positions[int(doc_id)] = pos
+            self.lists[c] = np.append(self.lists.get(c, np.empty(0, dtype=np.int64)), pos)
+
+            live = len(self)
+            if (self.centroids is None and live >= MIN_TRAIN_SIZE) or \
+                    (self.trained_size and live >= RETRAIN_GROWTH * self.trained_size):
+                self._compact()
+                self._train()
+
+    def add_many(self, doc_ids, vectors):
+        """Bulk add/replace: one vstack and one centroid assignment for the whole batch."""
+        if not len(doc_ids):
+            return
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        with self.lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+            self.pending.append(("add", list(doc_ids), vectors))
+            assign = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32) \
+                if self.centroids is not None else np.zeros(len(doc_ids), dtype=np.int32)
+            self.ids = np.append(self.ids, np.asarray(doc_ids, dtype=np.int64))
+            self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+            self.assign = np.append(self.assign, assign)
+            self.alive = np.append(self.alive, np.ones(len(doc_ids), dtype=bool))
+
+            live = len(self)
+            if (self.centroids is None and live >= MIN_TRAIN_SIZE) or \
+                    (self.trained_size and live >= RETRAIN_GROWTH * self.trained_size):
+                self._compact()
+                self._train()
+            else:
+                self._rebuild_lists()
+
+    def remove(self, doc_id):
+        with self.lock:
+            removed = self._remove(doc_id)
+            if removed:
+                self.pending.append(("remove", [doc_id], None))
+            return removed
+
+    def _remove(self, doc_id):
+        with self.lock:
+            pos = self.positions.pop(int(doc_id), None)
+            if pos is None:
+                return False
+            self.alive[pos] = False
+            c = int(self.assign[pos])
+            self.lists[c] = self.lists[c][self.lists[c] != pos]
+            return True
+
+    # ── search ──
+    def search(self, query, k, nprobe=DEFAULT_NPROBE, exact=False):
+        """Return (ids, scores) of the k nearest documents by cosine similarity, best first."""
+        with self.lock:
+            if self.vectors is None or not len(self):
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            q = np.asarray(query, dtype=np.float32)
+            q = q / (np.linalg.norm(q) or 1.0)
+
+            if exact or self.centroids is None:
+                candidates = np.flatnonzero(self.alive)
+            else:
+                probe = top_k_indices(self.centroids @ q, min(nprobe, len(self.centroids)))
+                lists = [self.lists[int(c)] for c in probe if int(c) in self.lists]
+                candidates = np.concatenate(lists) if lists else np.empty(0, dtype=np.int64)
+
+            scores = self.vectors[candidates] @ q
+            best = top_k_indices(scores, k)
+            return self.ids[candidates[best]], scores[best]
+
+    def vectors_for(self, doc_ids):
+        """Stored (normalized) vectors for `doc_ids`; rows are zero for ids not in the index."""
+        with self.lock:
+            dim = self.vectors.shape[1] if self.vectors is not None else 0
+            out = np.zeros((len(doc_ids), dim), dtype=np.float32)
+            for row, doc_id in enumerate(doc_ids):
+                pos = self.positions.get(int(doc_id))
+                if pos is not None:
+                    out[row] = self.vectors[pos]
+            return out
+
+    # ── persistence ──
+    def save(self):
+        """
+        Write the index under an inter-process file lock. If another worker saved
+        since we loaded, its copy is loaded first and our unsaved changes are
+        replayed on top, so neither worker's documents are lost.
+        """
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with file_lock(self.path + ".lock"), self.lock:
+            if self.loaded_mtime is not None and self.is_stale():
+                self.load()
+            self._compact()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    ids=self.ids,
+                    vectors=self.vectors if self.vectors is not None else np.empty((0, 0), dtype=np.float32),
+                    assign=self.assign,
+                    centroids=self.centroids if self.centroids is not None else np.empty((0, 0), dtype=np.float32),
+                    trained_size=np.int64(self.trained_size),
+                )
+            os.replace(tmp_path, self.path)
+            self.pending = []
+            self.loaded_mtime = os.path.getmtime(self.path)
+
+    def load(self):
+        with self.lock:
+            with np.load(self.path) as data:
+                self.ids = data["ids"]
+                self.vectors = data["vectors"] if data["vectors"].size else None
+                self.assign = data["assign"]
+                self.centroids = data["centroids"] if data["centroids"].size else None
+                self.trained_size = int(data["trained_size"])
+            self.alive = np.ones(len(self.ids), dtype=bool)
+            self._rebuild_lists()
+            self.loaded_mtime = os.path.getmtime(self.path)
+            pending, self.pending = self.pending, []
+            for op, doc_ids, vectors in pending:   # re-recorded: still unsaved
+                if op == "add":
+                    self.add_many(doc_ids, vectors)
+                else:
+                    for doc_id in doc_ids:
+                        self.remove(doc_id)
+
+    def is_stale(self):
+        """True when another worker has written a newer copy to disk."""
+        try:
+            return self.loaded_mtime is None or os.path.getmtime(self.path) > self.loaded_mtime
+        except OSError:
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "kind": self.kind,
+                "size": len(self),
+                "dim": int(self.vectors.shape[1]) if self.vectors is not None else 0,
+                "nlist": int(len(self.centroids)) if self.centroids is not None else 0,
+                "mode": "ivf" if self.centroids is not None else "flat",
+                "bytes_on_disk": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            }
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on `path` shared by every worker process (no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ──────────────────────────────
+# Process-wide registry
+# ──────────────────────────────
+INDEX_KINDS = ("profile", "resume", "jd")
+_indexes = {}
+_registry_lock = threading.Lock()
+
+
+def _model_for(kind):
+    from models import Profile, Resume, JD
+    return {"profile": Profile, "resume": Resume, "jd": JD}[kind]
+
+
+def _load_embeddings_from_db(kind):
+    from models import db
+    model = _model_for(kind)
+    ids, vectors = [], []
+    rows = db.session.query(model.id, model.embedding_blob, model.embedding_vector).all()
+    for doc_id, blob, legacy_json in rows:
+        vec = decode_stored_embedding(blob, legacy_json)
+        if vec is not None:
+            ids.append(doc_id)
+            vectors.append(vec)
+    return ids, (np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32))
+
+
+def rebuild_index(kind):
+    """Rebuild an index from the DB embeddings and persist it. Needs an app context."""
+    start = time.time()
+    ids, vectors = _load_embeddings_from_db(kind)
+    index = VectorIndex(kind)
+    index.build(ids, vectors)
+    index.save()
+    with _registry_lock:
+        _indexes[kind] = index
+    logger.info(f"Vector index '{kind}' rebuilt: {len(index)} vectors in {round(time.time() - start, 2)}s")
+    return index
+
+
+def get_index(kind):
+    """Return the loaded index for `kind`, reloading if another worker saved a newer copy."""
+    with _registry_lock:
+        index = _indexes.get(kind)
+    if index is not None and not index.is_stale():
+        return index
+    index = index or VectorIndex(kind)   # reload in place so unsaved changes are replayed
+    if os.path.exists(index.path):
+        index.load()
+        with _registry_lock:
+            _indexes[kind] = index
+        return index
+    return rebuild_index(kind)
+
+
+def load_indexes():
+    """Load (or build, if missing) every index once at app start."""
+    for kind in INDEX_KINDS:
+        try:
+            index = get_index(kind)
+            logger.info(f"Vector index '{kind}' ready: {index.stats()}")
+        except Exception as e:
+            logger.error(f"Failed to load vector index '{kind}': {e}")
+
+
+def _schedule_save(index):
+    """Save `index` SAVE_DELAY_SECONDS from now on a timer thread; uploads in between share the save."""
+    with index.lock:
+        if index.save_scheduled:
+            return
+        index.save_scheduled = True
+
+    def run():
+        index.save_scheduled = False   # changes from here on schedule the next save
+        try:
+            index.save()
+        except Exception as e:
+            logger.error(f"Failed to save vector index '{index.kind}': {e}")
+
+    timer = threading.Timer(SAVE_DELAY_SECONDS, run)
+    timer.daemon = True
+    timer.start()
+
+
+@atexit.register
+def flush_indexes():
+    """Save every index with unsaved changes now (process exit, tests)."""
+    with _registry_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if index.pending:
+            try:
+                index.save()
+            except Exception as e:
+                logger.error(f"Failed to save vector index '{index.kind}': {e}")
+
+
+def index_document(kind, doc_id, embedding):
+    """Incrementally add (or replace) one document after upload."""
+    vec = parse_embedding(embedding)
+    if vec is None:
+        return
+    index = get_index(kind)
+    index.add(doc_id, vec)
+    _schedule_save(index)
+
+
+def index_documents(kind, items):
+    """Bulk variant of index_document for [(doc_id, embedding), ...]."""
+    items = [(doc_id, parse_embedding(emb)) for doc_id, emb in items]
+    items = [(doc_id, vec) for doc_id, vec in items if vec is not None]
+    if not items:
+        return
+    index = get_index(kind)
+    index.add_many([doc_id for doc_id, _ in items], np.vstack([vec for _, vec in items]))
+    _schedule_save(index)
+
+
+def unindex_document(kind, doc_id):
+    index = get_index(kind)
+    if index.remove(doc_id):
+        _schedule_save(index)
+
+
+def evaluate_recall(kind, k=10, sample_size=100, nprobe=DEFAULT_NPROBE):
+    """Compare ANN search against an exact scan on a sample of indexed vectors."""
+    index = get_index(kind)
+    with index.lock:
+        live = np.flatnonzero(index.alive)
+        if not len(live):
+            return {"recall_at_k": None, "k": k, "queries": 0}
+        rng = np.random.default_rng(0)
+        sample = rng.choice(live, min(sample_size, len(live)), replace=False)
+        queries = index.vectors[sample].copy()
+
+    hits, ann_time, exact_time = 0, 0.0, 0.0
+    for q in queries:
+        t0 = time.time()
+        ann_ids, _ = index.search(q, k, nprobe=nprobe)
+        t1 = time.time()
+        exact_ids, _ = index.search(q, k, exact=True)
+        t2 = time.time()
+        ann_time += t1 - t0
+        exact_time += t2 - t1
+        hits += len(np.intersect1d(ann_ids, exact_ids))
+
+    n = len(queries)
+    expected = sum(min(k, len(live)) for _ in range(n))
+    return {
+        "k": k,
+        "nprobe": nprobe,
+        "queries": n,
+        "recall_at_k": round(hits / expected, 4) if expected else None,
+        "ann_avg_ms": round(ann_time / n * 1000, 3),
+        "brute_force_avg_ms": round(exact_time / n * 1000, 3),
+    }